@@ -1,22 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import binascii
+import csv
+import hmac
+import io
+import json
 import logging
-import time
-from datetime import date
+import threading
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, Iterator, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Literal, Optional, Set, Tuple
 
 try:
     import cv2
 except ImportError:  # pragma: no cover - optional in tests
     cv2 = None  # type: ignore
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 
+from src.cluster import REPORT_KINDS, proxy_stream
 from src.config import AppConfig, CameraConfig
 from src.pipelines.counter import EntranceCounter
 from src.utils.events import EntranceEvent, EventStore
-from src.utils.streaming import FrameBuffer
+from src.utils.live import LiveUpdates
+from src.utils.metrics import MetricsRegistry
+from src.utils.streaming import FrameBuffer, MjpegBroadcaster
+from src.workers import RemoteIngest
 
 logger = logging.getLogger(__name__)
 
@@ -30,11 +42,42 @@ class AppState:
         counters: Dict[str, EntranceCounter],
         event_store: EventStore,
         frame_buffers: Dict[str, FrameBuffer],
+        live_updates: LiveUpdates | None = None,
+        metrics: MetricsRegistry | None = None,
+        ingest: RemoteIngest | None = None,
+        stream_urls: Dict[str, str] | None = None,
+        reload_config: Callable[[], Dict[str, List[str]]] | None = None,
     ) -> None:
         self.config = config
         self.counters = counters
         self.event_store = event_store
         self.frame_buffers = frame_buffers
+        self.live_updates = live_updates or LiveUpdates()
+        self.metrics = metrics or MetricsRegistry()
+        # Cluster coordinator only: applies node reports and locates node streams.
+        self.ingest = ingest
+        self.stream_urls = stream_urls or {}
+        # Re-reads the config file and applies camera changes (threaded camera processing only).
+        self.reload_config = reload_config
+        self.broadcasters: Dict[str, MjpegBroadcaster] = {}
+        self._broadcaster_lock = threading.Lock()
+
+    def get_broadcaster(self, camera_id: str) -> Optional[MjpegBroadcaster]:
+        """Return the shared MJPEG broadcaster for a camera, creating it on first use."""
+
+        frame_buffer = self.frame_buffers.get(camera_id)
+        if frame_buffer is None:
+            return None
+        with self._broadcaster_lock:
+            broadcaster = self.broadcasters.get(camera_id)
+            if broadcaster is None or broadcaster.frame_buffer is not frame_buffer:
+                broadcaster = MjpegBroadcaster(
+                    frame_buffer,
+                    jpeg_quality=self.config.stream_jpeg_quality,
+                    on_encode=self.metrics.camera(camera_id).stages["encode"].observe,
+                )
+                self.broadcasters[camera_id] = broadcaster
+            return broadcaster
 
 
 _state: AppState | None = None
@@ -45,12 +88,25 @@ def init_app_state(
     counters: Dict[str, EntranceCounter],
     event_store: EventStore,
     frame_buffers: Dict[str, FrameBuffer],
+    live_updates: LiveUpdates | None = None,
+    metrics: MetricsRegistry | None = None,
+    ingest: RemoteIngest | None = None,
+    stream_urls: Dict[str, str] | None = None,
+    reload_config: Callable[[], Dict[str, List[str]]] | None = None,
 ) -> None:
     """Initialize global app state used by API endpoints."""
 
     global _state
     _state = AppState(
-        config=config, counters=counters, event_store=event_store, frame_buffers=frame_buffers
+        config=config,
+        counters=counters,
+        event_store=event_store,
+        frame_buffers=frame_buffers,
+        live_updates=live_updates,
+        metrics=metrics,
+        ingest=ingest,
+        stream_urls=stream_urls,
+        reload_config=reload_config,
     )
     logger.info("API state initialized with %d cameras", len(counters))
 
@@ -81,34 +137,81 @@ def _bootstrap_state() -> None:
     _ensure_state()
 
 
-def mjpeg_generator(camera_id: str) -> Iterator[bytes]:
-    """Yield JPEG frames for the requested camera as an MJPEG stream."""
+async def mjpeg_generator(camera_id: str) -> AsyncIterator[bytes]:
+    """Yield JPEG frames for the requested camera as an MJPEG stream.
+
+    Each new frame is encoded once by the camera's broadcaster and shared by
+    all connected clients. Clients await frame-ready notifications on the
+    event loop, so an open stream does not occupy a threadpool worker.
+    """
 
     state = get_state()
-    frame_buffer = state.frame_buffers.get(camera_id)
-    if frame_buffer is None:
+    broadcaster = state.get_broadcaster(camera_id)
+    if broadcaster is None and camera_id in state.stream_urls:
+        # Cluster coordinator: the camera runs on another node.
+        async for chunk in proxy_stream(state.stream_urls[camera_id]):
+            yield chunk
+        return
+    if broadcaster is None:
         logger.warning("Requested stream for unknown camera %s", camera_id)
-        return iter(())
+        return
 
     if cv2 is None:
         logger.error("OpenCV not available; MJPEG streaming disabled")
-        return iter(())
+        return
 
     logger.info("Client connected to stream for camera %s", camera_id)
-    while True:
-        frame = frame_buffer.read()
-        if frame is None:
-            time.sleep(0.05)
-            continue
-        ret, jpeg = cv2.imencode(".jpg", frame)
-        if not ret:
-            logger.error("Failed to encode frame for camera %s", camera_id)
-            time.sleep(0.05)
-            continue
-        logger.debug("mjpeg_generator: encoded frame size=%d for camera %s", len(jpeg), camera_id)
-        chunk = b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + bytearray(jpeg) + b"\r\n"
-        logger.debug("mjpeg_generator: yielding chunk size=%d for camera %s", len(chunk), camera_id)
-        yield chunk
+    # Camera threads only render annotated frames while someone is subscribed.
+    broadcaster.frame_buffer.subscribe()
+    version = 0
+    try:
+        while True:
+            jpeg, version = await broadcaster.next_jpeg_async(version, timeout=1.0)
+            if jpeg is None:
+                continue
+            yield b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+    finally:
+        broadcaster.frame_buffer.unsubscribe()
+        logger.info("Client disconnected from stream for camera %s", camera_id)
+
+
+class ClusterReport(BaseModel):
+    node: str
+    session: str
+    seq: int
+    messages: List[Tuple[str, Any]]
+
+
+@app.post("/cluster/report")
+def cluster_report(
+    report: ClusterReport, authorization: Optional[str] = Header(None)
+) -> dict[str, int | bool]:
+    """Apply a batch of events, attributes and counts reported by a cluster node."""
+
+    state = get_state()
+    if state.ingest is None:
+        raise HTTPException(status_code=404, detail="Not a cluster coordinator")
+    expected = f"Bearer {state.config.cluster_token}".encode("utf-8")
+    if not hmac.compare_digest((authorization or "").encode("utf-8"), expected):
+        raise HTTPException(status_code=401, detail="Invalid cluster token")
+    unknown = {kind for kind, _ in report.messages if kind not in REPORT_KINDS}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown message kinds: {sorted(unknown)}")
+    applied = state.ingest.handle_batch(report.node, report.session, report.seq, report.messages)
+    return {"accepted": len(report.messages), "duplicate": not applied}
+
+
+@app.post("/admin/reload")
+def reload_config() -> dict[str, List[str]]:
+    """Re-read the configuration file and start, stop or update only the cameras that changed."""
+
+    state = get_state()
+    if state.reload_config is None:
+        raise HTTPException(status_code=409, detail="Configuration reload needs threaded camera processing")
+    try:
+        return state.reload_config()
+    except (FileNotFoundError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from None
 
 
 @app.get("/health")
@@ -116,6 +219,15 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    """Pipeline, stream and detector metrics in Prometheus text format."""
+
+    return PlainTextResponse(
+        get_state().metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/cameras")
 def list_cameras() -> list[CameraConfig]:
     return get_state().config.cameras
@@ -138,8 +250,110 @@ def camera_events(camera_id: str, limit: int = 50) -> list[EntranceEvent]:
     return state.event_store.get_recent_events(camera_id=camera_id, limit=limit)
 
 
+def _encode_cursor(timestamp: float, seen: int) -> str:
+    """Encode a resume position: the last timestamp and how many rows shared it."""
+
+    raw = json.dumps([timestamp, seen], separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        timestamp, seen = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(timestamp), int(seen)
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def export_rows(
+    events: Iterator[EntranceEvent],
+    fmt: str,
+    cursor: Optional[Tuple[float, int]] = None,
+    limit: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Serialize events as NDJSON or CSV lines, each carrying a resume cursor.
+
+    Rows are written straight from event attributes; a client resumes an
+    interrupted or paginated export by passing the cursor of the last row it
+    received.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        yield b"camera_id,timestamp,direction,track_id,cursor,attributes\n"
+    last_ts, seen = cursor if cursor is not None else (None, 0)
+    to_skip = seen
+    written = 0
+    for event in events:
+        ts = event.timestamp.timestamp()
+        if to_skip and ts == last_ts:
+            to_skip -= 1
+            continue
+        to_skip = 0
+        seen = seen + 1 if ts == last_ts else 1
+        last_ts = ts
+        row_cursor = _encode_cursor(ts, seen)
+        if fmt == "csv":
+            attributes = json.dumps(event.attributes, separators=(",", ":")) if event.attributes else ""
+            writer.writerow(
+                [
+                    event.camera_id,
+                    event.timestamp.isoformat(),
+                    event.direction,
+                    event.track_id,
+                    row_cursor,
+                    attributes,
+                ]
+            )
+            line = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            line = json.dumps(
+                {
+                    "camera_id": event.camera_id,
+                    "timestamp": event.timestamp.isoformat(),
+                    "direction": event.direction,
+                    "track_id": event.track_id,
+                    "attributes": event.attributes,
+                    "cursor": row_cursor,
+                }
+            ) + "\n"
+        yield line.encode("utf-8")
+        written += 1
+        if limit is not None and written >= limit:
+            return
+
+
+@app.get("/cameras/{camera_id}/events/export")
+def export_camera_events(
+    camera_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    format: Literal["ndjson", "csv"] = "ndjson",
+) -> StreamingResponse:
+    """Stream a camera's events in ``[start, end)`` as NDJSON or CSV.
+
+    CSV rows carry the profiler attributes as a JSON object in the last column.
+    """
+
+    state = get_state()
+    if camera_id not in state.counters:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    position = _decode_cursor(cursor) if cursor else None
+    if position is not None:
+        if start is None or start.timestamp() < position[0]:
+            start = datetime.fromtimestamp(position[0])
+    events = state.event_store.iter_events(camera_id=camera_id, start=start, end=end)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(export_rows(events, format, position, limit), media_type=media_type)
+
+
 @app.get("/cameras/{camera_id}/stream")
-def stream_camera(camera_id: str) -> StreamingResponse:
+async def stream_camera(camera_id: str) -> StreamingResponse:
     state = get_state()
     if camera_id not in state.counters:
         raise HTTPException(status_code=404, detail="Camera not found")
@@ -149,6 +363,56 @@ def stream_camera(camera_id: str) -> StreamingResponse:
     )
 
 
+def _sse_message(event_type: str, payload: dict) -> bytes:
+    return f"event: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n".encode("utf-8")
+
+
+async def live_update_generator(
+    camera_ids: Optional[Set[str]], include_tracks: bool, keepalive: float = 15.0
+) -> AsyncIterator[bytes]:
+    """Yield Server-Sent Events for pipeline updates, starting with current counts."""
+
+    state = get_state()
+    subscription = state.live_updates.subscribe(camera_ids=camera_ids, include_tracks=include_tracks)
+    try:
+        for camera_id, counter in state.counters.items():
+            if camera_ids is None or camera_id in camera_ids:
+                yield _sse_message(
+                    "counts", {"type": "counts", "camera_id": camera_id, **counter.get_counts()}
+                )
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield _sse_message(message["type"], message)
+    finally:
+        state.live_updates.unsubscribe(subscription)
+
+
+@app.get("/live/updates")
+async def live_updates(
+    camera: Optional[List[str]] = Query(None), tracks: bool = False
+) -> StreamingResponse:
+    """Server-Sent Events push channel for counts, entrance events and track boxes.
+
+    Message types are ``counts`` (sent when a camera's counts change),
+    ``event`` (each new entrance event) and, with ``tracks=true``, per-frame
+    ``tracks`` boxes so clients can draw overlays themselves.
+    """
+
+    state = get_state()
+    camera_ids = set(camera) if camera else None
+    if camera_ids is not None and not camera_ids <= set(state.counters):
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return StreamingResponse(
+        live_update_generator(camera_ids, tracks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/live")
 def live_view() -> HTMLResponse:
     html_path = Path(__file__).with_name("live.html")
@@ -185,4 +449,6 @@ __all__ = [
     "init_app_state",
     "get_state",
     "mjpeg_generator",
+    "export_rows",
+    "live_update_generator",
 ]
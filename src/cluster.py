@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import collections
+import hashlib
+import json
+import logging
+import threading
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import date
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config import AppConfig
+from src.utils.events import EntranceEvent, EventStore
+from src.utils.live import LiveUpdates
+from src.workers import RemoteCounter, RemoteIngest
+
+logger = logging.getLogger(__name__)
+
+# Message kinds a node may report; the same protocol worker processes use.
+REPORT_KINDS = ("event", "attributes", "counts")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys (camera ids) to node ids.
+
+    Each node is placed at ``replicas`` points on the ring, so cameras spread
+    evenly and adding or removing a node only moves the cameras that hash to
+    its points. The mapping depends only on the node ids, so every node and
+    the coordinator agree on it without talking to each other.
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = 64) -> None:
+        points = sorted((_hash(f"{node}#{index}"), node) for node in nodes for index in range(replicas))
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        if not self._keys:
+            raise ValueError("Hash ring has no nodes")
+        return self._nodes[bisect.bisect(self._keys, _hash(key)) % len(self._keys)]
+
+
+def camera_owners(config: AppConfig) -> Dict[str, str]:
+    """Map every configured camera id to the id of the node that processes it."""
+
+    ring = HashRing(config.cluster_nodes)
+    return {camera_cfg.id: ring.node_for(camera_cfg.id) for camera_cfg in config.cameras}
+
+
+def shard_config(config: AppConfig) -> AppConfig:
+    """Return a copy of a node's configuration restricted to the cameras it owns."""
+
+    owners = camera_owners(config)
+    cameras = [camera_cfg for camera_cfg in config.cameras if owners[camera_cfg.id] == config.node_id]
+    logger.info("Node %s owns %d of %d cameras", config.node_id, len(cameras), len(config.cameras))
+    return config.model_copy(update={"cameras": cameras})
+
+
+def stream_urls(config: AppConfig) -> Dict[str, str]:
+    """MJPEG stream URL of every camera on the node that owns it."""
+
+    return {
+        camera_id: f"{config.cluster_nodes[node].rstrip('/')}/cameras/{camera_id}/stream"
+        for camera_id, node in camera_owners(config).items()
+    }
+
+
+def create_coordinator(
+    config: AppConfig, event_store: EventStore, live_updates: Optional[LiveUpdates] = None
+) -> Tuple[Dict[str, RemoteCounter], RemoteIngest]:
+    """Counters for every camera in the cluster and the ingest applying node reports to them."""
+
+    today = event_store.summarize_daily_counts(date.today())
+    counters = {
+        camera_cfg.id: RemoteCounter(
+            camera_cfg.id,
+            int(today.get(camera_cfg.id, {}).get("total_in_today", 0)),
+            int(today.get(camera_cfg.id, {}).get("total_out_today", 0)),
+        )
+        for camera_cfg in config.cameras
+    }
+    return counters, RemoteIngest(event_store, counters, live_updates)
+
+
+class CoordinatorClient:
+    """Stands in for ``EventStore`` and ``LiveUpdates`` on a node: reports to the coordinator.
+
+    Reports are authenticated with the shared ``token`` (``cluster_token``).
+    Events and profiler attributes are queued as ``(kind, payload)`` messages
+    and POSTed in batches to ``/cluster/report`` every ``interval`` seconds
+    by a background thread, followed by the latest counts of cameras that
+    changed. All counts are re-sent every ``snapshot_interval`` seconds so a
+    restarted coordinator catches up. Beyond ``max_pending`` queued messages
+    the oldest are dropped.
+
+    Each batch carries this client's random ``session`` id and an increasing
+    sequence number. A batch that fails to send is retried unchanged before
+    anything else, so when a timed-out POST had in fact been applied the
+    coordinator recognizes the retry by its sequence number and skips it.
+    """
+
+    def __init__(
+        self,
+        coordinator_url: str,
+        node_id: str,
+        token: str,
+        interval: float = 1.0,
+        snapshot_interval: float = 30.0,
+        max_pending: int = 100_000,
+        max_batch: int = 1000,
+        timeout: float = 5.0,
+    ) -> None:
+        self.coordinator_url = coordinator_url.rstrip("/")
+        self.node_id = node_id
+        self.token = token
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.dropped = 0
+        self._pending: Deque[List[Any]] = collections.deque()
+        self._counts: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Set[str] = set()
+        self.session = uuid.uuid4().hex
+        self._seq = 0
+        # (sequence, messages, whether the queue was drained) of the batch awaiting delivery.
+        self._inflight: Optional[Tuple[int, List[Any], bool]] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="cluster-reporter")
+        self._thread.start()
+
+    # EventStore interface used by the camera pipeline.
+    def add_event(self, event: EntranceEvent) -> None:
+        self._enqueue(
+            ["event", [event.camera_id, event.timestamp.timestamp(), event.direction, event.track_id]]
+        )
+
+    def set_attributes(self, event: EntranceEvent, attributes: Dict[str, str]) -> None:
+        self._enqueue(
+            [
+                "attributes",
+                [event.camera_id, event.timestamp.timestamp(), event.direction, event.track_id, attributes],
+            ]
+        )
+
+    def summarize_daily_counts(self, day: date, counters: Any = None) -> Dict[str, Dict[str, Any]]:
+        """Today's per-camera totals from the coordinator, used to restore counters on startup."""
+
+        if day != date.today():
+            return {}
+        url = f"{self.coordinator_url}/stats/summary"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return json.load(response).get("cameras", {})
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not fetch counts from coordinator %s: %s", self.coordinator_url, exc)
+            return {}
+
+    # LiveUpdates interface: only count changes are reported.
+    def has_subscribers(self) -> bool:
+        return False
+
+    def wants_tracks(self, camera_id: str) -> bool:
+        return False
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        if message.get("type") != "counts":
+            return
+        with self._lock:
+            self._counts[message["camera_id"]] = message
+            self._dirty.add(message["camera_id"])
+
+    def flush(self) -> bool:
+        """Send everything queued so far; returns False if the coordinator could not be reached."""
+
+        with self._flush_lock:
+            while True:
+                if self._inflight is None:
+                    with self._lock:
+                        count = min(self.max_batch, len(self._pending))
+                        batch = [self._pending.popleft() for _ in range(count)]
+                        last = not self._pending
+                        if last:
+                            dirty, self._dirty = self._dirty, set()
+                            batch.extend(["counts", self._counts[camera_id]] for camera_id in sorted(dirty))
+                    if not batch:
+                        return True
+                    self._seq += 1
+                    self._inflight = (self._seq, batch, last)
+                seq, batch, last = self._inflight
+                try:
+                    self._post(seq, batch)
+                except (OSError, ValueError) as exc:
+                    logger.warning("Report to coordinator %s failed: %s", self.coordinator_url, exc)
+                    return False
+                self._inflight = None
+                if last:
+                    return True
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._thread.join(timeout=self.timeout + self.interval)
+        self.flush()
+
+    def _enqueue(self, message: List[Any]) -> None:
+        with self._lock:
+            self._pending.append(message)
+            self._trim()
+
+    def _trim(self) -> None:
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+
+    def _post(self, seq: int, messages: List[Any]) -> None:
+        report = {"node": self.node_id, "session": self.session, "seq": seq, "messages": messages}
+        body = json.dumps(report).encode("utf-8")
+        request = urllib.request.Request(
+            f"{self.coordinator_url}/cluster/report",
+            data=body,
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def _run(self) -> None:
+        waited = 0.0
+        while not self._stopped.wait(self.interval):
+            waited += self.interval
+            if waited >= self.snapshot_interval:
+                waited = 0.0
+                with self._lock:
+                    self._dirty.update(self._counts)
+            self.flush()
+
+
+async def proxy_stream(
+    url: str, chunk_size: int = 64 * 1024, timeout: float = 10.0
+) -> AsyncIterator[bytes]:
+    """Relay the body of a node's MJPEG stream without tying up a thread per viewer.
+
+    The request is made directly on the event loop's sockets as HTTP/1.0, so
+    the node sends the body unchunked and ends it by closing the connection.
+    """
+
+    parts = urllib.parse.urlsplit(url)
+    secure = parts.scheme == "https"
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    port = parts.port or (443 if secure else 80)
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=secure or None), timeout
+        )
+    except (OSError, asyncio.TimeoutError) as exc:
+        logger.warning("Cannot open upstream stream %s: %s", url, exc)
+        return
+    try:
+        writer.write(f"GET {path or '/'} HTTP/1.0\r\nHost: {parts.netloc}\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        status_line = head.split(b"\r\n", 1)[0]
+        if status_line.split()[1:2] != [b"200"]:
+            logger.warning("Upstream stream %s answered %s", url, status_line.decode("latin-1"))
+            return
+        while True:
+            chunk = await reader.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as exc:
+        logger.warning("Upstream stream %s failed: %s", url, exc)
+    finally:
+        writer.close()
+
+
+__all__ = [
+    "CoordinatorClient",
+    "HashRing",
+    "REPORT_KINDS",
+    "camera_owners",
+    "create_coordinator",
+    "proxy_stream",
+    "shard_config",
+    "stream_urls",
+]
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Literal, Optional, Tuple
 
 import yaml
 from pydantic import BaseModel, Field, ValidationError, root_validator
 
+from src.utils.geometry import Region, region_around_line
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,20 +28,171 @@ class LineDefinition(BaseModel):
         return values
 
 
+class RegionDefinition(BaseModel):
+    p1: Tuple[float, float] = Field(..., description="Top-left corner as normalized coordinates (x, y)")
+    p2: Tuple[float, float] = Field(..., description="Bottom-right corner as normalized coordinates (x, y)")
+
+    @root_validator(skip_on_failure=True)
+    def validate_corners(cls, values: dict) -> dict:
+        p1, p2 = values.get("p1"), values.get("p2")
+        if p1 is None or p2 is None:
+            return values
+        if not all(0.0 <= coord <= 1.0 for coord in (*p1, *p2)):
+            raise ValueError("region coordinates must be in the range [0, 1]")
+        if p1[0] >= p2[0] or p1[1] >= p2[1]:
+            raise ValueError("p1 must be above and to the left of p2")
+        return values
+
+
 class CameraConfig(BaseModel):
     id: str
     name: str
     rtsp_url: str
     entrance_line: LineDefinition
+    capture_mode: Literal["sequential", "latest"] = Field(
+        "sequential",
+        description="'latest' decodes in a background thread and keeps only the newest frame",
+    )
+    detect_stride: int = Field(
+        1, ge=1, description="Run the detector every N frames; the tracker predicts positions in between"
+    )
+    motion_threshold: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Skip frames where less than this fraction of a downscaled thumbnail changed",
+    )
+    roi: Optional[RegionDefinition] = Field(
+        None, description="Normalized region passed to the detector instead of the full frame"
+    )
+    roi_margin: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Derive the detection region from the entrance line grown by this normalized margin",
+    )
+    replay_start: Optional[datetime] = Field(
+        None,
+        description="Wall-clock time of the first frame when rtsp_url is a file or directory "
+        "(defaults to the first file's modification time)",
+    )
+
+    def detection_region(self) -> Optional[Region]:
+        """Return the normalized (x1, y1, x2, y2) detection region, if one is configured."""
+
+        if self.roi is not None:
+            return (*self.roi.p1, *self.roi.p2)
+        if self.roi_margin is not None:
+            return region_around_line((self.entrance_line.p1, self.entrance_line.p2), self.roi_margin)
+        return None
 
 
 class AppConfig(BaseModel):
     log_level: str = Field("INFO", description="Logging level")
     model_path: str = Field("yolov8n.pt", description="Path to YOLOv8 model")
+    inference_backend: Literal["ultralytics", "onnxruntime", "openvino"] = Field(
+        "ultralytics",
+        description="Runtime for the detector; 'onnxruntime' and 'openvino' load an exported model from model_path",
+    )
+    inference_imgsz: int = Field(640, ge=32, description="Detector input size in pixels (square)")
+    tracker_type: Literal["deepsort", "iou"] = Field(
+        "deepsort", description="'iou' uses the lightweight vectorized IOU tracker instead of DeepSORT"
+    )
+    detector_batch_size: int = Field(
+        8, ge=1, description="Maximum frames per batched detector call across cameras (1 disables batching)"
+    )
+    detector_max_wait_ms: float = Field(
+        5.0, ge=0.0, description="Maximum time to wait for more frames before running a partial batch"
+    )
+    embedder_batch_size: int = Field(
+        64,
+        ge=1,
+        description="Maximum camera requests per shared embedder pass, and crops per model forward pass",
+    )
+    embedder_max_wait_ms: float = Field(
+        5.0, ge=0.0, description="Maximum time the shared embedder waits for crops from other cameras"
+    )
+    embedding_refresh_interval: int = Field(
+        10, ge=1, description="Tracker updates a reused track embedding stays valid before it is recomputed"
+    )
+    embedding_max_staleness: int = Field(
+        2, ge=0, description="Tracker updates a track may go unmatched and still reuse its cached embedding"
+    )
+    execution_mode: Literal["threads", "processes"] = Field(
+        "threads", description="'processes' runs camera groups in worker processes"
+    )
+    cameras_per_process: int = Field(1, ge=1, description="Cameras handled by each worker process")
+    shared_frame_max_bytes: int = Field(
+        1920 * 1080 * 3,
+        ge=1,
+        description="Shared memory reserved per camera for annotated frames in process mode",
+    )
+    event_retention_hours: float = Field(
+        48.0, gt=0, description="How long events are kept in memory, relative to the newest event"
+    )
+    max_events_per_camera: int = Field(
+        100_000, ge=1, description="Upper bound on in-memory events kept per camera"
+    )
+    event_db_path: Optional[str] = Field(
+        None, description="SQLite database for durable event storage; in-memory only when unset"
+    )
+    stream_jpeg_quality: int = Field(
+        80, ge=1, le=100, description="JPEG quality used for MJPEG camera streams"
+    )
+    stream_preview_width: Optional[int] = Field(
+        960,
+        ge=16,
+        description="Width annotated stream frames are scaled down to; null keeps the camera resolution",
+    )
+    stream_preview_fps: float = Field(
+        10.0, gt=0, description="Maximum rate at which annotated stream frames are rendered"
+    )
+    profiler_workers: int = Field(1, ge=1, description="Background threads extracting customer attributes")
+    profiler_queue_size: int = Field(
+        64, ge=1, description="Pending profiling jobs before new ones are dropped"
+    )
+    metrics_log_interval: float = Field(
+        60.0, gt=0.0, description="Seconds between per-camera pipeline summaries in the log"
+    )
+    config_reload_interval: Optional[float] = Field(
+        None,
+        gt=0.0,
+        description="Seconds between checks of the config file for camera changes; disabled when unset",
+    )
+    cluster_role: Literal["standalone", "coordinator", "node"] = Field(
+        "standalone",
+        description="'node' processes a shard of the cameras and reports to the 'coordinator' serving the API",
+    )
+    cluster_nodes: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Node id to base URL of that node's API; cameras are sharded across these ids",
+    )
+    cluster_token: Optional[str] = Field(
+        None, description="Shared secret nodes must present to the coordinator; required in cluster roles"
+    )
+    node_id: Optional[str] = Field(None, description="This node's id in cluster_nodes (node role)")
+    coordinator_url: Optional[str] = Field(None, description="Base URL of the coordinator API (node role)")
+    cluster_report_interval: float = Field(
+        1.0, gt=0.0, description="Seconds between event and count reports from a node to the coordinator"
+    )
     api_host: str = Field("0.0.0.0", description="Host interface for the API server")
     api_port: int = Field(8080, description="Port for the API server")
     cameras: List[CameraConfig]
 
+    @root_validator(skip_on_failure=True)
+    def validate_cluster(cls, values: dict) -> dict:
+        role = values.get("cluster_role")
+        if role != "standalone" and not values.get("cluster_nodes"):
+            raise ValueError(f"cluster_role '{role}' requires cluster_nodes")
+        if role != "standalone" and not values.get("cluster_token"):
+            raise ValueError(f"cluster_role '{role}' requires cluster_token")
+        if role == "node":
+            if values.get("node_id") not in values["cluster_nodes"]:
+                raise ValueError("node_id must be one of the cluster_nodes")
+            if not values.get("coordinator_url"):
+                raise ValueError("cluster_role 'node' requires coordinator_url")
+        return values
+
 
 def load_config(path: str | Path | None = None) -> AppConfig:
     """Load application configuration from YAML and return validated model.
@@ -73,4 +227,4 @@ def load_config(path: str | Path | None = None) -> AppConfig:
         raise ValueError("Invalid configuration") from exc
 
 
-__all__ = ["AppConfig", "CameraConfig", "LineDefinition", "load_config"]
+__all__ = ["AppConfig", "CameraConfig", "LineDefinition", "RegionDefinition", "load_config"]
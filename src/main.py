@@ -1,21 +1,34 @@
 from __future__ import annotations
 
+import argparse
 import logging
+import os
 import threading
-from datetime import datetime
-from typing import Dict
+import time
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, List
 
+import numpy as np
 import uvicorn
 
-from src.api.server import app, init_app_state
-from src.config import AppConfig, load_config
+from src.api.server import app, get_state, init_app_state
+from src.cluster import CoordinatorClient, create_coordinator, shard_config, stream_urls
+from src.config import AppConfig, CameraConfig, load_config
 from src.pipelines.counter import EntranceCounter
-from src.pipelines.detector import PersonDetector
+from src.pipelines.detector import BatchedDetector, PersonDetector
+from src.pipelines.embedder import SharedEmbedder, create_shared_embedder
+from src.pipelines.gating import DetectionGate
 from src.pipelines.profiler import CustomerProfiler
 from src.pipelines.tracker import PersonTracker
 from src.utils.events import EntranceEvent, EventStore
-from src.utils.streaming import FrameBuffer
-from src.utils.video import CameraStream
+from src.utils.geometry import BBox, normalized_region_to_absolute
+from src.utils.live import LiveUpdates
+from src.utils.metrics import MetricsRegistry, PipelineMetrics
+from src.utils.persistence import SQLiteEventBackend
+from src.utils.streaming import FrameBuffer, FramePool
+from src.utils.video import open_stream
+from src.workers import CameraProcessPool
 
 try:
     import cv2
@@ -29,19 +42,44 @@ def _annotate_frame(
     frame,
     tracks,
     counts: dict[str, int],
+    pool: FramePool | None = None,
+    region: BBox | None = None,
+    max_width: int | None = None,
 ) -> "cv2.Mat":
-    """Draw bounding boxes, IDs, and aggregate counts on the frame."""
+    """Draw bounding boxes, IDs, and aggregate counts on a copy of the frame.
+
+    ``region`` (pixel bounds of the detection ROI) is outlined when given.
+    Frames wider than ``max_width`` are scaled down first, so the drawing and
+    the later JPEG encoding work on the smaller preview.
+
+    The copy is taken from ``pool`` when given, so steady-state annotation
+    reuses a few buffers instead of allocating a new frame every time.
+    """
 
     if cv2 is None:
         return frame
 
-    annotated = frame.copy()
-    for track_id, x1, y1, x2, y2 in tracks:
-        cv2.rectangle(annotated, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+    scale = 1.0
+    if max_width is not None and frame.shape[1] > max_width:
+        scale = max_width / frame.shape[1]
+        size = (max_width, max(1, round(frame.shape[0] * scale)))
+        target = pool.acquire((size[1], size[0]) + frame.shape[2:], frame.dtype) if pool is not None else None
+        annotated = cv2.resize(frame, size, dst=target, interpolation=cv2.INTER_AREA)
+    elif pool is None:
+        annotated = frame.copy()
+    else:
+        annotated = pool.acquire(frame.shape, frame.dtype)
+        np.copyto(annotated, frame)
+    if region is not None:
+        x1, y1, x2, y2 = (int(v * scale) for v in region)
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (128, 128, 128), 1)
+    for track_id, *box in tracks:
+        x1, y1, x2, y2 = (int(v * scale) for v in box)
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
         cv2.putText(
             annotated,
             f"ID {track_id}",
-            (int(x1), max(int(y1) - 5, 0)),
+            (x1, max(y1 - 5, 0)),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.5,
             (0, 255, 0),
@@ -64,26 +102,163 @@ def _annotate_frame(
     return annotated
 
 
+def _detect_in_region(
+    detector: PersonDetector | BatchedDetector, frame: np.ndarray, region: BBox | None
+) -> np.ndarray:
+    """Run the detector on ``region`` of the frame and map boxes back to frame coordinates."""
+
+    if region is None:
+        return detector.detect(frame)
+    x1, y1, x2, y2 = region
+    detections = detector.detect(frame[y1:y2, x1:x2])
+    detections[:, [0, 2]] += x1
+    detections[:, [1, 3]] += y1
+    return detections
+
+
+def _publish_live(
+    live_updates: LiveUpdates,
+    camera_id: str,
+    counts: dict[str, int],
+    last_counts: dict[str, int] | None,
+    tracks,
+    frame,
+    timestamp: float,
+) -> None:
+    """Push count changes and, if anyone asked for them, this frame's track boxes."""
+
+    if counts != last_counts:
+        delta = {key: counts[key] - (last_counts or {}).get(key, 0) for key in counts}
+        live_updates.publish({"type": "counts", "camera_id": camera_id, **counts, "delta": delta})
+    if live_updates.wants_tracks(camera_id):
+        live_updates.publish(
+            {
+                "type": "tracks",
+                "camera_id": camera_id,
+                "timestamp": timestamp,
+                "width": frame.shape[1],
+                "height": frame.shape[0],
+                "tracks": [[int(v) for v in track] for track in tracks],
+            }
+        )
+
+
+def _observe(metrics: PipelineMetrics, stage: str, since: float, clock) -> float:
+    now = clock()
+    metrics.observe(stage, now - since)
+    return now
+
+
+def _log_summary(camera_cfg: CameraConfig, metrics: PipelineMetrics, counts: dict[str, int]) -> None:
+    def mean_ms(stage: str) -> float:
+        stats = metrics.stages[stage]
+        return stats.total / stats.count * 1000.0 if stats.count else 0.0
+
+    logger.info(
+        "Camera %s (%s): %.1f fps, %d frames, entered=%d exited=%d occupancy=%d, "
+        "mean ms decode=%.1f detect=%.1f track=%.1f annotate=%.1f, dropped=%d reconnects=%d",
+        camera_cfg.id,
+        camera_cfg.name,
+        metrics.fps,
+        metrics.frames,
+        counts["entered"],
+        counts["exited"],
+        counts["current_occupancy"],
+        mean_ms("decode"),
+        mean_ms("detect"),
+        mean_ms("track"),
+        mean_ms("annotate"),
+        getattr(metrics.stream, "dropped_frames", 0),
+        getattr(metrics.stream, "reconnects", 0),
+    )
+
+
 def process_camera(
     camera_cfg: CameraConfig,
-    detector: PersonDetector,
+    detector: PersonDetector | BatchedDetector,
     tracker: PersonTracker,
     counter: EntranceCounter,
     event_store: EventStore,
     profiler: CustomerProfiler,
     frame_buffer: FrameBuffer,
+    live_updates: LiveUpdates | None = None,
+    metrics: PipelineMetrics | None = None,
+    realtime_replay: bool = True,
+    summary_interval: float = 60.0,
+    preview_width: int | None = None,
+    preview_fps: float | None = None,
+    stop_event: threading.Event | None = None,
 ) -> None:
-    stream = CameraStream(camera_id=camera_cfg.id, rtsp_url=camera_cfg.rtsp_url)
+    """Run the detect/track/count/annotate loop for one camera until its stream ends.
+
+    File and ``file://`` sources are replayed with media timestamps, paced to
+    real time unless ``realtime_replay`` is False. Per-stage timings are
+    recorded in ``metrics`` and summarized in the log every
+    ``summary_interval`` seconds.
+
+    Annotated frames are only rendered while ``frame_buffer`` has stream
+    subscribers, scaled to ``preview_width`` and at most ``preview_fps`` times
+    per second. Setting ``stop_event`` ends the loop after the current frame.
+    """
+
+    stream = open_stream(
+        camera_cfg.id,
+        camera_cfg.rtsp_url,
+        latest_only=camera_cfg.capture_mode == "latest",
+        realtime=realtime_replay,
+        start_time=camera_cfg.replay_start.timestamp() if camera_cfg.replay_start else None,
+        stop_event=stop_event,
+    )
+    if metrics is None:
+        metrics = PipelineMetrics(camera_cfg.id)
+    metrics.stream = stream
+    gate = DetectionGate(
+        detect_stride=camera_cfg.detect_stride,
+        motion_threshold=camera_cfg.motion_threshold,
+    )
+    pool = FramePool()
+    region = camera_cfg.detection_region()
+    region_px: BBox | None = None
+    region_frame_size: tuple[int, int] | None = None
+    tracks = []
+    last_counts: dict[str, int] | None = None
+    clock = time.perf_counter
+    next_summary = clock() + summary_interval
+    preview_interval = 1.0 / preview_fps if preview_fps else 0.0
+    next_preview = 0.0
+    decode_started = clock()
     for frame, timestamp in stream.frames():
+        mark = _observe(metrics, "decode", decode_started, clock)
+        metrics.count_frame(mark)
         try:
-            detections = detector.detect(frame)
-            logger.debug("Processing frame: detections=%d, frame_none=%s, frame_shape=%s", len(detections), frame is None, getattr(frame, 'shape', None))
-            try:
-                tracks = tracker.update(detections, frame)
-            except Exception:
-                logger.exception("Tracker error; continuing without tracks")
-                tracks = []
-            events = counter.update(tracks, frame.shape[1], frame.shape[0])
+            if region is not None and frame.shape[:2] != region_frame_size:
+                region_frame_size = frame.shape[:2]
+                region_px = normalized_region_to_absolute(region, frame.shape[1], frame.shape[0])
+            # Motion outside the detection region cannot affect the counts.
+            gate_view = frame
+            if region_px is not None:
+                gate_view = frame[region_px[1] : region_px[3], region_px[0] : region_px[2]]
+            action = gate.check(gate_view)
+            mark = _observe(metrics, "gate", mark, clock)
+            if action == "detect":
+                detections = _detect_in_region(detector, frame, region_px)
+                mark = _observe(metrics, "detect", mark, clock)
+                logger.debug("Processing frame: detections=%d, frame_none=%s, frame_shape=%s", len(detections), frame is None, getattr(frame, 'shape', None))
+                try:
+                    tracks = tracker.update(detections, frame)
+                except Exception:
+                    logger.exception("Tracker error; continuing without tracks")
+                    tracks = []
+                mark = _observe(metrics, "track", mark, clock)
+            elif action == "predict":
+                try:
+                    tracks = tracker.predict()
+                except Exception:
+                    logger.exception("Tracker prediction error; keeping previous tracks")
+                mark = _observe(metrics, "track", mark, clock)
+            # On "skip" nothing moved, so the previous tracks are still valid and
+            # cannot have crossed the line.
+            events = counter.update(tracks, frame.shape[1], frame.shape[0]) if action != "skip" else []
             track_boxes = {track_id: (x1, y1, x2, y2) for track_id, x1, y1, x2, y2 in tracks}
             for track_id, direction in events:
                 event = EntranceEvent(
@@ -93,71 +268,386 @@ def process_camera(
                     track_id=track_id,
                 )
                 event_store.add_event(event)
+                if live_updates is not None:
+                    live_updates.publish(
+                        {
+                            "type": "event",
+                            "camera_id": event.camera_id,
+                            "timestamp": event.timestamp.isoformat(),
+                            "direction": event.direction,
+                            "track_id": event.track_id,
+                        }
+                    )
                 bbox = track_boxes.get(track_id)
                 if bbox:
-                    profiler.profile(track_id, frame, bbox)
+                    profiler.submit(
+                        camera_cfg.id, track_id, frame, bbox, partial(event_store.set_attributes, event)
+                    )
             counts = counter.get_counts()
-            logger.info(
-                "Camera %s (%s): entered=%d exited=%d occupancy=%d",
-                camera_cfg.id,
-                camera_cfg.name,
-                counts["entered"],
-                counts["exited"],
-                counts["current_occupancy"],
-            )
+            if live_updates is not None:
+                _publish_live(live_updates, camera_cfg.id, counts, last_counts, tracks, frame, timestamp)
+            last_counts = counts
+            mark = _observe(metrics, "count", mark, clock)
+            if mark >= next_summary:
+                next_summary = mark + summary_interval
+                _log_summary(camera_cfg, metrics, counts)
 
-            annotated = _annotate_frame(frame, tracks, counts)
-            frame_buffer.update(annotated)
+            if frame_buffer.has_subscribers() and mark >= next_preview:
+                next_preview = mark + preview_interval
+                annotated = _annotate_frame(frame, tracks, counts, pool, region_px, preview_width)
+                frame_buffer.update(annotated, pool.recycle)
+                _observe(metrics, "annotate", mark, clock)
         except Exception:
             logger.exception("Camera %s: error processing frame", camera_cfg.id)
+        decode_started = clock()
+    stream.release()
 
 
-def start_camera_threads(
-    config: AppConfig,
-    detector: PersonDetector,
-    event_store: EventStore,
-    profiler: CustomerProfiler,
-    frame_buffers: Dict[str, FrameBuffer],
-) -> Dict[str, EntranceCounter]:
-    counters: Dict[str, EntranceCounter] = {}
-    for camera_cfg in config.cameras:
-        counter = EntranceCounter(camera_id=camera_cfg.id, entrance_line=camera_cfg.entrance_line)
-        tracker = PersonTracker()
-        counters[camera_cfg.id] = counter
-        frame_buffer = FrameBuffer()
-        frame_buffers[camera_cfg.id] = frame_buffer
+def create_trackers(
+    config: AppConfig, cameras: List[CameraConfig] | None = None
+) -> Dict[str, PersonTracker]:
+    """Build one tracker per camera, sharing an appearance embedder when there are several."""
+
+    cameras = config.cameras if cameras is None else cameras
+    embedder = None
+    if len(cameras) > 1:
+        embedder = create_shared_embedder(
+            config.tracker_type,
+            max_batch_size=config.embedder_batch_size,
+            max_wait_ms=config.embedder_max_wait_ms,
+        )
+    return {
+        camera_cfg.id: PersonTracker(
+            tracker_type=config.tracker_type,
+            embedder=embedder,
+            embedding_refresh_interval=config.embedding_refresh_interval,
+            embedding_max_staleness=config.embedding_max_staleness,
+        )
+        for camera_cfg in cameras
+    }
+
+
+def _needs_restart(old: CameraConfig, new: CameraConfig) -> bool:
+    """Whether a camera change needs a new processing thread, not just a moved line."""
+
+    line_only = old.model_copy(update={"name": new.name, "entrance_line": new.entrance_line})
+    return line_only != new or old.detection_region() != new.detection_region()
+
+
+class CameraThreadPool:
+    """Camera processing threads of one process, restartable one camera at a time.
+
+    ``apply`` diffs a new configuration against the running cameras: moved
+    entrance lines are applied to the live ``EntranceCounter``; other changes
+    restart only that camera's thread, keeping its counter, tracker and frame
+    buffer. The detector, profiler and every unchanged camera keep running
+    untouched.
+
+    ``counters`` and ``frame_buffers`` are copied before ``apply`` changes
+    them, so dicts already handed to the API are never resized while request
+    threads iterate them; callers publish the new dicts afterwards. A thread
+    that does not stop within ``stop_timeout`` (e.g. blocked on an unreachable
+    RTSP source) is not restarted alongside its successor, since trackers and
+    counters are not thread-safe: the camera is reported as ``pending`` and
+    restarted by a later ``apply``.
+    """
+
+    def __init__(
+        self,
+        config: AppConfig,
+        detector: PersonDetector | BatchedDetector,
+        event_store: EventStore,
+        profiler: CustomerProfiler,
+        live_updates: LiveUpdates | None = None,
+        metrics: MetricsRegistry | None = None,
+        stop_timeout: float = 10.0,
+    ) -> None:
+        self.config = config
+        self.detector = detector
+        self.event_store = event_store
+        self.profiler = profiler
+        self.live_updates = live_updates
+        self.metrics = metrics
+        self.stop_timeout = stop_timeout
+        self.cameras: Dict[str, CameraConfig] = {}
+        self.counters: Dict[str, EntranceCounter] = {}
+        self.frame_buffers: Dict[str, FrameBuffer] = {}
+        self.trackers: Dict[str, PersonTracker] = {}
+        self._threads: Dict[str, tuple[threading.Thread, threading.Event]] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> Dict[str, EntranceCounter]:
+        with self._lock:
+            self.trackers.update(create_trackers(self.config))
+            today = self.event_store.summarize_daily_counts(date.today())
+            for camera_cfg in self.config.cameras:
+                self._start_camera(camera_cfg, today)
+        return self.counters
+
+    def apply(self, config: AppConfig) -> Dict[str, List[str]]:
+        """Bring the running cameras in line with ``config.cameras``; returns what changed."""
+
+        changes: Dict[str, List[str]] = {
+            "added": [],
+            "removed": [],
+            "restarted": [],
+            "updated": [],
+            "pending": [],
+        }
+        with self._lock:
+            if config.model_copy(update={"cameras": self.config.cameras}) != self.config:
+                logger.warning("Only camera changes are applied on reload; restart to apply other settings")
+            self.counters = dict(self.counters)
+            self.frame_buffers = dict(self.frame_buffers)
+            wanted = {camera_cfg.id: camera_cfg for camera_cfg in config.cameras}
+            for camera_id in [camera_id for camera_id in self.cameras if camera_id not in wanted]:
+                # A thread that is still stuck only holds state dropped here;
+                # a camera re-added later gets a fresh counter and tracker.
+                self._stop_camera(camera_id)
+                self._threads.pop(camera_id, None)
+                for state in (self.cameras, self.counters, self.frame_buffers, self.trackers):
+                    state.pop(camera_id, None)
+                changes["removed"].append(camera_id)
+            today = None
+            for camera_id, camera_cfg in wanted.items():
+                old = self.cameras.get(camera_id)
+                if old == camera_cfg:
+                    continue
+                if old is None:
+                    if today is None:
+                        today = self.event_store.summarize_daily_counts(date.today())
+                    self._start_camera(camera_cfg, today)
+                    changes["added"].append(camera_id)
+                    continue
+                self.counters[camera_id].set_entrance_line(camera_cfg.entrance_line)
+                if not _needs_restart(old, camera_cfg):
+                    self.cameras[camera_id] = camera_cfg
+                    changes["updated"].append(camera_id)
+                elif self._stop_camera(camera_id):
+                    self._start_camera(camera_cfg, {})
+                    changes["restarted"].append(camera_id)
+                else:
+                    # Keep the old config so the next apply retries the restart.
+                    changes["pending"].append(camera_id)
+            self.config = self.config.model_copy(update={"cameras": list(config.cameras)})
+        logger.info("Applied camera configuration: %s", changes)
+        return changes
+
+    def stop(self) -> None:
+        with self._lock:
+            for camera_id in list(self._threads):
+                self._stop_camera(camera_id)
+
+    def _start_camera(self, camera_cfg: CameraConfig, today: Dict[str, dict]) -> None:
+        counter = self.counters.get(camera_cfg.id)
+        if counter is None:
+            counter = EntranceCounter(camera_id=camera_cfg.id, entrance_line=camera_cfg.entrance_line)
+            restored = today.get(camera_cfg.id)
+            if restored:
+                counter.restore_counts(int(restored["total_in_today"]), int(restored["total_out_today"]))
+            self.counters[camera_cfg.id] = counter
+        tracker = self.trackers.get(camera_cfg.id)
+        if tracker is None:
+            tracker = self.trackers[camera_cfg.id] = self._new_tracker()
+        frame_buffer = self.frame_buffers.setdefault(camera_cfg.id, FrameBuffer())
+        stop_event = threading.Event()
         thread = threading.Thread(
             target=process_camera,
-            args=(camera_cfg, detector, tracker, counter, event_store, profiler, frame_buffer),
+            args=(
+                camera_cfg,
+                self.detector,
+                tracker,
+                counter,
+                self.event_store,
+                self.profiler,
+                frame_buffer,
+                self.live_updates,
+            ),
+            kwargs={
+                "metrics": self.metrics.camera(camera_cfg.id) if self.metrics is not None else None,
+                "summary_interval": self.config.metrics_log_interval,
+                "preview_width": self.config.stream_preview_width,
+                "preview_fps": self.config.stream_preview_fps,
+                "stop_event": stop_event,
+            },
             daemon=True,
             name=f"camera-{camera_cfg.id}",
         )
+        self.cameras[camera_cfg.id] = camera_cfg
+        self._threads[camera_cfg.id] = (thread, stop_event)
         thread.start()
         logger.info("Started processing thread for camera %s", camera_cfg.id)
-    return counters
+
+    def _stop_camera(self, camera_id: str) -> bool:
+        """Stop a camera's thread; returns False (keeping it registered) if it is still running."""
+
+        entry = self._threads.get(camera_id)
+        if entry is None:
+            return True
+        thread, stop_event = entry
+        stop_event.set()
+        thread.join(timeout=self.stop_timeout)
+        if thread.is_alive():
+            logger.warning(
+                "Camera %s: processing thread did not stop within %.0fs", camera_id, self.stop_timeout
+            )
+            return False
+        del self._threads[camera_id]
+        logger.info("Stopped processing thread for camera %s", camera_id)
+        return True
+
+    def _new_tracker(self) -> PersonTracker:
+        # Join the shared embedder if the other cameras use one; a per-tracker
+        # embedder is not safe to call from several threads.
+        embedders = (tracker.embedder for tracker in self.trackers.values())
+        shared = next((embedder for embedder in embedders if isinstance(embedder, SharedEmbedder)), None)
+        return PersonTracker(
+            tracker_type=self.config.tracker_type,
+            embedder=shared,
+            embedding_refresh_interval=self.config.embedding_refresh_interval,
+            embedding_max_staleness=self.config.embedding_max_staleness,
+        )
+
+
+def _watch_config(path: str, interval: float, reload: Callable[[], object]) -> None:
+    """Call ``reload`` whenever the configuration file's modification time changes."""
+
+    last = os.path.getmtime(path)
+    while True:
+        time.sleep(interval)
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime != last:
+                last = mtime
+                reload()
+        except (OSError, ValueError):
+            logger.exception("Configuration reload from %s failed; keeping the running cameras", path)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run camera processing and the API server")
+    parser.add_argument("--config", default="config.yaml", help="Configuration file")
+    parser.add_argument(
+        "--role", choices=["standalone", "coordinator", "node"], help="Override cluster_role"
+    )
+    parser.add_argument("--node-id", help="Override node_id")
+    parser.add_argument("--api-port", type=int, help="Override api_port")
+    return parser.parse_args()
+
+
+def _load_config(args: argparse.Namespace) -> AppConfig:
+    config = load_config(args.config)
+    overrides = {"cluster_role": args.role, "node_id": args.node_id, "api_port": args.api_port}
+    overrides = {key: value for key, value in overrides.items() if value is not None}
+    if overrides:
+        config = AppConfig(**{**config.model_dump(), **overrides})
+    return config
 
 
 def main() -> None:
-    config = load_config()
+    args = _parse_args()
+    config = _load_config(args)
     logging.basicConfig(level=getattr(logging, config.log_level.upper(), logging.INFO))
-    detector = PersonDetector(model_path=config.model_path)
-    event_store = EventStore()
-    profiler = CustomerProfiler()
+    backend = SQLiteEventBackend(config.event_db_path) if config.event_db_path else None
+    event_store = EventStore(
+        retention=timedelta(hours=config.event_retention_hours),
+        max_events_per_camera=config.max_events_per_camera,
+        backend=backend,
+    )
+    event_store.restore(since=datetime.combine(date.today(), datetime.min.time()))
 
-    frame_buffers: Dict[str, FrameBuffer] = {}
-    counters = start_camera_threads(config, detector, event_store, profiler, frame_buffers)
+    live_updates = LiveUpdates()
+    metrics = MetricsRegistry()
+    camera_pool: CameraProcessPool | None = None
+    camera_threads: CameraThreadPool | None = None
+    reload_cameras: Callable[[], Dict[str, List[str]]] | None = None
+    reporter: CoordinatorClient | None = None
+    ingest = None
+    # Where camera pipelines send events and count changes: local stores, or
+    # the coordinator when this process is a cluster node.
+    event_sink, live_sink = event_store, live_updates
+    if config.cluster_role == "node":
+        config = shard_config(config)
+        reporter = CoordinatorClient(
+            config.coordinator_url,
+            config.node_id,
+            config.cluster_token,
+            interval=config.cluster_report_interval,
+        )
+        event_sink = live_sink = reporter
+    if config.cluster_role == "coordinator":
+        counters, ingest = create_coordinator(config, event_store, live_updates)
+        frame_buffers: Dict[str, FrameBuffer] = {}
+    elif config.execution_mode == "processes":
+        camera_pool = CameraProcessPool(config, event_sink, live_sink, metrics)
+        counters, frame_buffers = camera_pool.start()
+    else:
+        detector = PersonDetector(
+            model_path=config.model_path,
+            backend=config.inference_backend,
+            imgsz=config.inference_imgsz,
+        )
+        if config.detector_batch_size > 1 and len(config.cameras) > 1:
+            detector = BatchedDetector(
+                detector,
+                max_batch_size=min(config.detector_batch_size, len(config.cameras)),
+                max_wait_ms=config.detector_max_wait_ms,
+            )
+        metrics.add_detector("main", detector)
+        profiler = CustomerProfiler(workers=config.profiler_workers, max_queue=config.profiler_queue_size)
+        camera_threads = CameraThreadPool(config, detector, event_sink, profiler, live_sink, metrics)
+        counters = camera_threads.start()
+        frame_buffers = camera_threads.frame_buffers
+
+        def reload_cameras() -> Dict[str, List[str]]:
+            new_config = _load_config(args)
+            if new_config.cluster_role == "node":
+                new_config = shard_config(new_config)
+            changes = camera_threads.apply(new_config)
+            state = get_state()
+            state.config = state.config.model_copy(update={"cameras": list(camera_threads.cameras.values())})
+            state.counters = camera_threads.counters
+            state.frame_buffers = camera_threads.frame_buffers
+            return changes
 
-    init_app_state(config=config, counters=counters, event_store=event_store, frame_buffers=frame_buffers)
+    init_app_state(
+        config=config,
+        counters=counters,
+        event_store=event_store,
+        frame_buffers=frame_buffers,
+        live_updates=live_updates,
+        metrics=metrics,
+        ingest=ingest,
+        stream_urls=stream_urls(config) if config.cluster_role == "coordinator" else None,
+        reload_config=reload_cameras,
+    )
+    if reload_cameras is not None and config.config_reload_interval is not None:
+        threading.Thread(
+            target=_watch_config,
+            args=(args.config, config.config_reload_interval, reload_cameras),
+            daemon=True,
+            name="config-watcher",
+        ).start()
 
     logger.info(
         "Starting API server on http://%s:%d", config.api_host, config.api_port
     )
-    uvicorn.run(
-        app,
-        host=config.api_host,
-        port=config.api_port,
-        log_level=config.log_level.lower(),
-    )
+    try:
+        uvicorn.run(
+            app,
+            host=config.api_host,
+            port=config.api_port,
+            log_level=config.log_level.lower(),
+        )
+    finally:
+        if camera_pool is not None:
+            camera_pool.stop()
+        if camera_threads is not None:
+            camera_threads.stop()
+        if reporter is not None:
+            reporter.close()
+        if backend is not None:
+            backend.close()
 
 
 if __name__ == "__main__":
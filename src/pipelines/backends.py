@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import abc
+import argparse
+import logging
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.geometry import iou_matrix
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover - OpenCV not available in some test envs
+    cv2 = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+PERSON_CLASS_ID = 0
+BACKENDS = ("ultralytics", "onnxruntime", "openvino")
+
+# Detections for one frame as a float32 array of shape (N, 5): x1, y1, x2, y2, score.
+Detections = np.ndarray
+
+
+def _empty() -> Detections:
+    return np.empty((0, 5), dtype=np.float32)
+
+
+class UltralyticsBackend:
+    """Runs the model through ``ultralytics.YOLO`` (PyTorch)."""
+
+    def __init__(self, model_path: str, conf_threshold: float = 0.5, imgsz: int = 640) -> None:
+        from ultralytics import YOLO
+
+        self.conf_threshold = conf_threshold
+        self.imgsz = imgsz
+        self._model = YOLO(model_path)
+
+    def predict(self, frames: Sequence[np.ndarray]) -> List[Detections]:
+        results = self._model.predict(
+            list(frames),
+            conf=self.conf_threshold,
+            classes=[PERSON_CLASS_ID],
+            imgsz=self.imgsz,
+            verbose=False,
+        )
+        return [self._to_array(result) for result in results]
+
+    def _to_array(self, result) -> Detections:
+        """Convert one ultralytics result into an (N, 5) person detection array."""
+
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return _empty()
+        # Columns of ``boxes.data``: x1, y1, x2, y2, conf, cls (a track id column
+        # is inserted before conf when the model tracks, so index from the end).
+        data = boxes.data.cpu().numpy()
+        keep = (data[:, -1] == PERSON_CLASS_ID) & (data[:, -2] >= self.conf_threshold)
+        return data[keep][:, [0, 1, 2, 3, -2]].astype(np.float32, copy=False)
+
+
+def letterbox(frame: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """Resize a BGR frame into a ``size`` x ``size`` canvas, keeping its aspect ratio.
+
+    Returns:
+        The padded image, the scale factor, and the (x, y) padding offsets.
+    """
+
+    height, width = frame.shape[:2]
+    ratio = min(size / height, size / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (size - new_w) / 2.0, (size - new_h) / 2.0
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    left, top = int(round(pad_x - 0.1)), int(round(pad_y - 0.1))
+    resized = frame if (new_w, new_h) == (width, height) else cv2.resize(
+        frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+    )
+    canvas[top : top + new_h, left : left + new_w] = resized
+    return canvas, ratio, (left, top)
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy NMS over (x1, y1, x2, y2) boxes; returns kept indices by descending score."""
+
+    order = np.argsort(-scores, kind="stable")
+    keep: List[int] = []
+    while order.size:
+        best = order[0]
+        keep.append(int(best))
+        if order.size == 1:
+            break
+        overlaps = iou_matrix(boxes[best : best + 1], boxes[order[1:]])[0]
+        order = order[1:][overlaps <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class _ExportedYoloBackend(abc.ABC):
+    """Shared pre- and post-processing for YOLOv8 models exported outside PyTorch.
+
+    Frames are letterboxed to ``imgsz``, converted to RGB NCHW float32 and run
+    in one call when the model has a dynamic batch dimension (one frame at a
+    time otherwise). The raw ``(N, 4 + classes, anchors)`` output is decoded,
+    filtered to the person class, reduced with NMS and mapped back to frame
+    pixels, giving the same (N, 5) arrays as the ultralytics backend.
+    """
+
+    dynamic_batch = False
+
+    def __init__(
+        self, conf_threshold: float = 0.5, imgsz: int = 640, iou_threshold: float = 0.45
+    ) -> None:
+        self.conf_threshold = conf_threshold
+        self.imgsz = imgsz
+        self.iou_threshold = iou_threshold
+
+    @abc.abstractmethod
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        """Run the model on an NCHW float32 batch and return its raw output."""
+
+    def predict(self, frames: Sequence[np.ndarray]) -> List[Detections]:
+        if not frames:
+            return []
+        prepared = [letterbox(frame, self.imgsz) for frame in frames]
+        batch = np.stack([image for image, _, _ in prepared])
+        batch = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        if self.dynamic_batch:
+            outputs = self._run(batch)
+        else:
+            outputs = np.concatenate([self._run(batch[i : i + 1]) for i in range(len(batch))])
+        return [
+            self._decode(output, ratio, pad, frame.shape[:2])
+            for output, (_, ratio, pad), frame in zip(outputs, prepared, frames)
+        ]
+
+    def _decode(
+        self, output: np.ndarray, ratio: float, pad: Tuple[float, float], shape: Tuple[int, int]
+    ) -> Detections:
+        scores = output[4 + PERSON_CLASS_ID]
+        keep = scores >= self.conf_threshold
+        if not keep.any():
+            return _empty()
+        cx, cy, w, h = output[:4, keep]
+        scores = scores[keep]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        kept = non_max_suppression(boxes, scores, self.iou_threshold)
+        boxes, scores = boxes[kept], scores[kept]
+        # Undo the letterbox: remove padding, rescale, clip to the frame.
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= ratio
+        height, width = shape
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+        return np.column_stack([boxes, scores]).astype(np.float32, copy=False)
+
+
+class OnnxRuntimeBackend(_ExportedYoloBackend):
+    """Runs an ONNX export of the model with ONNX Runtime on the CPU."""
+
+    def __init__(self, model_path: str, conf_threshold: float = 0.5, imgsz: int = 640) -> None:
+        super().__init__(conf_threshold=conf_threshold, imgsz=imgsz)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self._session.run(None, {self._input_name: batch})[0]
+
+
+class OpenVINOBackend(_ExportedYoloBackend):
+    """Runs an OpenVINO IR export of the model on the CPU."""
+
+    def __init__(self, model_path: str, conf_threshold: float = 0.5, imgsz: int = 640) -> None:
+        super().__init__(conf_threshold=conf_threshold, imgsz=imgsz)
+        import openvino as ov
+
+        path = Path(model_path)
+        if path.is_dir():
+            path = next(path.glob("*.xml"))
+        core = ov.Core()
+        self._model = core.compile_model(str(path), "CPU", {"PERFORMANCE_HINT": "THROUGHPUT"})
+        self.dynamic_batch = self._model.input(0).get_partial_shape()[0].is_dynamic
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return self._model(batch)[self._model.output(0)]
+
+
+def create_backend(
+    name: str, model_path: str, conf_threshold: float = 0.5, imgsz: int = 640
+):
+    """Instantiate the inference backend called ``name``."""
+
+    if name == "ultralytics":
+        return UltralyticsBackend(model_path, conf_threshold=conf_threshold, imgsz=imgsz)
+    if name == "onnxruntime":
+        return OnnxRuntimeBackend(model_path, conf_threshold=conf_threshold, imgsz=imgsz)
+    if name == "openvino":
+        return OpenVINOBackend(model_path, conf_threshold=conf_threshold, imgsz=imgsz)
+    raise ValueError(f"Unknown inference backend {name!r}; expected one of {BACKENDS}")
+
+
+def export_model(
+    model_path: str,
+    backend: str,
+    int8: bool = False,
+    imgsz: int = 640,
+    data: Optional[str] = None,
+) -> str:
+    """Export a YOLOv8 ``.pt`` model for ``backend``, optionally INT8-quantized.
+
+    ONNX models are quantized with ONNX Runtime's dynamic quantization;
+    OpenVINO models use ultralytics' NNCF post-training quantization, which
+    calibrates on ``data`` (a dataset YAML, e.g. ``coco8.yaml``).
+
+    Returns:
+        Path of the exported model file or directory.
+    """
+
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    if backend == "onnxruntime":
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if not int8:
+            return str(exported)
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized = str(Path(exported).with_name(Path(exported).stem + "_int8.onnx"))
+        quantize_dynamic(str(exported), quantized, weight_type=QuantType.QUInt8)
+        return quantized
+    if backend == "openvino":
+        kwargs = {"data": data} if int8 and data else {}
+        return str(model.export(format="openvino", imgsz=imgsz, int8=int8, dynamic=True, **kwargs))
+    raise ValueError(f"Cannot export for backend {backend!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a YOLOv8 model for a CPU inference backend")
+    parser.add_argument("--model", default="yolov8n.pt", help="Source ultralytics model")
+    parser.add_argument("--backend", choices=["onnxruntime", "openvino"], required=True)
+    parser.add_argument("--int8", action="store_true", help="Quantize weights to INT8")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--data", help="Calibration dataset YAML for OpenVINO INT8")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    exported = export_model(args.model, args.backend, int8=args.int8, imgsz=args.imgsz, data=args.data)
+    logger.info("Exported %s for %s to %s", args.model, args.backend, exported)
+
+
+__all__ = [
+    "BACKENDS",
+    "Detections",
+    "OnnxRuntimeBackend",
+    "OpenVINOBackend",
+    "PERSON_CLASS_ID",
+    "UltralyticsBackend",
+    "create_backend",
+    "export_model",
+    "letterbox",
+    "non_max_suppression",
+]
+
+
+if __name__ == "__main__":
+    main()
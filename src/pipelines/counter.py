@@ -3,8 +3,10 @@ from __future__ import annotations
 import logging
 from typing import Dict, Tuple
 
+import numpy as np
+
 from src.config import LineDefinition
-from src.utils.geometry import bbox_center, crossed_line, normalized_line_to_absolute, point_side
+from src.utils.geometry import Line, normalized_line_to_absolute, point_side, points_side
 
 logger = logging.getLogger(__name__)
 
@@ -12,55 +14,128 @@ Track = Tuple[int, int, int, int, int]
 
 
 class EntranceCounter:
-    """Counts entries and exits across an entrance line."""
+    """Counts entries and exits across an entrance line.
+
+    The absolute line geometry is cached per frame resolution, all tracks are
+    tested against the line in one array operation, and positions of tracks
+    not seen for ``max_track_age`` updates are evicted so memory stays flat
+    over long uptimes.
+    """
 
-    def __init__(self, camera_id: str, entrance_line: LineDefinition) -> None:
+    def __init__(
+        self, camera_id: str, entrance_line: LineDefinition, max_track_age: int = 300
+    ) -> None:
         self.camera_id = camera_id
         self.entrance_line_def = entrance_line
+        self.max_track_age = max_track_age
         self.track_last_center: Dict[int, Tuple[float, float]] = {}
+        self._track_last_seen: Dict[int, int] = {}
+        self._frame_index = 0
+        self._geometry_key: tuple | None = None
+        self._geometry: tuple[Line, float] | None = None
         self.entered = 0
         self.exited = 0
 
-    def _outside_side(self, frame_width: int, frame_height: int) -> float:
-        abs_line = normalized_line_to_absolute(
-            (self.entrance_line_def.p1, self.entrance_line_def.p2), frame_width, frame_height
-        )
-        (x1, y1), (x2, y2) = abs_line
-        mid_x = (x1 + x2) / 2.0
-        mid_y = (y1 + y2) / 2.0
-        if mid_y < frame_height / 2.0:
-            reference_point = (mid_x, 0.0)
-        else:
-            reference_point = (mid_x, float(frame_height))
-        return point_side(reference_point, abs_line)
+    def _line_geometry(self, frame_width: int, frame_height: int) -> tuple[Line, float]:
+        """Return the absolute line and the side sign of "outside", cached per resolution."""
+
+        key = (frame_width, frame_height, self.entrance_line_def.p1, self.entrance_line_def.p2)
+        if key != self._geometry_key or self._geometry is None:
+            abs_line = normalized_line_to_absolute(
+                (self.entrance_line_def.p1, self.entrance_line_def.p2), frame_width, frame_height
+            )
+            (x1, y1), (x2, y2) = abs_line
+            mid_x = (x1 + x2) / 2.0
+            mid_y = (y1 + y2) / 2.0
+            if mid_y < frame_height / 2.0:
+                reference_point = (mid_x, 0.0)
+            else:
+                reference_point = (mid_x, float(frame_height))
+            self._geometry = (abs_line, point_side(reference_point, abs_line))
+            self._geometry_key = key
+        return self._geometry
 
     def update(
-        self, tracks: Tuple[Track, ...] | list[Track], frame_width: int, frame_height: int
+        self,
+        tracks: Tuple[Track, ...] | list[Track] | np.ndarray,
+        frame_width: int,
+        frame_height: int,
     ) -> list[tuple[int, str]]:
-        abs_line = normalized_line_to_absolute(
-            (self.entrance_line_def.p1, self.entrance_line_def.p2), frame_width, frame_height
+        """Update track positions and return (track_id, direction) line crossings.
+
+        ``tracks`` may be a sequence of (track_id, x1, y1, x2, y2) tuples or an
+        equivalent (N, 5) array.
+        """
+
+        self._frame_index += 1
+        if self._frame_index % 64 == 0:
+            self._evict_stale_tracks()
+
+        track_array = np.asarray(tracks, dtype=np.float64).reshape(-1, 5)
+        if len(track_array) == 0:
+            return []
+
+        abs_line, outside_side = self._line_geometry(frame_width, frame_height)
+        track_ids = track_array[:, 0].astype(np.int64).tolist()
+        centers = (track_array[:, 1:3] + track_array[:, 3:5]) / 2.0
+        previous = [self.track_last_center.get(track_id) for track_id in track_ids]
+        has_previous = np.array([center is not None for center in previous])
+        previous_centers = np.array(
+            [center if center is not None else (np.nan, np.nan) for center in previous]
         )
-        outside_side = self._outside_side(frame_width, frame_height)
-        events: list[tuple[int, str]] = []
 
-        for track_id, x1, y1, x2, y2 in tracks:
-            current_center = bbox_center((x1, y1, x2, y2))
-            previous_center = self.track_last_center.get(track_id)
-            if previous_center is not None and crossed_line(previous_center, current_center, abs_line):
-                prev_side = point_side(previous_center, abs_line)
-                curr_side = point_side(current_center, abs_line)
-                if prev_side * outside_side >= 0 and curr_side * outside_side < 0:
-                    self.entered += 1
-                    events.append((track_id, "in"))
-                    logger.info("Camera %s: Track %s entered", self.camera_id, track_id)
-                elif prev_side * outside_side < 0 and curr_side * outside_side >= 0:
-                    self.exited += 1
-                    events.append((track_id, "out"))
-                    logger.info("Camera %s: Track %s exited", self.camera_id, track_id)
-            self.track_last_center[track_id] = current_center
+        curr_side = points_side(centers, abs_line)
+        prev_side = points_side(previous_centers, abs_line)
+        with np.errstate(invalid="ignore"):
+            crossed = has_previous & (prev_side * curr_side < 0)
+            entering = crossed & (prev_side * outside_side >= 0) & (curr_side * outside_side < 0)
+            exiting = crossed & (prev_side * outside_side < 0) & (curr_side * outside_side >= 0)
+
+        events: list[tuple[int, str]] = []
+        for index in np.flatnonzero(entering | exiting).tolist():
+            track_id = track_ids[index]
+            if entering[index]:
+                self.entered += 1
+                events.append((track_id, "in"))
+                logger.info("Camera %s: Track %s entered", self.camera_id, track_id)
+            else:
+                self.exited += 1
+                events.append((track_id, "out"))
+                logger.info("Camera %s: Track %s exited", self.camera_id, track_id)
 
+        self.track_last_center.update(zip(track_ids, map(tuple, centers.tolist())))
+        self._track_last_seen.update(dict.fromkeys(track_ids, self._frame_index))
         return events
 
+    def _evict_stale_tracks(self) -> None:
+        """Forget tracks that have not been updated for ``max_track_age`` frames."""
+
+        cutoff = self._frame_index - self.max_track_age
+        stale = [track_id for track_id, seen in self._track_last_seen.items() if seen < cutoff]
+        for track_id in stale:
+            del self._track_last_seen[track_id]
+            self.track_last_center.pop(track_id, None)
+        if stale:
+            logger.debug("Camera %s: evicted %d stale tracks", self.camera_id, len(stale))
+
+    def set_entrance_line(self, entrance_line: LineDefinition) -> None:
+        """Move the entrance line while counting continues.
+
+        Counts and track positions are kept; the cached geometry is keyed by
+        the line coordinates and is rebuilt on the next update.
+        """
+
+        self.entrance_line_def = entrance_line
+        logger.info(
+            "Camera %s: entrance line moved to %s -> %s", self.camera_id, entrance_line.p1, entrance_line.p2
+        )
+
+    def restore_counts(self, entered: int, exited: int) -> None:
+        """Resume counting from previously persisted totals (e.g. after a restart)."""
+
+        self.entered = entered
+        self.exited = exited
+
     def get_counts(self) -> dict[str, int]:
         occupancy = self.entered - self.exited
         return {"entered": self.entered, "exited": self.exited, "current_occupancy": occupancy}
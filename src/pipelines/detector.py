@@ -2,10 +2,14 @@ from __future__ import annotations
 
 import logging
 import threading
-from typing import List, Tuple
+import time
+from typing import List, Sequence, Tuple
 
 import numpy as np
-from ultralytics import YOLO
+
+from src.pipelines.backends import PERSON_CLASS_ID, Detections, create_backend
+from src.utils.batching import MicroBatcher
+from src.utils.metrics import StageStats
 
 logger = logging.getLogger(__name__)
 
@@ -16,42 +20,102 @@ class PersonDetector:
     """YOLOv8 based person detector.
 
     Loads the model once and exposes a ``detect`` method that returns
-    bounding boxes for people in the frame.
+    bounding boxes for people in the frame. ``backend`` selects the inference
+    runtime: ``"ultralytics"`` (PyTorch) or a CPU-optimized export run with
+    ``"onnxruntime"`` or ``"openvino"`` (see ``src.pipelines.backends``).
     """
 
-    def __init__(self, model_path: str = "yolov8n.pt", conf_threshold: float = 0.5) -> None:
+    def __init__(
+        self,
+        model_path: str = "yolov8n.pt",
+        conf_threshold: float = 0.5,
+        backend: str = "ultralytics",
+        imgsz: int = 640,
+    ) -> None:
         self.model_path = model_path
         self.conf_threshold = conf_threshold
-        self._model = YOLO(model_path)
+        self.backend = backend
+        self._backend = create_backend(backend, model_path, conf_threshold=conf_threshold, imgsz=imgsz)
         self._lock = threading.Lock()
-        logger.info("Loaded YOLOv8 model from %s", model_path)
+        # Time spent waiting for the model lock and running inference, per call.
+        self.lock_wait = StageStats()
+        self.inference = StageStats()
+        logger.info("Loaded YOLOv8 model from %s (%s backend)", model_path, backend)
 
-    def detect(self, frame: np.ndarray) -> List[Detection]:
+    def detect(self, frame: np.ndarray) -> Detections:
         """Run person detection on a BGR frame.
 
         Args:
             frame: BGR image as numpy array.
 
         Returns:
-            List of detections formatted as (x1, y1, x2, y2, score).
+            Array of shape (N, 5) with rows formatted as (x1, y1, x2, y2, score).
+        """
+
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames: Sequence[np.ndarray]) -> List[Detections]:
+        """Run person detection on several BGR frames in a single forward pass.
+
+        Args:
+            frames: BGR images as numpy arrays, possibly from different cameras.
+
+        Returns:
+            One (N, 5) detection array per input frame, in input order.
         """
 
+        requested = time.perf_counter()
         with self._lock:
-            results = self._model.predict(frame, conf=self.conf_threshold, verbose=False)
-        detections: List[Detection] = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is None:
-                continue
-            for box in boxes:
-                cls_id = int(box.cls[0])
-                if cls_id != 0:  # Only person class
-                    continue
-                score = float(box.conf[0])
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                detections.append((int(x1), int(y1), int(x2), int(y2), score))
-        logger.debug("Detected %d people", len(detections))
+            started = time.perf_counter()
+            batch_detections = self._backend.predict(frames)
+            self.lock_wait.observe(started - requested)
+            self.inference.observe(time.perf_counter() - started)
+        logger.debug(
+            "Detected %s people in batch of %d frames",
+            [len(d) for d in batch_detections],
+            len(batch_detections),
+        )
+        return batch_detections
+
+
+class BatchedDetector:
+    """Detector service that batches frames from all camera threads.
+
+    Camera threads call ``detect`` exactly as they would on a
+    ``PersonDetector``; pending frames are gathered into a single
+    ``detect_batch`` call and each caller receives its own detections.
+    """
+
+    def __init__(
+        self, detector: PersonDetector, max_batch_size: int = 8, max_wait_ms: float = 5.0
+    ) -> None:
+        self.detector = detector
+        self._batcher: MicroBatcher[np.ndarray, Detections] = MicroBatcher(
+            detector.detect_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="detector-batcher",
+        )
+        # Time from submitting a frame to receiving its detections.
+        self.batch_wait = StageStats()
+        self._stats_lock = threading.Lock()
+        logger.info(
+            "Batched detection enabled (max_batch_size=%d, max_wait_ms=%.1f)",
+            max_batch_size,
+            max_wait_ms,
+        )
+
+    def detect(self, frame: np.ndarray) -> Detections:
+        """Queue ``frame`` for the next batch and return its detections."""
+
+        submitted = time.perf_counter()
+        detections = self._batcher.submit(frame)
+        with self._stats_lock:
+            self.batch_wait.observe(time.perf_counter() - submitted)
         return detections
 
+    def close(self) -> None:
+        self._batcher.close()
+
 
-__all__ = ["PersonDetector", "Detection"]
+__all__ = ["PersonDetector", "BatchedDetector", "Detection", "Detections", "PERSON_CLASS_ID"]
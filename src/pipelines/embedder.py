@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+
+class SharedEmbedder:
+    """Appearance (ReID) embedder shared by the DeepSORT trackers of all cameras.
+
+    Only one embedding network is loaded per process. Trackers call ``predict``
+    with the crops of their own detections exactly as they would call a
+    DeepSORT embedder; crops submitted by different camera threads at about the
+    same time are concatenated into one forward pass and each caller receives
+    the embeddings for its own crops, in order.
+    """
+
+    def __init__(
+        self, embedder=None, max_batch_size: int = 64, max_wait_ms: float = 5.0
+    ) -> None:
+        if embedder is None:
+            from deep_sort_realtime.embedder.embedder_pytorch import MobileNetv2_Embedder
+
+            embedder = MobileNetv2_Embedder(half=True, max_batch_size=max_batch_size, bgr=True)
+        self.embedder = embedder
+        # Each queued item is one tracker's list of crops, so the batch size
+        # here bounds the number of cameras per pass, not the number of crops.
+        self._batcher: MicroBatcher[List[np.ndarray], List[np.ndarray]] = MicroBatcher(
+            self._embed_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="embedder-batcher",
+        )
+        logger.info(
+            "Shared embedder enabled (max_batch_size=%d, max_wait_ms=%.1f)", max_batch_size, max_wait_ms
+        )
+
+    def predict(self, crops: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Return one embedding per BGR crop, batched with other cameras' crops."""
+
+        if not crops:
+            return []
+        return self._batcher.submit(list(crops))
+
+    def _embed_batch(self, requests: List[List[np.ndarray]]) -> List[List[np.ndarray]]:
+        crops = [crop for request in requests for crop in request]
+        embeddings = list(self.embedder.predict(crops))
+        results: List[List[np.ndarray]] = []
+        start = 0
+        for request in requests:
+            results.append(embeddings[start : start + len(request)])
+            start += len(request)
+        return results
+
+    def close(self) -> None:
+        self._batcher.close()
+
+
+def create_shared_embedder(
+    tracker_type: str, max_batch_size: int = 64, max_wait_ms: float = 5.0
+) -> Optional[SharedEmbedder]:
+    """Build the process-wide embedder for DeepSORT, or ``None`` when it is not needed."""
+
+    if tracker_type != "deepsort":
+        return None
+    try:
+        return SharedEmbedder(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    except Exception:
+        logger.exception("Failed to load shared embedder; trackers will load their own")
+        return None
+
+
+__all__ = ["SharedEmbedder", "create_shared_embedder"]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import logging
+from typing import Literal, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GateAction = Literal["detect", "predict", "skip"]
+
+
+class DetectionGate:
+    """Per-camera decision of whether a frame needs full detection.
+
+    Two cheap mechanisms sit in front of the detector:
+
+    * Motion gating compares a small grayscale thumbnail of each frame with the
+      one of the last frame that ran detection, so slow movement accumulates
+      until it shows. When less than ``motion_threshold`` of the pixels changed,
+      nothing in the scene moved, so neither detection nor tracking is needed.
+    * Stride-based detection runs the detector only every ``detect_stride``
+      frames; the tracker predicts positions on the frames in between.
+
+    ``check`` returns ``"detect"``, ``"predict"`` or ``"skip"``.
+    """
+
+    def __init__(
+        self,
+        detect_stride: int = 1,
+        motion_threshold: Optional[float] = None,
+        thumbnail_width: int = 160,
+        pixel_delta: int = 25,
+    ) -> None:
+        if detect_stride < 1:
+            raise ValueError("detect_stride must be at least 1")
+        self.detect_stride = detect_stride
+        self.motion_threshold = motion_threshold
+        self.thumbnail_width = thumbnail_width
+        self.pixel_delta = pixel_delta
+        # Thumbnails of the last detected frame and of the frame being checked.
+        self._reference_thumb: Optional[np.ndarray] = None
+        self._current_thumb: Optional[np.ndarray] = None
+        self._frames_since_detect = detect_stride
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        scale = self.thumbnail_width / float(width)
+        size = (self.thumbnail_width, max(1, int(round(height * scale))))
+        thumb = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        return thumb
+
+    def has_motion(self, frame: np.ndarray) -> bool:
+        """Return True if the frame differs noticeably from the last frame that ran detection."""
+
+        thumb = self._current_thumb = self._thumbnail(frame)
+        reference = self._reference_thumb
+        if reference is None or reference.shape != thumb.shape:
+            return True
+        changed = np.count_nonzero(cv2.absdiff(thumb, reference) > self.pixel_delta)
+        return changed >= self.motion_threshold * thumb.size
+
+    def check(self, frame: np.ndarray) -> GateAction:
+        """Decide how the pipeline should handle ``frame``."""
+
+        if self.motion_threshold is not None and not self.has_motion(frame):
+            # Keep the stride phase so detection resumes as soon as motion returns.
+            self._frames_since_detect = self.detect_stride
+            return "skip"
+
+        if self._frames_since_detect >= self.detect_stride:
+            self._frames_since_detect = 1
+            if self._current_thumb is not None:
+                self._reference_thumb = self._current_thumb
+            return "detect"
+        self._frames_since_detect += 1
+        return "predict"
+
+
+__all__ = ["DetectionGate", "GateAction"]
@@ -1,24 +1,176 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 
+try:
+    import cv2
+except ImportError:  # pragma: no cover - OpenCV not available in some test envs
+    cv2 = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
 BBox = Tuple[int, int, int, int]
+Attributes = Dict[str, str]
+
+# Named clothing colors in BGR.
+PALETTE: Dict[str, Tuple[int, int, int]] = {
+    "black": (30, 30, 30),
+    "white": (235, 235, 235),
+    "gray": (128, 128, 128),
+    "red": (40, 40, 200),
+    "orange": (30, 130, 240),
+    "yellow": (40, 220, 230),
+    "green": (60, 150, 50),
+    "blue": (180, 90, 30),
+    "navy": (90, 40, 20),
+    "purple": (140, 50, 120),
+    "pink": (180, 140, 240),
+    "brown": (40, 70, 120),
+    "beige": (160, 200, 220),
+}
+
+# Vertical bands of the person box, as fractions of its height.
+_TOP_BAND = (0.15, 0.5)
+_BOTTOM_BAND = (0.55, 0.9)
+
+
+def _to_lab(pixels: np.ndarray) -> np.ndarray:
+    """Convert (N, 3) uint8 BGR pixels to float Lab (or plain BGR without OpenCV)."""
+
+    if cv2 is None:
+        return pixels.astype(np.float32)
+    return cv2.cvtColor(pixels.reshape(-1, 1, 3), cv2.COLOR_BGR2LAB).reshape(-1, 3).astype(np.float32)
 
 
 class CustomerProfiler:
-    """Stub profiler for future anonymous attributes."""
+    """Anonymous appearance attributes for people crossing the entrance line.
+
+    Currently extracts the dominant top and bottom clothing colors: pixels of
+    each band of the person crop are subsampled and quantized to the nearest
+    ``PALETTE`` color in Lab space in one vectorized distance computation.
+
+    ``submit`` never blocks the camera thread: crops go to a bounded queue
+    served by ``workers`` background threads (work is dropped when the queue
+    is full), and results are cached per (camera, track id) so each person is
+    profiled at most once no matter how often they cross.
+    """
 
-    def profile(self, track_id: int, frame: np.ndarray, bbox: BBox) -> Dict[str, str]:
-        # TODO: Integrate age/gender and clothing color models here.
+    def __init__(
+        self,
+        workers: int = 1,
+        max_queue: int = 64,
+        max_cache: int = 10_000,
+        max_pixels: int = 2048,
+    ) -> None:
+        self.max_cache = max_cache
+        self.max_pixels = max_pixels
+        self.dropped = 0
+        self._names = list(PALETTE)
+        self._palette = _to_lab(np.array([PALETTE[name] for name in self._names], dtype=np.uint8))
+        self._queue: "queue.Queue[Optional[Tuple[Tuple[str, int], np.ndarray]]]" = queue.Queue(max_queue)
+        self._cache: "OrderedDict[Tuple[str, int], Attributes]" = OrderedDict()
+        self._waiting: Dict[Tuple[str, int], List[Callable[[Attributes], None]]] = {}
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._run, daemon=True, name=f"profiler-{index}")
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def profile(self, track_id: int, frame: np.ndarray, bbox: BBox) -> Attributes:
+        """Synchronously extract attributes of the person at ``bbox`` in ``frame``."""
+
+        x1, y1, x2, y2 = (max(0, int(v)) for v in bbox)
+        return self._extract(frame[y1:y2, x1:x2])
+
+    def submit(
+        self,
+        camera_id: str,
+        track_id: int,
+        frame: np.ndarray,
+        bbox: BBox,
+        callback: Callable[[Attributes], None],
+    ) -> bool:
+        """Profile a person in the background and pass the attributes to ``callback``.
+
+        The callback runs on a profiler thread, or immediately when the track
+        has been profiled before. Returns False if the work was dropped because
+        the queue is full.
+        """
+
+        key = (camera_id, track_id)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None and key in self._waiting:
+                self._waiting[key].append(callback)
+                return True
+            if cached is None:
+                x1, y1, x2, y2 = (max(0, int(v)) for v in bbox)
+                # Copy the crop: the camera thread reuses frame memory.
+                crop = frame[y1:y2, x1:x2].copy()
+                try:
+                    self._queue.put_nowait((key, crop))
+                except queue.Full:
+                    self.dropped += 1
+                    return False
+                self._waiting[key] = [callback]
+                return True
+            self._cache.move_to_end(key)
+        callback(cached)
+        return True
+
+    def close(self) -> None:
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5.0)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, crop = item
+            try:
+                attributes = self._extract(crop)
+            except Exception:
+                logger.exception("Profiling failed for camera %s track %s", *key)
+                attributes = {}
+            with self._lock:
+                self._cache[key] = attributes
+                while len(self._cache) > self.max_cache:
+                    self._cache.popitem(last=False)
+                callbacks = self._waiting.pop(key, [])
+            for callback in callbacks:
+                try:
+                    callback(attributes)
+                except Exception:
+                    logger.exception("Profiler callback failed")
+
+    def _extract(self, crop: np.ndarray) -> Attributes:
         return {
-            "track_id": track_id,
-            "age_group": "unknown",
-            "gender": "unknown",
-            "top_color": "unknown",
-            "bottom_color": "unknown",
+            "top_color": self._dominant_color(crop, _TOP_BAND),
+            "bottom_color": self._dominant_color(crop, _BOTTOM_BAND),
         }
 
+    def _dominant_color(self, crop: np.ndarray, band: Tuple[float, float]) -> str:
+        height = crop.shape[0]
+        region = crop[int(height * band[0]) : int(height * band[1])]
+        if region.ndim != 3 or region.size == 0:
+            return "unknown"
+        step = max(1, int(np.sqrt(region.shape[0] * region.shape[1] / self.max_pixels)))
+        pixels = np.ascontiguousarray(region[::step, ::step, :3]).reshape(-1, 3)
+        lab = _to_lab(pixels)
+        distances = ((lab[:, None, :] - self._palette[None, :, :]) ** 2).sum(axis=2)
+        votes = np.bincount(distances.argmin(axis=1), minlength=len(self._names))
+        return self._names[int(votes.argmax())]
+
 
-__all__ = ["CustomerProfiler"]
+__all__ = ["CustomerProfiler", "PALETTE"]
@@ -1,9 +1,23 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from deep_sort_realtime.deepsort_tracker import DeepSort
+import numpy as np
+
+from src.pipelines.backends import Detections
+from src.utils.geometry import iou_matrix
+
+try:
+    from deep_sort_realtime.deepsort_tracker import DeepSort
+except ImportError:  # pragma: no cover - DeepSORT is optional with tracker_type "iou"
+    DeepSort = None  # type: ignore
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # pragma: no cover - fall back to greedy assignment
+    linear_sum_assignment = None  # type: ignore
 
 logger = logging.getLogger(__name__)
 
@@ -11,146 +25,378 @@ Track = Tuple[int, int, int, int, int]
 Detection = Tuple[int, int, int, int, float]
 
 
-def _iou(boxA, boxB) -> float:
-    # boxes as (l,t,w,h)
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
-    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
-    interW = max(0, xB - xA)
-    interH = max(0, yB - yA)
-    interArea = interW * interH
-    boxAArea = boxA[2] * boxA[3]
-    boxBArea = boxB[2] * boxB[3]
-    union = boxAArea + boxBArea - interArea
-    return float(interArea) / union if union > 0 else 0.0
+def _as_detection_array(detections: Detections | Sequence[Detection]) -> np.ndarray:
+    """Return detections as a float32 (N, 5) array without copying arrays."""
+
+    return np.asarray(detections, dtype=np.float32).reshape(-1, 5)
 
 
-class _SimpleIOUTracker:
-    """Very small IOU tracker to provide stable IDs when DeepSORT fails.
+def _crop_detections(frame: np.ndarray, detections: np.ndarray) -> List[np.ndarray]:
+    """Crop each detection box out of ``frame``, clipped to the image (1x1 if empty)."""
 
-    Tracks are represented as dicts with `id` and `bbox`=(l,t,w,h). Matching is
-    greedy by highest IOU > threshold.
+    im_h, im_w = frame.shape[:2]
+    crops = []
+    for x1, y1, x2, y2 in detections[:, :4].astype(int).tolist():
+        l_c, t_c = max(0, x1), max(0, y1)
+        r_c, b_c = min(im_w, x2), min(im_h, y2)
+        if r_c <= l_c or b_c <= t_c:
+            crops.append(frame[0:1, 0:1])
+        else:
+            crops.append(frame[t_c:b_c, l_c:r_c])
+    return crops
+
+
+def _assign(iou: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """Match rows (tracks) to columns (detections) maximizing total IoU.
+
+    Uses the Hungarian algorithm when SciPy is available and otherwise a greedy
+    pass over all pairs sorted by descending IoU. Pairs below ``threshold`` are
+    never matched.
+    """
+
+    if iou.size == 0:
+        return []
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(iou, maximize=True)
+        return [(r, c) for r, c in zip(rows.tolist(), cols.tolist()) if iou[r, c] >= threshold]
+
+    candidates = np.argwhere(iou >= threshold)
+    order = np.argsort(-iou[candidates[:, 0], candidates[:, 1]], kind="stable")
+    used_rows: set[int] = set()
+    used_cols: set[int] = set()
+    matches: List[Tuple[int, int]] = []
+    for r, c in candidates[order].tolist():
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        matches.append((r, c))
+    return matches
+
+
+class IOUTracker:
+    """Lightweight vectorized IOU tracker.
+
+    Track state lives in parallel NumPy arrays (ids, boxes as x1/y1/x2/y2,
+    per-frame velocity, frames since the last observation, and lost count).
+    Each update builds the full track/detection IoU matrix in one operation
+    and solves the assignment globally, so a track never steals a detection
+    that fits another track better. It is used directly with
+    ``tracker_type: iou`` and as the fallback when DeepSORT is unavailable.
     """
 
     def __init__(self, iou_threshold: float = 0.3, max_lost: int = 5) -> None:
         self.iou_threshold = iou_threshold
         self.max_lost = max_lost
         self._next_id = 1
-        self.tracks: dict[int, dict] = {}
-
-    def update(self, detections: List[Detection]) -> List[Track]:
-        det_boxes = [ (x1, y1, x2 - x1, y2 - y1) for (x1, y1, x2, y2, score) in detections ]
-        updated = {}
-
-        # match existing tracks
-        for tid, t in self.tracks.items():
-            best_iou = 0.0
-            best_idx = None
-            for i, db in enumerate(det_boxes):
-                iou_score = _iou(t["bbox"], db)
-                if iou_score > best_iou:
-                    best_iou = iou_score
-                    best_idx = i
-            if best_idx is not None and best_iou >= self.iou_threshold:
-                updated[tid] = {"bbox": det_boxes[best_idx], "lost": 0}
-                det_boxes[best_idx] = None
-            else:
-                # not matched
-                t["lost"] = t.get("lost", 0) + 1
-                if t["lost"] <= self.max_lost:
-                    updated[tid] = t
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float64)
+        self.observed = np.empty((0, 4), dtype=np.float64)
+        self.velocity = np.empty((0, 2), dtype=np.float64)
+        self.steps = np.empty(0, dtype=np.int64)
+        self.lost = np.empty(0, dtype=np.int64)
+
+    def update(self, detections: Detections | List[Detection]) -> List[Track]:
+        det_boxes = _as_detection_array(detections)[:, :4].astype(np.float64)
+        matches = _assign(iou_matrix(self.boxes, det_boxes), self.iou_threshold)
 
-        # create new tracks for unmatched detections
-        for db in det_boxes:
-            if db is None:
-                continue
-            tid = self._next_id
-            self._next_id += 1
-            updated[tid] = {"bbox": db, "lost": 0}
+        track_idx = np.array([m[0] for m in matches], dtype=np.int64)
+        det_idx = np.array([m[1] for m in matches], dtype=np.int64)
+        if len(matches):
+            new_boxes = det_boxes[det_idx]
+            elapsed = (self.steps[track_idx] + 1)[:, None]
+            self.velocity[track_idx] = (new_boxes[:, :2] - self.observed[track_idx, :2]) / elapsed
+            self.boxes[track_idx] = new_boxes
+            self.observed[track_idx] = new_boxes
+            self.steps[track_idx] = 0
+            self.lost[track_idx] = 0
 
-        self.tracks = updated
+        unmatched = np.ones(len(self.ids), dtype=bool)
+        unmatched[track_idx] = False
+        self.lost[unmatched] += 1
+        keep = self.lost <= self.max_lost
+        self._select(keep)
 
+        new_mask = np.ones(len(det_boxes), dtype=bool)
+        new_mask[det_idx] = False
+        new_boxes = det_boxes[new_mask]
+        if len(new_boxes):
+            count = len(new_boxes)
+            new_ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+            self._next_id += count
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.boxes = np.concatenate([self.boxes, new_boxes])
+            self.observed = np.concatenate([self.observed, new_boxes])
+            self.velocity = np.concatenate([self.velocity, np.zeros((count, 2))])
+            self.steps = np.concatenate([self.steps, np.zeros(count, dtype=np.int64)])
+            self.lost = np.concatenate([self.lost, np.zeros(count, dtype=np.int64)])
+        return self._output()
+
+    def predict(self) -> List[Track]:
+        """Advance every track by its velocity for a frame without detections."""
+
+        self.boxes += np.tile(self.velocity, 2)
+        self.steps += 1
+        return self._output()
+
+    def _select(self, mask: np.ndarray) -> None:
+        self.ids = self.ids[mask]
+        self.boxes = self.boxes[mask]
+        self.observed = self.observed[mask]
+        self.velocity = self.velocity[mask]
+        self.steps = self.steps[mask]
+        self.lost = self.lost[mask]
+
+    def _output(self) -> List[Track]:
         # return tracks in (track_id, x1, y1, x2, y2) format
-        out = []
-        for tid, info in self.tracks.items():
-            l, t, w, h = info["bbox"]
-            out.append((tid, int(l), int(t), int(l + w), int(t + h)))
-        return out
+        corners = self.boxes.astype(np.int64).tolist()
+        return [(tid, *box) for tid, box in zip(self.ids.tolist(), corners)]
+
+
+@dataclass
+class _CachedEmbedding:
+    track_id: Any
+    embedding: np.ndarray
+    box: np.ndarray
+    computed_at: int
+    last_seen: int
+
+
+class EmbeddingCache:
+    """Per-track appearance embeddings, reused while a track's match is unambiguous.
+
+    Before each tracker update, ``lookup`` compares the detections with the
+    boxes tracks were last matched to. A detection whose only overlapping
+    track overlaps it by at least ``match_iou`` (and which overlaps no other
+    detection's track) reuses that track's embedding. New, ambiguous or
+    crowded detections, tracks whose embedding is ``refresh_interval`` updates
+    old, and tracks unseen for more than ``max_staleness`` updates get a fresh
+    embedding from the model.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: int = 10,
+        max_staleness: int = 2,
+        match_iou: float = 0.5,
+        ambiguity_iou: float = 0.1,
+    ) -> None:
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.match_iou = match_iou
+        self.ambiguity_iou = ambiguity_iou
+        self._entries: Dict[Any, _CachedEmbedding] = {}
+        self._update = 0
+        self.reused = 0
+        self.computed = 0
+
+    def lookup(self, boxes: np.ndarray) -> List[Optional[_CachedEmbedding]]:
+        """Return the reusable cache entry for each (x1, y1, x2, y2) box, or ``None``."""
+
+        self._update += 1
+        found: List[Optional[_CachedEmbedding]] = [None] * len(boxes)
+        live = [e for e in self._entries.values() if self._update - e.last_seen <= self.max_staleness]
+        if not live or not len(boxes):
+            return found
+        iou = iou_matrix(boxes, np.stack([e.box for e in live]))
+        near = iou >= self.ambiguity_iou
+        unique = (
+            (iou >= self.match_iou)
+            & (near.sum(axis=1, keepdims=True) == 1)
+            & (near.sum(axis=0, keepdims=True) == 1)
+        )
+        for det, col in zip(*np.nonzero(unique)):
+            entry = live[col]
+            if self._update - entry.computed_at < self.refresh_interval:
+                found[det] = entry
+        return found
+
+    def store(
+        self,
+        matches: Iterable[Tuple[Any, int]],
+        boxes: np.ndarray,
+        embeddings: Sequence[np.ndarray],
+        reused: Sequence[Optional[_CachedEmbedding]],
+    ) -> None:
+        """Record the embedding and box of each (track_id, detection index) match."""
+
+        for track_id, det in matches:
+            source = reused[det]
+            if source is None:
+                computed_at = self._update
+            elif source.track_id == track_id:
+                computed_at = source.computed_at
+            else:
+                # The tracker matched the detection to another track than the
+                # one whose embedding we lent it; recompute next time.
+                computed_at = self._update - self.refresh_interval
+            self._entries[track_id] = _CachedEmbedding(
+                track_id, embeddings[det], boxes[det].copy(), computed_at, self._update
+            )
+        self._entries = {
+            track_id: entry
+            for track_id, entry in self._entries.items()
+            if self._update - entry.last_seen <= self.max_staleness
+        }
+
+
+def _track_id(track) -> Any:
+    """DeepSort track id as an int where possible."""
+
+    try:
+        return int(track.track_id)
+    except Exception:
+        return track.track_id
 
 
 class PersonTracker:
-    """Deep SORT based tracker for person detections."""
+    """Deep SORT based tracker for person detections.
 
-    def __init__(self) -> None:
-        try:
-            self.tracker = DeepSort(max_age=30)
-            logger.info("Initialized DeepSort tracker")
-        except Exception:
-            logger.exception("Failed to initialize DeepSort; will use IOU fallback")
-            self.tracker = None
-        # lightweight IOU tracker as a fallback when DeepSort fails
-        self._simple_tracker = _SimpleIOUTracker()
+    With ``tracker_type="iou"`` only the lightweight ``IOUTracker`` is used,
+    which is much cheaper per frame on CPU-only boxes. Pass a shared
+    ``embedder`` (see ``src.pipelines.embedder.SharedEmbedder``) to avoid
+    loading one appearance model per camera. Embeddings of stable tracks are
+    reused through an ``EmbeddingCache`` (``embedding_refresh_interval`` of 1
+    recomputes every detection on every update).
+
+    ``predict`` on frames where detection was skipped only extrapolates the
+    DeepSORT Kalman state and never advances it, so a detection stride is not
+    seen by DeepSORT as missed detections: each ``update`` is one DeepSORT step.
+    """
+
+    def __init__(
+        self,
+        tracker_type: str = "deepsort",
+        embedder=None,
+        embedding_refresh_interval: int = 10,
+        embedding_max_staleness: int = 2,
+    ) -> None:
+        self.tracker_type = tracker_type
+        self._embedding_cache = EmbeddingCache(
+            refresh_interval=embedding_refresh_interval, max_staleness=embedding_max_staleness
+        )
+        self.tracker = None
+        self.embedder = None
+        if tracker_type == "iou":
+            logger.info("Using lightweight IOU tracker")
+        elif DeepSort is None:
+            logger.warning("deep-sort-realtime is not installed; using IOU tracker")
+        else:
+            try:
+                if embedder is not None:
+                    self.tracker = DeepSort(max_age=30, embedder=None)
+                    self.embedder = embedder
+                else:
+                    self.tracker = DeepSort(max_age=30)
+                    self.embedder = self.tracker.embedder
+                logger.info("Initialized DeepSort tracker")
+            except Exception:
+                logger.exception("Failed to initialize DeepSort; will use IOU fallback")
+        # lightweight IOU tracker, also the fallback when DeepSort fails
+        self._simple_tracker = IOUTracker()
+        # Predicted frames since the last update, and frames the last update spanned.
+        self._frames_since_update = 0
+        self._update_gap = 1
 
-    def update(self, detections: List[Detection], frame=None) -> List[Track]:
+    def update(self, detections: Detections | List[Detection], frame=None) -> List[Track]:
         """Update tracker with detections.
 
         Args:
-            detections: List of detections from detector.
+            detections: (N, 5) detection array (or list of tuples) from the detector.
 
         Returns:
             List of tracks as (track_id, x1, y1, x2, y2).
         """
 
+        detections = _as_detection_array(detections)
         # Build DeepSort raw_detections format: ([l,t,w,h], conf, class)
         tracker_inputs = [
-            ([int(x1), int(y1), int(x2 - x1), int(y2 - y1)], float(score), None)
-            for (x1, y1, x2, y2, score) in detections
+            ([int(x1), int(y1), int(x2 - x1), int(y2 - y1)], score, None)
+            for x1, y1, x2, y2, score in detections.tolist()
         ]
 
-        # If DeepSort isn't available, or there are no detections, use simple IOU tracker
-        if self.tracker is None or len(tracker_inputs) == 0:
+        if self.tracker is None:
             return self._simple_tracker.update(detections)
+        self._update_gap = self._frames_since_update + 1
+        self._frames_since_update = 0
 
-        embeds = None
-        if frame is not None and getattr(self.tracker, "embedder", None) is not None:
-            crops = []
-            im_h, im_w = frame.shape[:2]
-            for raw_det in tracker_inputs:
-                bbox = raw_det[0]
-                l, t, w, h = map(int, bbox)
-                r = l + w
-                b = t + h
-                l_c = max(0, l)
-                t_c = max(0, t)
-                r_c = min(im_w, r)
-                b_c = min(im_h, b)
-                if r_c <= l_c or b_c <= t_c:
-                    crops.append(frame[0:1, 0:1])
-                else:
-                    crops.append(frame[t_c:b_c, l_c:r_c])
+        # Empty updates still go to DeepSort so unmatched tracks age out.
+        embeds = [] if len(tracker_inputs) == 0 else None
+        reused: List[Optional[_CachedEmbedding]] = []
+        if embeds is None and frame is not None and self.embedder is not None:
             try:
-                embeds = self.tracker.embedder.predict(crops)
+                embeds, reused = self._embed(frame, detections)
             except Exception:
                 logger.exception("Embedder failed; proceeding without embeddings")
 
         try:
-            tracked_objects = self.tracker.update_tracks(tracker_inputs, embeds=embeds, frame=frame)
+            tracked_objects = self.tracker.update_tracks(
+                tracker_inputs, embeds=embeds, frame=frame, others=list(range(len(tracker_inputs)))
+            )
         except Exception:
             logger.exception("DeepSort update_tracks failed; falling back to simple IOU tracker")
             return self._simple_tracker.update(detections)
 
+        if embeds:
+            matches = [
+                (tr.track_id, tr.get_det_supplementary())
+                for tr in tracked_objects
+                if tr.time_since_update == 0 and tr.get_det_supplementary() is not None
+            ]
+            self._embedding_cache.store(matches, detections[:, :4], embeds, reused)
+        return self._convert_tracks(tracked_objects)
+
+    def _embed(
+        self, frame: np.ndarray, detections: np.ndarray
+    ) -> Tuple[List[np.ndarray], List[Optional[_CachedEmbedding]]]:
+        """Embeddings for ``detections``, taken from the cache where possible."""
+
+        reused = self._embedding_cache.lookup(detections[:, :4])
+        embeds = [None if entry is None else entry.embedding for entry in reused]
+        missing = [i for i, entry in enumerate(reused) if entry is None]
+        if missing:
+            fresh = self.embedder.predict(_crop_detections(frame, detections[missing]))
+            for i, embedding in zip(missing, fresh):
+                embeds[i] = embedding
+        self._embedding_cache.reused += len(reused) - len(missing)
+        self._embedding_cache.computed += len(missing)
+        return embeds, reused
+
+    def predict(self) -> List[Track]:
+        """Extrapolate track positions for a frame on which detection was skipped.
+
+        Returns:
+            List of tracks as (track_id, x1, y1, x2, y2) at their predicted positions.
+        """
+
+        if self.tracker is None:
+            return self._simple_tracker.predict()
+        self._frames_since_update += 1
+        # Kalman velocities are per update, and updates are ``_update_gap`` frames apart.
+        fraction = self._frames_since_update / self._update_gap
+        tracks = self.tracker.tracker.tracks
+        try:
+            out: List[Track] = []
+            for tr in tracks:
+                if not tr.is_confirmed():
+                    continue
+                x, y, aspect, height = tr.mean[:4] + tr.mean[4:8] * fraction
+                width = aspect * height
+                box = (x - width / 2, y - height / 2, x + width / 2, y + height / 2)
+                out.append((_track_id(tr), *(int(v) for v in box)))
+            return out
+        except Exception:
+            logger.exception("DeepSort prediction failed; keeping tracks at their last positions")
+            return self._convert_tracks(tracks)
+
+    def _convert_tracks(self, tracked_objects) -> List[Track]:
         # Convert DeepSort track objects to our expected (id,x1,y1,x2,y2) format
         out: List[Track] = []
         for tr in tracked_objects:
             try:
                 if not getattr(tr, "is_confirmed", lambda: True)():
                     continue
-                track_id = tr.track_id
-                try:
-                    track_id = int(track_id)
-                except Exception:
-                    pass
+                track_id = _track_id(tr)
                 if hasattr(tr, "to_ltrb"):
                     l, t, r, b = tr.to_ltrb()
                 elif hasattr(tr, "to_tlbr"):
@@ -167,3 +413,6 @@ class PersonTracker:
             except Exception:
                 logger.exception("Error converting track object; skipping")
         return out
+
+
+__all__ = ["EmbeddingCache", "IOUTracker", "PersonTracker", "Track", "Detection", "Detections"]
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, List, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collect items submitted from many threads and process them in batches.
+
+    Callers block in ``submit`` until their item has been processed. A single
+    background worker waits for up to ``max_wait_ms`` after the first pending
+    item arrives (or until ``max_batch_size`` items are queued) and then hands
+    the whole batch to ``process_batch``, which must return one result per item
+    in the same order.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[T]], Sequence[R]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        name: str = "micro-batcher",
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: List[Tuple[T, Future]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, daemon=True, name=name)
+        self._worker.start()
+
+    def submit(self, item: T) -> R:
+        """Queue ``item`` for the next batch and block until its result is ready."""
+
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((item, future))
+            self._cond.notify()
+        return future.result()
+
+    def close(self) -> None:
+        """Stop the worker once all pending items have been processed."""
+
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=5.0)
+
+    def _next_batch(self) -> List[Tuple[T, Future]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                results = self._process_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"process_batch returned {len(results)} results for {len(batch)} items"
+                    )
+            except Exception as exc:
+                logger.exception("Batch of %d items failed", len(batch))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+__all__ = ["MicroBatcher"]
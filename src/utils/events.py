@@ -1,50 +1,262 @@
 from __future__ import annotations
 
+import bisect
+import heapq
+import logging
 import threading
-from collections import defaultdict
-from datetime import date, datetime
-from typing import TYPE_CHECKING, Dict, List, Literal
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, Literal, Optional
 
 if TYPE_CHECKING:
     from src.pipelines.counter import EntranceCounter
+    from src.utils.persistence import SQLiteEventBackend
 
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
+# Seconds a range query waits for queued events to reach the database.
+_FLUSH_TIMEOUT = 1.0
+
 
 class EntranceEvent(BaseModel):
     camera_id: str
     timestamp: datetime
     direction: Literal["in", "out"]
     track_id: int
+    attributes: Optional[Dict[str, str]] = None
 
 
-class EventStore:
-    """In-memory, thread-safe event repository."""
+class _CameraLog:
+    """Time-ordered events of one camera.
+
+    The lists are only ever appended to; every other change (out-of-order
+    inserts, compaction) builds new lists. A reader can therefore grab the
+    list references, ``start`` and current length under the store lock and
+    slice them after releasing it. Trimming only advances ``start``; the
+    dropped prefix is sliced off once it is an eighth of the lists.
+    """
+
+    __slots__ = ("events", "times", "start", "entered", "exited", "horizon")
 
     def __init__(self) -> None:
-        self._events: List[EntranceEvent] = []
+        self.events: List[EntranceEvent] = []
+        self.times: List[float] = []
+        # Index of the oldest live event; earlier entries are trimmed.
+        self.start = 0
+        self.entered = 0
+        self.exited = 0
+        # Events older than this timestamp may have been trimmed from memory.
+        self.horizon = float("-inf")
+
+
+class _DailyStats:
+    """Running totals of one camera for one calendar day."""
+
+    __slots__ = ("total_in", "total_out", "visits_per_hour")
+
+    def __init__(self) -> None:
+        self.total_in = 0
+        self.total_out = 0
+        self.visits_per_hour = [0] * 24
+
+
+class EventStore:
+    """In-memory, thread-safe event repository.
+
+    Events are indexed per camera in timestamp order, which serves both recent
+    event queries (the tail of the log) and time range queries (binary search).
+    Each camera keeps at most ``max_events_per_camera`` events and, when
+    ``retention`` is set, drops events older than the retention window relative
+    to the newest event. Reads take a snapshot under the lock and copy outside
+    it, so API polling never blocks camera threads calling ``add_event``.
+
+    Per-camera, per-day and per-hour counters are updated in O(1) by
+    ``add_event`` and kept for the last ``aggregate_days`` calendar days.
+
+    With a ``backend`` every event is also handed to the durable store, range
+    queries reaching past what is held in memory are answered from it, and
+    ``restore`` reloads recent history after a restart.
+    """
+
+    def __init__(
+        self,
+        retention: timedelta | None = timedelta(days=2),
+        max_events_per_camera: int = 100_000,
+        aggregate_days: int = 7,
+        backend: "SQLiteEventBackend | None" = None,
+    ) -> None:
+        self.retention = retention
+        self.max_events_per_camera = max_events_per_camera
+        self.aggregate_days = aggregate_days
+        self.backend = backend
+        # Memory holds every event newer than this; older ones live only in the backend.
+        self._memory_since = datetime.now().timestamp()
+        self._logs: Dict[str, _CameraLog] = {}
+        self._daily: Dict[date, Dict[str, _DailyStats]] = {}
         self._lock = threading.Lock()
 
     def add_event(self, event: EntranceEvent) -> None:
         with self._lock:
-            self._events.append(event)
+            self._add_locked(event)
+        if self.backend is not None:
+            self.backend.enqueue(event)
+
+    def set_attributes(self, event: EntranceEvent, attributes: Dict[str, str]) -> None:
+        """Attach profiler attributes to an event already added to the store."""
+
+        event.attributes = attributes
+        if self.backend is not None:
+            self.backend.enqueue_attributes(event)
+
+    def restore(self, since: datetime) -> int:
+        """Reload events newer than ``since`` from the backend into memory.
+
+        Intended to run once at startup, before camera workers add events.
+
+        Returns:
+            Number of events restored.
+        """
+
+        if self.backend is None:
+            return 0
+        restored = 0
+        with self._lock:
+            for event in self.backend.iter_events(start=since):
+                self._add_locked(event)
+                restored += 1
+            self._memory_since = since.timestamp()
+        logger.info("Restored %d events since %s from the event database", restored, since)
+        return restored
+
+    def _add_locked(self, event: EntranceEvent) -> None:
+        """Index an event in memory (caller holds the lock)."""
+
+        ts = event.timestamp.timestamp()
+        log = self._logs.get(event.camera_id)
+        if log is None:
+            log = self._logs[event.camera_id] = _CameraLog()
+        if not log.times or ts >= log.times[-1]:
+            log.events.append(event)
+            log.times.append(ts)
+        else:
+            index = bisect.bisect_right(log.times, ts, log.start)
+            log.events = log.events[log.start : index] + [event] + log.events[index:]
+            log.times = log.times[log.start : index] + [ts] + log.times[index:]
+            log.start = 0
+        if event.direction == "in":
+            log.entered += 1
+        else:
+            log.exited += 1
+        self._trim(log)
+        self._aggregate(event)
+
+    def _aggregate(self, event: EntranceEvent) -> None:
+        """Update the running daily aggregates (caller holds the lock)."""
+
+        day = event.timestamp.date()
+        cameras = self._daily.get(day)
+        if cameras is None:
+            cameras = self._daily[day] = {}
+            # Day rollover: forget days that fall outside the aggregate window.
+            for old_day in sorted(self._daily)[: -self.aggregate_days]:
+                del self._daily[old_day]
+            if day not in self._daily:
+                return
+        stats = cameras.get(event.camera_id)
+        if stats is None:
+            stats = cameras[event.camera_id] = _DailyStats()
+        if event.direction == "in":
+            stats.total_in += 1
+            stats.visits_per_hour[event.timestamp.hour] += 1
+        else:
+            stats.total_out += 1
+
+    def _trim(self, log: _CameraLog) -> None:
+        """Drop events beyond the size cap or retention window (caller holds the lock).
+
+        Both limits are exact for readers; the lists themselves are rebuilt in
+        chunks so trimming stays amortized O(1) per event.
+        """
+
+        cut = max(log.start, len(log.events) - self.max_events_per_camera)
+        if self.retention is not None:
+            cutoff = log.times[-1] - self.retention.total_seconds()
+            cut = max(cut, bisect.bisect_left(log.times, cutoff, log.start))
+        if cut > log.start:
+            log.start = cut
+            log.horizon = log.times[cut] if cut < len(log.times) else float("inf")
+        if log.start and log.start >= len(log.events) // 8:
+            log.events = log.events[log.start :]
+            log.times = log.times[log.start :]
+            log.start = 0
+
+    def _snapshot(self, camera_id: str) -> tuple[List[EntranceEvent], List[float], int, int]:
+        with self._lock:
+            log = self._logs.get(camera_id)
+            if log is None:
+                return [], [], 0, 0
+            return log.events, log.times, log.start, len(log.events)
+
+    def camera_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._logs)
 
     def get_recent_events(self, camera_id: str, limit: int = 50) -> List[EntranceEvent]:
+        events, _, first, size = self._snapshot(camera_id)
+        return events[max(first, size - limit) : size]
+
+    def get_events_between(
+        self, camera_id: str, start: datetime | None = None, end: datetime | None = None
+    ) -> List[EntranceEvent]:
+        """Return the camera's events with ``start <= timestamp < end`` in time order."""
+
+        return list(self.iter_events(camera_id, start, end))
+
+    def iter_events(
+        self,
+        camera_id: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[EntranceEvent]:
+        """Yield the camera's events with ``start <= timestamp < end`` in time order.
+
+        Events are produced incrementally (from a memory snapshot in chunks of
+        ``chunk_size``, or from a database cursor), so callers can stream large
+        ranges without materializing them.
+        """
+
+        if self.backend is not None and self._reaches_past_memory(camera_id, start):
+            # Don't hold a request for the writer's whole retry sequence; read what is committed.
+            if not self.backend.flush(timeout=_FLUSH_TIMEOUT):
+                logger.warning("Event database writer is behind; results may miss the newest events")
+            yield from self.backend.iter_events(camera_id=camera_id, start=start, end=end)
+            return
+        events, times, first, size = self._snapshot(camera_id)
+        lo = first if start is None else bisect.bisect_left(times, start.timestamp(), first, size)
+        hi = size if end is None else bisect.bisect_left(times, end.timestamp(), first, size)
+        for offset in range(lo, hi, chunk_size):
+            yield from events[offset : min(offset + chunk_size, hi)]
+
+    def _reaches_past_memory(self, camera_id: str, start: datetime | None) -> bool:
         with self._lock:
-            filtered = [e for e in self._events if e.camera_id == camera_id]
-        return filtered[-limit:]
+            log = self._logs.get(camera_id)
+            horizon = max(self._memory_since, log.horizon if log is not None else float("-inf"))
+        return start is None or start.timestamp() < horizon
 
     def get_counts(self, camera_id: str) -> dict[str, int]:
         with self._lock:
-            filtered = [e for e in self._events if e.camera_id == camera_id]
-        entered = sum(1 for e in filtered if e.direction == "in")
-        exited = sum(1 for e in filtered if e.direction == "out")
+            log = self._logs.get(camera_id)
+            entered, exited = (log.entered, log.exited) if log is not None else (0, 0)
         return {"entered": entered, "exited": exited, "current_occupancy": entered - exited}
 
     def get_events_for_day(self, day: date) -> List[EntranceEvent]:
         """Return all events that occurred on the given calendar day (server timezone)."""
-        with self._lock:
-            return [event for event in self._events if event.timestamp.date() == day]
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        per_camera = [self.get_events_between(camera_id, start, end) for camera_id in self.camera_ids()]
+        return list(heapq.merge(*per_camera, key=lambda event: event.timestamp))
 
     def summarize_daily_counts(
         self, day: date, counters: Dict[str, "EntranceCounter"] | None = None
@@ -52,6 +264,9 @@ class EventStore:
         """
         Aggregate per-camera statistics for the given day.
 
+        Reads the running per-day aggregates maintained by ``add_event``, so the
+        cost depends on the number of cameras rather than the number of events.
+
         Args:
             day: Calendar day to summarize.
             counters: Optional counters to source current occupancy.
@@ -61,30 +276,24 @@ class EventStore:
             current_occupancy, and visits_per_hour.
         """
 
-        events = self.get_events_for_day(day)
-        per_camera: Dict[str, dict[str, int | Dict[int, int]]] = defaultdict(
-            lambda: {"total_in_today": 0, "total_out_today": 0, "visits_per_hour": defaultdict(int)}
-        )
-        for event in events:
-            camera_stats = per_camera[event.camera_id]
-            if event.direction == "in":
-                camera_stats["total_in_today"] = int(camera_stats["total_in_today"]) + 1
-                visits_per_hour = camera_stats["visits_per_hour"]
-                if isinstance(visits_per_hour, dict):
-                    visits_per_hour[event.timestamp.hour] = visits_per_hour.get(event.timestamp.hour, 0) + 1
-            else:
-                camera_stats["total_out_today"] = int(camera_stats["total_out_today"]) + 1
+        with self._lock:
+            snapshot = {
+                camera_id: (stats.total_in, stats.total_out, list(stats.visits_per_hour))
+                for camera_id, stats in self._daily.get(day, {}).items()
+            }
 
-        for camera_id, stats in per_camera.items():
-            visits_per_hour = stats["visits_per_hour"]
-            if isinstance(visits_per_hour, defaultdict):
-                stats["visits_per_hour"] = dict(visits_per_hour)
-            occupancy = None
+        per_camera: Dict[str, dict[str, int | Dict[int, int]]] = {}
+        for camera_id, (total_in, total_out, hourly) in snapshot.items():
             if counters and camera_id in counters:
                 occupancy = counters[camera_id].get_counts().get("current_occupancy", 0)
             else:
-                occupancy = int(stats["total_in_today"]) - int(stats["total_out_today"])
-            stats["current_occupancy"] = occupancy
+                occupancy = total_in - total_out
+            per_camera[camera_id] = {
+                "total_in_today": total_in,
+                "total_out_today": total_out,
+                "visits_per_hour": {hour: count for hour, count in enumerate(hourly) if count},
+                "current_occupancy": occupancy,
+            }
 
         if counters:
             for camera_id in counters:
@@ -98,7 +307,7 @@ class EventStore:
                     },
                 )
 
-        return dict(per_camera)
+        return per_camera
 
 
 __all__ = ["EntranceEvent", "EventStore"]
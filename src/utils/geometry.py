@@ -2,9 +2,13 @@ from __future__ import annotations
 
 from typing import Tuple
 
+import numpy as np
+
 Point = Tuple[float, float]
 Line = Tuple[Point, Point]
 BBox = Tuple[int, int, int, int]
+# Normalized rectangle (x1, y1, x2, y2) with coordinates in [0, 1].
+Region = Tuple[float, float, float, float]
 
 
 def normalized_line_to_absolute(line: Line, width: int, height: int) -> Line:
@@ -17,6 +21,28 @@ def normalized_line_to_absolute(line: Line, width: int, height: int) -> Line:
     )
 
 
+def region_around_line(line: Line, margin: float) -> Region:
+    """Return the normalized bounding box of a normalized line, grown by ``margin`` and clipped."""
+
+    (x1, y1), (x2, y2) = line
+    return (
+        max(0.0, min(x1, x2) - margin),
+        max(0.0, min(y1, y2) - margin),
+        min(1.0, max(x1, x2) + margin),
+        min(1.0, max(y1, y2) + margin),
+    )
+
+
+def normalized_region_to_absolute(region: Region, width: int, height: int) -> BBox:
+    """Convert a normalized region to integer pixel bounds, at least one pixel in size."""
+
+    x1 = min(int(region[0] * width), width - 1)
+    y1 = min(int(region[1] * height), height - 1)
+    x2 = max(int(round(region[2] * width)), x1 + 1)
+    y2 = max(int(round(region[3] * height)), y1 + 1)
+    return x1, y1, x2, y2
+
+
 def bbox_center(bbox: BBox) -> Point:
     x1, y1, x2, y2 = bbox
     return ((x1 + x2) / 2.0, (y1 + y2) / 2.0)
@@ -30,6 +56,14 @@ def point_side(point: Point, line: Line) -> float:
     return (x - x1) * (y2 - y1) - (y - y1) * (x2 - x1)
 
 
+def points_side(points: np.ndarray, line: Line) -> np.ndarray:
+    """Vectorized ``point_side`` for an (N, 2) array of points."""
+
+    (x1, y1), (x2, y2) = line
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return (points[:, 0] - x1) * (y2 - y1) - (points[:, 1] - y1) * (x2 - x1)
+
+
 def crossed_line(prev_point: Point, current_point: Point, line: Line) -> bool:
     """Return True if the segment between the two points crosses the line."""
 
@@ -38,12 +72,31 @@ def crossed_line(prev_point: Point, current_point: Point, line: Line) -> bool:
     return prev_side * curr_side < 0
 
 
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Return the (len(a), len(b)) IoU matrix for two arrays of (x1, y1, x2, y2) boxes."""
+
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0.0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
 __all__ = [
     "Point",
     "Line",
     "BBox",
+    "Region",
     "normalized_line_to_absolute",
+    "region_around_line",
+    "normalized_region_to_absolute",
     "bbox_center",
     "point_side",
+    "points_side",
     "crossed_line",
+    "iou_matrix",
 ]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class LiveSubscription:
+    """One push client: a bounded asyncio queue plus its message filters."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        camera_ids: Optional[Set[str]] = None,
+        include_tracks: bool = False,
+        max_queue: int = 256,
+    ) -> None:
+        self.loop = loop
+        self.camera_ids = camera_ids
+        self.include_tracks = include_tracks
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def wants(self, message: Dict[str, Any]) -> bool:
+        if self.camera_ids is not None and message.get("camera_id") not in self.camera_ids:
+            return False
+        return message["type"] != "tracks" or self.include_tracks
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        # Runs on the subscriber's event loop. A slow client loses its oldest
+        # messages rather than growing memory without bound.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class LiveUpdates:
+    """Fan-out of pipeline updates (counts, events, track boxes) to push clients.
+
+    Camera threads call ``publish``; each message is handed to the event loop
+    of every interested subscriber with ``call_soon_threadsafe``. With no
+    subscribers publishing is a cheap no-op, and ``wants_tracks`` lets the
+    pipeline skip building per-frame track payloads nobody asked for.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: List[LiveSubscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self, camera_ids: Optional[Set[str]] = None, include_tracks: bool = False
+    ) -> LiveSubscription:
+        """Register a subscriber on the running event loop."""
+
+        subscription = LiveSubscription(asyncio.get_running_loop(), camera_ids, include_tracks)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: LiveSubscription) -> None:
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscriptions)
+
+    def wants_tracks(self, camera_id: str) -> bool:
+        return any(
+            s.include_tracks and (s.camera_ids is None or camera_id in s.camera_ids)
+            for s in self._subscriptions
+        )
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """Send ``message`` (a JSON-serializable dict with a ``type``) to subscribers."""
+
+        for subscription in self._subscriptions:
+            if not subscription.wants(message):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, message)
+            except RuntimeError:  # event loop closed under us
+                self.unsubscribe(subscription)
+
+
+__all__ = ["LiveSubscription", "LiveUpdates"]
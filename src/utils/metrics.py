@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+PIPELINE_STAGES = ("decode", "gate", "detect", "track", "count", "annotate", "encode")
+# Histogram bucket upper bounds in seconds, as used by the Prometheus exposition.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class StageStats:
+    """Latency histogram of one stage: count, sum, max and per-bucket counts (seconds).
+
+    Not locked: each instance is written by a single thread (or under the
+    caller's lock), and readers tolerate slightly stale values.
+    """
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"count": self.count, "sum": self.total, "max": self.max, "buckets": list(self.buckets)}
+
+
+class PipelineMetrics:
+    """Per-camera frame counters and per-stage latency histograms for ``process_camera``.
+
+    Only the camera's own thread writes the pipeline stages (``encode`` is
+    written by the MJPEG broadcaster). ``stream`` is set by ``process_camera``
+    so dropped frames and reconnects can be read from it.
+    """
+
+    def __init__(self, camera_id: str) -> None:
+        self.camera_id = camera_id
+        self.frames = 0
+        self.fps = 0.0
+        self.stages: Dict[str, StageStats] = {stage: StageStats() for stage in PIPELINE_STAGES}
+        self.stream: Any = None
+        self.started = time.monotonic()
+        self._window_start = time.perf_counter()
+        self._window_frames = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats()
+        stats.observe(seconds)
+
+    def count_frame(self, now: float) -> None:
+        """Count a frame at ``time.perf_counter()`` time ``now`` and refresh ``fps`` every second."""
+
+        self.frames += 1
+        self._window_frames += 1
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-data copy of all counters, suitable for pickling to another process."""
+
+        return {
+            "frames": self.frames,
+            "fps": self.fps,
+            "dropped_frames": getattr(self.stream, "dropped_frames", 0),
+            "reconnects": getattr(self.stream, "reconnects", 0),
+            "stages": {name: stats.snapshot() for name, stats in self.stages.items()},
+        }
+
+    def summary(self) -> Dict[str, object]:
+        """Frames, overall FPS and per-stage mean latency and throughput."""
+
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        stages = {
+            name: {
+                "frames": stats.count,
+                "mean_ms": round(stats.total / stats.count * 1000.0, 3) if stats.count else 0.0,
+                "max_ms": round(stats.max * 1000.0, 3),
+                "fps": round(stats.count / stats.total, 1) if stats.total else 0.0,
+            }
+            for name, stats in self.stages.items()
+        }
+        return {
+            "frames": self.frames,
+            "elapsed_s": round(elapsed, 3),
+            "fps": round(self.frames / elapsed, 1),
+            "stages": stages,
+        }
+
+
+def detector_stats(detector: Any) -> Dict[str, StageStats]:
+    """Timing histograms exposed by a ``PersonDetector`` or ``BatchedDetector``."""
+
+    inner = getattr(detector, "detector", detector)
+    stats = {name: getattr(inner, name) for name in ("lock_wait", "inference") if hasattr(inner, name)}
+    if hasattr(detector, "batch_wait"):
+        stats["batch_wait"] = detector.batch_wait
+    return stats
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Collects pipeline and detector metrics and renders them as Prometheus text.
+
+    In threaded mode camera threads write directly into the ``PipelineMetrics``
+    returned by ``camera``. Worker processes send periodic snapshots instead,
+    which ``update_remote`` stores and ``render`` merges with the locally
+    measured MJPEG encoding times.
+    """
+
+    def __init__(self) -> None:
+        self._cameras: Dict[str, PipelineMetrics] = {}
+        self._detectors: Dict[str, Any] = {}
+        self._remote_cameras: Dict[str, Dict[str, Any]] = {}
+        self._remote_detectors: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def camera(self, camera_id: str) -> PipelineMetrics:
+        with self._lock:
+            metrics = self._cameras.get(camera_id)
+            if metrics is None:
+                metrics = self._cameras[camera_id] = PipelineMetrics(camera_id)
+            return metrics
+
+    def add_detector(self, name: str, detector: Any) -> None:
+        with self._lock:
+            self._detectors[name] = detector
+
+    def update_remote(self, snapshot: Dict[str, Any]) -> None:
+        """Store a worker snapshot: ``{"worker": name, "cameras": {...}, "detector": {...}}``."""
+
+        with self._lock:
+            self._remote_cameras.update(snapshot.get("cameras", {}))
+            if snapshot.get("detector"):
+                self._remote_detectors[snapshot["worker"]] = snapshot["detector"]
+
+    def _camera_snapshots(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            local = {camera_id: metrics.snapshot() for camera_id, metrics in self._cameras.items()}
+            remote = dict(self._remote_cameras)
+        for camera_id, snapshot in remote.items():
+            merged = dict(snapshot)
+            if camera_id in local:
+                merged["stages"] = {**snapshot["stages"], "encode": local[camera_id]["stages"]["encode"]}
+            local[camera_id] = merged
+        return local
+
+    def _detector_snapshots(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            snapshots = {
+                name: {phase: stats.snapshot() for phase, stats in detector_stats(detector).items()}
+                for name, detector in self._detectors.items()
+            }
+            snapshots.update(self._remote_detectors)
+        return snapshots
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+
+        lines: List[str] = []
+        cameras = self._camera_snapshots()
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, labels: str, snapshot: Dict[str, Any]) -> None:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, snapshot["buckets"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {snapshot["count"]}')
+            lines.append(f"{name}_sum{{{labels}}} {snapshot['sum']}")
+            lines.append(f"{name}_count{{{labels}}} {snapshot['count']}")
+
+        simple = (
+            ("cctv_frames_total", "counter", "Frames processed per camera", "frames"),
+            ("cctv_fps", "gauge", "Recent processed frames per second per camera", "fps"),
+            ("cctv_dropped_frames_total", "counter", "Frames dropped by latest-frame capture", "dropped_frames"),
+            ("cctv_stream_reconnects_total", "counter", "Camera stream reconnect attempts", "reconnects"),
+        )
+        for name, kind, help_text, key in simple:
+            family(name, kind, help_text)
+            for camera_id, snapshot in cameras.items():
+                lines.append(f'{name}{{camera="{_label(camera_id)}"}} {snapshot[key]}')
+
+        family("cctv_stage_latency_seconds", "histogram", "Pipeline stage latency per camera")
+        for camera_id, snapshot in cameras.items():
+            for stage, stats in snapshot["stages"].items():
+                if stats["count"]:
+                    histogram(
+                        "cctv_stage_latency_seconds",
+                        f'camera="{_label(camera_id)}",stage="{_label(stage)}"',
+                        stats,
+                    )
+
+        family(
+            "cctv_detector_seconds",
+            "histogram",
+            "Detector lock wait, batch queue wait and inference time per detector",
+        )
+        for worker, phases in self._detector_snapshots().items():
+            for phase, stats in phases.items():
+                histogram(
+                    "cctv_detector_seconds", f'worker="{_label(worker)}",phase="{_label(phase)}"', stats
+                )
+        return "\n".join(lines) + "\n"
+
+
+__all__ = [
+    "LATENCY_BUCKETS",
+    "MetricsRegistry",
+    "PIPELINE_STAGES",
+    "PipelineMetrics",
+    "StageStats",
+    "detector_stats",
+]
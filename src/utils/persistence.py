@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from src.utils.events import EntranceEvent
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        camera_id TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        direction TEXT NOT NULL,
+        track_id INTEGER NOT NULL,
+        attributes TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_events_camera_time ON events (camera_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_events_time ON events (timestamp)",
+)
+
+_STOP = object()
+
+
+class _AttributeUpdate:
+    """Queue item asking the writer to store an event's profiler attributes."""
+
+    __slots__ = ("event",)
+
+    def __init__(self, event: EntranceEvent) -> None:
+        self.event = event
+
+
+def _dump_attributes(event: EntranceEvent) -> Optional[str]:
+    return json.dumps(event.attributes, separators=(",", ":")) if event.attributes else None
+
+
+class SQLiteEventBackend:
+    """Durable event log stored in SQLite using WAL mode.
+
+    ``enqueue`` never touches the database: events are handed to a background
+    writer thread that commits them in batches of up to ``batch_size``.
+    Profiler attributes that arrive after an event was queued are written by
+    a later ``UPDATE`` (``enqueue_attributes``). Reads open their own
+    connection, which WAL allows to run concurrently with the writer.
+
+    A batch whose write fails (e.g. the database is locked or the disk is
+    full) is retried on a fresh connection up to ``max_retries`` times,
+    waiting ``retry_interval`` seconds and doubling the wait each time.
+    Failed attempts are counted in ``write_failures``, and events of batches
+    that are given up in ``dropped_events``.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        batch_size: int = 256,
+        max_retries: int = 3,
+        retry_interval: float = 0.5,
+    ) -> None:
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        self.write_failures = 0
+        self.dropped_events = 0
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+            if "attributes" not in columns:  # databases created before attributes existed
+                conn.execute("ALTER TABLE events ADD COLUMN attributes TEXT")
+        self._writer = threading.Thread(target=self._run, daemon=True, name="event-db-writer")
+        self._writer.start()
+        logger.info("Event database opened at %s", self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def enqueue(self, event: EntranceEvent) -> None:
+        """Queue an event for the background writer."""
+
+        self._queue.put(event)
+
+    def enqueue_attributes(self, event: EntranceEvent) -> None:
+        """Queue an update of the stored attributes of a previously enqueued event."""
+
+        self._queue.put(_AttributeUpdate(event))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued event has been written or given up on.
+
+        Returns:
+            False if ``timeout`` seconds passed first, e.g. while a failing
+            batch is being retried.
+        """
+
+        done = self._queue.all_tasks_done
+        with done:
+            return done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def close(self) -> None:
+        """Commit pending events and stop the writer thread."""
+
+        self._queue.put(_STOP)
+        self._writer.join(timeout=30.0)
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                batch: List[object] = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = any(item is _STOP for item in batch)
+                events = [item for item in batch if isinstance(item, EntranceEvent)]
+                updates = [item.event for item in batch if isinstance(item, _AttributeUpdate)]
+                try:
+                    conn = self._write_with_retry(conn, events, updates)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write_with_retry(
+        self,
+        conn: sqlite3.Connection,
+        events: List[EntranceEvent],
+        updates: List[EntranceEvent],
+    ) -> sqlite3.Connection:
+        """Write a batch, retrying on a new connection; returns the connection to keep using."""
+
+        delay = self.retry_interval
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._write(conn, events, updates)
+                return conn
+            except sqlite3.Error as exc:
+                self.write_failures += 1
+                if attempt == self.max_retries:
+                    self.dropped_events += len(events)
+                    logger.error(
+                        "Dropping %d events and %d attribute updates after %d failed writes: %s",
+                        len(events),
+                        len(updates),
+                        attempt + 1,
+                        exc,
+                    )
+                    return conn
+                logger.warning("Failed to persist %d events, retrying in %.1fs: %s", len(events), delay, exc)
+            time.sleep(delay)
+            delay *= 2
+            conn.close()
+            try:
+                conn = self._connect()
+            except sqlite3.Error:
+                logger.exception("Cannot reopen event database %s", self.path)
+        return conn
+
+    def _write(
+        self,
+        conn: sqlite3.Connection,
+        events: List[EntranceEvent],
+        updates: List[EntranceEvent],
+    ) -> None:
+        if not events and not updates:
+            return
+        rows = [
+            (
+                event.camera_id,
+                event.timestamp.timestamp(),
+                event.direction,
+                event.track_id,
+                _dump_attributes(event),
+            )
+            for event in events
+        ]
+        # Inserts read the attributes at write time, so an update queued
+        # behind its own insert usually has nothing left to do.
+        update_rows: List[Tuple] = [
+            (
+                _dump_attributes(event),
+                event.camera_id,
+                event.timestamp.timestamp(),
+                event.track_id,
+                event.direction,
+            )
+            for event in updates
+        ]
+        with conn:
+            conn.executemany(
+                "INSERT INTO events (camera_id, timestamp, direction, track_id, attributes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(
+                "UPDATE events SET attributes = ? "
+                "WHERE camera_id = ? AND timestamp = ? AND track_id = ? AND direction = ?",
+                update_rows,
+            )
+        logger.debug("Persisted %d events and %d attribute updates", len(rows), len(update_rows))
+
+    def iter_events(
+        self,
+        camera_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[EntranceEvent]:
+        """Yield stored events with ``start <= timestamp < end`` in time order."""
+
+        clauses = []
+        params: list = []
+        if camera_id is not None:
+            clauses.append("camera_id = ?")
+            params.append(camera_id)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end.timestamp())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"SELECT camera_id, timestamp, direction, track_id, attributes FROM events {where} "
+                "ORDER BY timestamp, id",
+                params,
+            )
+            for camera, timestamp, direction, track_id, attributes in cursor:
+                yield EntranceEvent(
+                    camera_id=camera,
+                    timestamp=datetime.fromtimestamp(timestamp),
+                    direction=direction,
+                    track_id=track_id,
+                    attributes=json.loads(attributes) if attributes else None,
+                )
+        finally:
+            conn.close()
+
+
+__all__ = ["SQLiteEventBackend"]
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.utils.streaming import FrameBuffer, FramePool
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover - optional in tests
+    cv2 = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Header: sequence, height, width, channels, subscribers (uint64 each), followed by frame bytes.
+_HEADER_FIELDS = 5
+_SUBSCRIBERS = 4
+_HEADER_BYTES = _HEADER_FIELDS * 8
+
+
+def shared_frame_size(max_frame_bytes: int) -> int:
+    """Size of the shared memory block needed for frames up to ``max_frame_bytes``."""
+
+    return _HEADER_BYTES + max_frame_bytes
+
+
+class SharedFrameWriter:
+    """Producer side of a single-frame shared memory slot.
+
+    Used by camera worker processes in place of ``FrameBuffer``. Writes are
+    guarded by a sequence lock: the sequence number is odd while a frame is
+    being written and even once it is complete, so readers in other processes
+    can detect and retry torn reads. Frames larger than the slot are scaled
+    down to fit. The API process keeps the stream subscriber count in the
+    header so the worker knows whether anyone is watching.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._shm = shared_memory.SharedMemory(name=name)
+        # The creating (API) process owns the block; don't let this process's
+        # resource tracker unlink it when the worker exits.
+        resource_tracker.unregister(self._shm._name, "shared_memory")  # type: ignore[attr-defined]
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.uint64, buffer=self._shm.buf)
+        self._capacity = self._shm.size - _HEADER_BYTES
+
+    def has_subscribers(self) -> bool:
+        return int(self._header[_SUBSCRIBERS]) > 0
+
+    def update(self, frame: np.ndarray, recycle: Optional[Callable[[np.ndarray], None]] = None) -> None:
+        """Copy ``frame`` into the slot; it goes straight back to ``recycle`` afterwards."""
+        try:
+            self._write(frame)
+        finally:
+            if recycle is not None:
+                recycle(frame)
+
+    def _write(self, frame: np.ndarray) -> None:
+        if frame.nbytes > self._capacity:
+            if cv2 is None:
+                logger.warning("Frame of %d bytes exceeds shared slot; dropping", frame.nbytes)
+                return
+            scale = math.sqrt(self._capacity / frame.nbytes) * 0.99
+            size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        data = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf, offset=_HEADER_BYTES)
+        self._header[0] += 1  # odd: write in progress
+        self._header[1:4] = (height, width, channels)
+        np.copyto(data, frame)
+        self._header[0] += 1  # even: frame complete
+
+    def close(self) -> None:
+        del self._header
+        self._shm.close()
+
+
+class SharedFrameBuffer(FrameBuffer):
+    """``FrameBuffer`` in the API process mirroring a worker's shared memory slot.
+
+    ``poll`` copies the shared frame into a local pooled array whenever the
+    worker has published a new one, then publishes it through the normal
+    ``FrameBuffer`` interface so MJPEG broadcasting works unchanged.
+    """
+
+    def __init__(self, max_frame_bytes: int) -> None:
+        super().__init__()
+        self._shm = shared_memory.SharedMemory(create=True, size=shared_frame_size(max_frame_bytes))
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.uint64, buffer=self._shm.buf)
+        self._header[:] = 0
+        self._seen_sequence = 0
+        self._pool = FramePool()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def subscribe(self) -> None:
+        with self._cond:  # reentrant; keeps the header in step with the count
+            super().subscribe()
+            self._header[_SUBSCRIBERS] = self.subscribers
+
+    def unsubscribe(self) -> None:
+        with self._cond:
+            super().unsubscribe()
+            self._header[_SUBSCRIBERS] = self.subscribers
+
+    def poll(self, retries: int = 3) -> bool:
+        """Copy a newly published frame out of shared memory; return True if one was found."""
+
+        for _ in range(retries):
+            sequence = int(self._header[0])
+            if sequence == self._seen_sequence:
+                return False
+            if sequence % 2:
+                time.sleep(0.001)
+                continue
+            height, width, channels = (int(v) for v in self._header[1:4])
+            shape = (height, width, channels) if channels > 1 else (height, width)
+            source = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf, offset=_HEADER_BYTES)
+            frame = self._pool.acquire(shape, np.uint8)
+            np.copyto(frame, source)
+            del source
+            if int(self._header[0]) != sequence:
+                continue  # the worker wrote during our copy; retry
+            self._seen_sequence = sequence
+            self.update(frame, self._pool.recycle)
+            return True
+        return False
+
+    def close(self) -> None:
+        del self._header
+        self._shm.close()
+        self._shm.unlink()
+
+
+__all__ = ["SharedFrameBuffer", "SharedFrameWriter", "shared_frame_size"]
@@ -1,34 +1,314 @@
 from __future__ import annotations
 
+import asyncio
 import threading
-from typing import Optional
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 
 import numpy as np
 
+try:
+    import cv2
+except ImportError:  # pragma: no cover - optional in tests
+    cv2 = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
 
 class FrameBuffer:
-    """Thread-safe container for the latest annotated frame per camera."""
+    """Thread-safe container for the latest annotated frame per camera.
+
+    Frames are published by reference, not copied: ``update`` marks the array
+    read-only and bumps ``version``, and readers receive that same immutable
+    array. Readers can block in ``wait_for_frame`` (threads) or await
+    ``wait_for_frame_async`` (event loops) for a frame newer than a version they
+    have already seen instead of polling.
+
+    Stream clients ``subscribe`` while connected so the producer can skip
+    rendering frames altogether when ``has_subscribers`` is False. When the
+    last viewer leaves the frame is dropped, so the next viewer waits for a
+    fresh one instead of being shown whatever was on screen back then.
+
+    A producer that recycles its arrays passes ``recycle`` to ``update``; it
+    is called with the frame once a newer one replaced it and no reader still
+    holds a lease on it. Readers that use a frame after the wait returns take
+    a lease (``lease=True``) and hand it back with ``release``.
+    """
 
     def __init__(self) -> None:
         self._frame: Optional[np.ndarray] = None
-        self._lock = threading.Lock()
+        self._recycle: Optional[Callable[[np.ndarray], None]] = None
+        # Lease counts by frame id, and replaced frames waiting for their last lease.
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, Tuple[np.ndarray, Callable[[np.ndarray], None]]] = {}
+        self._version = 0
+        self._subscribers = 0
+        self._cond = threading.Condition()
+        # One shared future per event loop, resolved on the next update.
+        self._async_waiters: Dict[asyncio.AbstractEventLoop, asyncio.Future] = {}
 
-    def update(self, frame: np.ndarray) -> None:
-        """Store a copy of the latest frame."""
-        with self._lock:
-            self._frame = frame.copy()
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    def has_subscribers(self) -> bool:
+        return self._subscribers > 0
+
+    def subscribe(self) -> None:
+        """Register a viewer; pair every call with ``unsubscribe``."""
+        with self._cond:
+            self._subscribers += 1
+
+    def unsubscribe(self) -> None:
+        with self._cond:
+            self._subscribers = max(0, self._subscribers - 1)
+            previous, previous_recycle = self._frame, self._recycle
+            if self._subscribers or previous is None:
+                return
+            self._frame, self._recycle = None, None
+            previous_recycle = self._retire(previous, previous_recycle)
+        if previous_recycle is not None:
+            previous_recycle(previous)
+
+    def update(self, frame: np.ndarray, recycle: Optional[Callable[[np.ndarray], None]] = None) -> None:
+        """Publish ``frame``; the producer must not modify it until it is passed to ``recycle``."""
+        frame.flags.writeable = False
+        with self._cond:
+            previous, previous_recycle = self._frame, self._recycle
+            self._frame, self._recycle = frame, recycle
+            if previous is not None:
+                previous_recycle = self._retire(previous, previous_recycle)
+            self._version += 1
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, {}
+        for loop, future in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:  # event loop already closed
+                pass
+        if previous is not None and previous_recycle is not None:
+            previous_recycle(previous)
         logger.debug("FrameBuffer.update: stored frame shape=%s", getattr(frame, 'shape', None))
 
+    def release(self, frame: np.ndarray) -> None:
+        """Hand back a lease taken by ``wait_for_frame(..., lease=True)``."""
+        with self._cond:
+            key = id(frame)
+            count = self._leases.pop(key) - 1
+            if count:
+                self._leases[key] = count
+                return
+            retired = self._retired.pop(key, None)
+        if retired is not None:
+            retired[1](retired[0])
+
+    def _retire(
+        self, frame: np.ndarray, recycle: Optional[Callable[[np.ndarray], None]]
+    ) -> Optional[Callable[[np.ndarray], None]]:
+        # Called with ``_cond`` held; returns ``recycle`` if it may run right away.
+        if recycle is not None and id(frame) in self._leases:
+            self._retired[id(frame)] = (frame, recycle)
+            return None
+        return recycle
+
+    def _newer(self, after_version: int) -> bool:
+        return self._frame is not None and self._version > after_version
+
+    def _lease(self, lease: bool) -> Tuple[Optional[np.ndarray], int]:
+        # Called with ``_cond`` held.
+        if lease and self._frame is not None:
+            self._leases[id(self._frame)] = self._leases.get(id(self._frame), 0) + 1
+        return self._frame, self._version
+
     def read(self) -> Optional[np.ndarray]:
-        """Return a copy of the latest frame, if available."""
-        with self._lock:
+        """Return the latest (read-only) frame, if available."""
+        with self._cond:
             if self._frame is None:
                 logger.debug("FrameBuffer.read: no frame available")
-                return None
-            return self._frame.copy()
+            return self._frame
+
+    def wait_for_frame(
+        self, after_version: int, timeout: Optional[float] = None, lease: bool = False
+    ) -> Tuple[Optional[np.ndarray], int]:
+        """Return the latest frame once it is newer than ``after_version``.
+
+        Blocks for up to ``timeout`` seconds (``0`` polls without blocking).
+        With ``lease`` the frame is not recycled until it is passed to ``release``.
+
+        Returns:
+            The read-only frame and its version, or ``(None, version)`` if no
+            newer frame arrived in time.
+        """
+
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._newer(after_version), timeout=timeout):
+                return None, self._version
+            return self._lease(lease)
+
+    async def wait_for_frame_async(
+        self, after_version: int, timeout: Optional[float] = None, lease: bool = False
+    ) -> Tuple[Optional[np.ndarray], int]:
+        """Awaitable ``wait_for_frame`` that never blocks the event loop.
+
+        All coroutines of one loop waiting on this buffer share a single future,
+        so publishing a frame costs one loop wake-up regardless of viewer count.
+        """
+
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._newer(after_version):
+                return self._lease(lease)
+            future = self._async_waiters.get(loop)
+            if future is None:
+                future = self._async_waiters[loop] = loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            if self._newer(after_version):
+                return self._lease(lease)
+            return None, self._version
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class FramePool:
+    """Small pool of reusable frame arrays for producers.
+
+    Arrays come back through ``recycle``, which producers pass to
+    ``FrameBuffer.update`` so a published frame returns to the pool only once
+    it has been replaced and no reader holds a lease on it. Published frames
+    are therefore never overwritten in place. At most ``size`` idle arrays
+    are kept.
+    """
+
+    def __init__(self, size: int = 3) -> None:
+        self.size = size
+        self._free: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Return a writable array of ``shape`` and ``dtype`` that nobody else references."""
+
+        dtype = np.dtype(dtype)
+        with self._lock:
+            for index, buffer in enumerate(self._free):
+                if buffer.shape == shape and buffer.dtype == dtype:
+                    del self._free[index]
+                    buffer.flags.writeable = True
+                    return buffer
+        return np.empty(shape, dtype=dtype)
+
+    def recycle(self, buffer: np.ndarray) -> None:
+        """Return an array obtained from ``acquire`` that is no longer used."""
+
+        with self._lock:
+            if len(self._free) >= self.size:
+                self._free.pop(0)
+            self._free.append(buffer)
+
+
+class MjpegBroadcaster:
+    """Encode each new frame of one camera to JPEG once and share it with all viewers.
+
+    Encoding happens lazily for the first viewer that asks for a new frame
+    version; every other viewer of that version gets the cached bytes. The
+    encoding cost therefore follows the camera frame rate rather than the
+    number of connected clients, and is zero when nobody is watching.
+    """
+
+    def __init__(
+        self,
+        frame_buffer: FrameBuffer,
+        jpeg_quality: int = 80,
+        on_encode: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.frame_buffer = frame_buffer
+        self.jpeg_quality = jpeg_quality
+        # Called with the duration in seconds of every JPEG encode.
+        self.on_encode = on_encode
+        self._encode_lock = threading.Lock()
+        self._jpeg: Optional[bytes] = None
+        self._jpeg_version = 0
+        self._pending: Optional[Tuple[int, asyncio.Future]] = None
+
+    def next_jpeg(
+        self, after_version: int, timeout: Optional[float] = None
+    ) -> Tuple[Optional[bytes], int]:
+        """Wait for a frame newer than ``after_version`` and return it JPEG-encoded.
+
+        Returns:
+            The JPEG bytes and frame version, or ``(None, after_version)`` on
+            timeout or encoding failure.
+        """
+
+        frame, version = self.frame_buffer.wait_for_frame(after_version, timeout=timeout, lease=True)
+        if frame is None:
+            return None, after_version
+        return self._encode_leased(frame, version, after_version)
+
+    async def next_jpeg_async(
+        self, after_version: int, timeout: Optional[float] = None
+    ) -> Tuple[Optional[bytes], int]:
+        """Awaitable ``next_jpeg``; encoding runs in a worker thread, once per version."""
+
+        frame, version = await self.frame_buffer.wait_for_frame_async(
+            after_version, timeout=timeout, lease=True
+        )
+        if frame is None:
+            return None, after_version
+        pending = self._pending
+        if self._jpeg_version < version and (pending is None or pending[0] < version):
+            # The encode job owns the lease, so it outlives a viewer disconnecting meanwhile.
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, self._encode_leased, frame, version, after_version)
+            self._pending = pending = (version, future)
+        else:
+            self.frame_buffer.release(frame)
+            if self._jpeg_version >= version:
+                return self._jpeg, self._jpeg_version
+        return await asyncio.shield(pending[1])
+
+    def _encode_leased(
+        self, frame: np.ndarray, version: int, after_version: int
+    ) -> Tuple[Optional[bytes], int]:
+        try:
+            return self._encode_version(frame, version, after_version)
+        finally:
+            self.frame_buffer.release(frame)
+
+    def _encode_version(
+        self, frame: np.ndarray, version: int, after_version: int
+    ) -> Tuple[Optional[bytes], int]:
+        with self._encode_lock:
+            if self._jpeg_version < version:
+                started = time.perf_counter()
+                jpeg = self._encode(frame)
+                if self.on_encode is not None:
+                    self.on_encode(time.perf_counter() - started)
+                if jpeg is None:
+                    return None, after_version
+                self._jpeg, self._jpeg_version = jpeg, version
+            return self._jpeg, self._jpeg_version
+
+    def _encode(self, frame: np.ndarray) -> Optional[bytes]:
+        if cv2 is None:
+            logger.error("OpenCV not available; cannot encode JPEG frames")
+            return None
+        ret, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ret:
+            logger.error("Failed to encode frame")
+            return None
+        return jpeg.tobytes()
 
 
-__all__ = ["FrameBuffer"]
+__all__ = ["FrameBuffer", "FramePool", "MjpegBroadcaster"]
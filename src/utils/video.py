@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
 import time
-from typing import Generator, Tuple
+from typing import Generator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
 
 import cv2
 
@@ -10,49 +13,255 @@ logger = logging.getLogger(__name__)
 
 Frame = Tuple[any, float]
 
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".ts", ".webm")
+
 
 class CameraStream:
-    """RTSP camera stream with reconnect support."""
+    """RTSP camera stream with reconnect support.
+
+    With ``latest_only=True`` a background reader thread keeps decoding the
+    stream and holds only the newest frame, so a slow consumer always receives
+    the freshest frame instead of working through a growing decoder backlog.
+    Frames overwritten before they were consumed are counted in
+    ``dropped_frames`` and reconnect attempts in ``reconnects``. A reader
+    thread that dies is restarted after ``reconnect_interval``; one still
+    stuck in a read when the stream is released closes the capture itself
+    once the read returns.
+    """
 
-    def __init__(self, camera_id: str, rtsp_url: str, reconnect_interval: float = 5.0) -> None:
+    def __init__(
+        self,
+        camera_id: str,
+        rtsp_url: str,
+        reconnect_interval: float = 5.0,
+        latest_only: bool = False,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
         self.camera_id = camera_id
         self.rtsp_url = rtsp_url
         self.reconnect_interval = reconnect_interval
+        self.latest_only = latest_only
         self.capture: cv2.VideoCapture | None = None
+        self.dropped_frames = 0
+        self.reconnects = 0
+        self._latest: Optional[Frame] = None
+        self._cond = threading.Condition()
+        self._stopped = stop_event if stop_event is not None else threading.Event()
+        self._reader: threading.Thread | None = None
+        self._capture_lock = threading.Lock()
 
     def _connect(self) -> None:
         if self.capture is not None:
             self.capture.release()
+            self.reconnects += 1
         self.capture = cv2.VideoCapture(self.rtsp_url)
         if not self.capture.isOpened():
             logger.warning("Camera %s: Unable to open RTSP stream", self.camera_id)
         else:
             logger.info("Camera %s: RTSP stream opened", self.camera_id)
 
-    def frames(self) -> Generator[Frame, None, None]:
-        """Yield frames and timestamps, reconnecting on failure."""
+    def _capture_frames(self) -> Generator[Frame, None, None]:
+        """Decode frames directly from the capture, reconnecting on failure."""
 
         self._connect()
-        while True:
+        while not self._stopped.is_set():
             if self.capture is None or not self.capture.isOpened():
                 logger.info("Camera %s: Attempting to reconnect", self.camera_id)
-                time.sleep(self.reconnect_interval)
+                self._stopped.wait(self.reconnect_interval)
                 self._connect()
                 continue
 
             success, frame = self.capture.read()
             if not success or frame is None:
                 logger.warning("Camera %s: Frame read failed, reconnecting", self.camera_id)
-                time.sleep(self.reconnect_interval)
+                self._stopped.wait(self.reconnect_interval)
                 self._connect()
                 continue
 
             yield frame, time.time()
 
+    def _read_latest(self) -> None:
+        try:
+            for item in self._capture_frames():
+                with self._cond:
+                    if self._latest is not None:
+                        self.dropped_frames += 1
+                    self._latest = item
+                    self._cond.notify()
+        except Exception:
+            logger.exception("Camera %s: Capture reader failed", self.camera_id)
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+            if self._stopped.is_set():
+                self._close_capture()
+
+    def _start_reader(self) -> None:
+        self._reader = threading.Thread(
+            target=self._read_latest, daemon=True, name=f"capture-{self.camera_id}"
+        )
+        self._reader.start()
+
+    def _latest_frames(self) -> Generator[Frame, None, None]:
+        self._start_reader()
+        while not self._stopped.is_set():
+            with self._cond:
+                while self._latest is None and self._reader.is_alive() and not self._stopped.is_set():
+                    self._cond.wait(timeout=1.0)
+                item, self._latest = self._latest, None
+            if item is not None:
+                yield item
+            elif not self._reader.is_alive() and not self._stopped.wait(self.reconnect_interval):
+                logger.warning("Camera %s: Capture reader stopped; restarting it", self.camera_id)
+                self._start_reader()
+
+    def frames(self) -> Generator[Frame, None, None]:
+        """Yield frames and timestamps, reconnecting on failure."""
+
+        if self.latest_only:
+            yield from self._latest_frames()
+        else:
+            yield from self._capture_frames()
+
     def release(self) -> None:
-        if self.capture is not None:
-            self.capture.release()
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        reader = self._reader
+        if reader is not None and reader is not threading.current_thread():
+            reader.join(timeout=self.reconnect_interval)
+            if reader.is_alive():
+                # Releasing the capture under a running read is unsafe; the reader closes it on exit.
+                logger.warning("Camera %s: Capture reader still busy; leaving release to it", self.camera_id)
+                return
+        self._close_capture()
+
+    def _close_capture(self) -> None:
+        with self._capture_lock:
+            capture, self.capture = self.capture, None
+        if capture is not None:
+            capture.release()
             logger.info("Camera %s: Stream released", self.camera_id)
 
 
-__all__ = ["CameraStream"]
+def is_replay_source(url: str) -> bool:
+    """True for ``file://`` URLs and plain filesystem paths (anything without a scheme)."""
+
+    return url.startswith("file://") or "://" not in url
+
+
+def replay_paths(url: str) -> List[str]:
+    """Video files for a replay source: a single file, or a directory's segments in name order."""
+
+    path = unquote(urlparse(url).path) if url.startswith("file://") else url
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        )
+    return [path]
+
+
+class ReplayStream:
+    """Recorded-video source with the same ``frames``/``release`` interface as ``CameraStream``.
+
+    Plays a file or a directory of segments back to back. Frame timestamps
+    come from the media: ``start_time`` (epoch seconds, defaulting to the
+    first file's modification time) plus the frame's position on a timeline
+    continuous across segments. With ``realtime=True`` frames are paced to
+    the media clock; otherwise they are yielded as fast as the consumer
+    takes them. The generator ends after the last segment.
+    """
+
+    def __init__(
+        self,
+        camera_id: str,
+        source: str,
+        realtime: bool = False,
+        start_time: Optional[float] = None,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        self.camera_id = camera_id
+        self.source = source
+        self.realtime = realtime
+        self.start_time = start_time
+        self.dropped_frames = 0
+        self.reconnects = 0
+        self.frames_read = 0
+        self._stopped = stop_event if stop_event is not None else threading.Event()
+
+    def frames(self) -> Generator[Frame, None, None]:
+        """Yield frames and media timestamps from every segment in order."""
+
+        paths = replay_paths(self.source)
+        if not paths or not os.path.exists(paths[0]):
+            logger.warning("Camera %s: No video files found at %s", self.camera_id, self.source)
+            return
+        base = self.start_time if self.start_time is not None else os.path.getmtime(paths[0])
+        offset = 0.0
+        clock_start: Optional[float] = None
+        for path in paths:
+            if self._stopped.is_set():
+                return
+            capture = cv2.VideoCapture(path)
+            if not capture.isOpened():
+                logger.warning("Camera %s: Unable to open %s; skipping", self.camera_id, path)
+                continue
+            logger.info("Camera %s: Replaying %s", self.camera_id, path)
+            fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+            position = 0.0
+            index = 0
+            try:
+                while not self._stopped.is_set():
+                    success, frame = capture.read()
+                    if not success or frame is None:
+                        break
+                    position = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                    if position <= 0.0 and index and fps > 0:
+                        position = index / fps  # container without timestamps
+                    media_time = offset + position
+                    if self.realtime:
+                        if clock_start is None:
+                            clock_start = time.monotonic() - media_time
+                        delay = clock_start + media_time - time.monotonic()
+                        if delay > 0:
+                            self._stopped.wait(delay)
+                    self.frames_read += 1
+                    index += 1
+                    yield frame, base + media_time
+            finally:
+                capture.release()
+            offset += position + (1.0 / fps if fps > 0 else 0.0)
+        logger.info("Camera %s: Replay finished after %d frames", self.camera_id, self.frames_read)
+
+    def release(self) -> None:
+        self._stopped.set()
+
+
+def open_stream(
+    camera_id: str,
+    url: str,
+    latest_only: bool = False,
+    realtime: bool = True,
+    start_time: Optional[float] = None,
+    stop_event: Optional[threading.Event] = None,
+) -> CameraStream | ReplayStream:
+    """Open ``url`` as a live ``CameraStream`` or, for files and ``file://`` URLs, a ``ReplayStream``.
+
+    Setting ``stop_event`` ends the stream's ``frames`` generator, as ``release`` does.
+    """
+
+    if is_replay_source(url):
+        return ReplayStream(camera_id, url, realtime=realtime, start_time=start_time, stop_event=stop_event)
+    return CameraStream(camera_id=camera_id, rtsp_url=url, latest_only=latest_only, stop_event=stop_event)
+
+
+__all__ = [
+    "CameraStream",
+    "ReplayStream",
+    "VIDEO_EXTENSIONS",
+    "is_replay_source",
+    "open_stream",
+    "replay_paths",
+]
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import AppConfig, CameraConfig
+from src.utils.events import EntranceEvent, EventStore
+from src.utils.live import LiveUpdates
+from src.utils.metrics import MetricsRegistry, PipelineMetrics, detector_stats
+from src.utils.shared_frames import SharedFrameBuffer, SharedFrameWriter
+
+logger = logging.getLogger(__name__)
+
+# Seconds between metric snapshots sent from a worker to the API process.
+_METRICS_INTERVAL = 5.0
+# Events remembered by the API process for attaching late profiler attributes.
+_RECENT_EVENTS = 4096
+# Reporting sessions whose last batch sequence number is remembered for deduplication.
+_RECENT_SESSIONS = 1024
+
+
+class RemoteCounter:
+    """Read-only stand-in for an ``EntranceCounter`` running in a worker process.
+
+    Exposes the same ``get_counts`` interface to the API, updated from count
+    messages sent by the worker.
+    """
+
+    def __init__(self, camera_id: str, entered: int = 0, exited: int = 0) -> None:
+        self.camera_id = camera_id
+        self.entered = entered
+        self.exited = exited
+
+    def restore_counts(self, entered: int, exited: int) -> None:
+        self.entered = entered
+        self.exited = exited
+
+    def get_counts(self) -> dict[str, int]:
+        entered, exited = self.entered, self.exited
+        return {"entered": entered, "exited": exited, "current_occupancy": entered - exited}
+
+
+class _QueueEventSink:
+    """Stands in for ``EventStore`` inside a worker: forwards events to the API process."""
+
+    def __init__(self, messages: "multiprocessing.Queue") -> None:
+        self._messages = messages
+
+    def add_event(self, event: EntranceEvent) -> None:
+        self._messages.put(
+            ("event", (event.camera_id, event.timestamp.timestamp(), event.direction, event.track_id))
+        )
+
+    def set_attributes(self, event: EntranceEvent, attributes: Dict[str, str]) -> None:
+        self._messages.put(
+            (
+                "attributes",
+                (event.camera_id, event.timestamp.timestamp(), event.direction, event.track_id, attributes),
+            )
+        )
+
+
+class _QueueLiveSink:
+    """Stands in for ``LiveUpdates`` inside a worker: forwards count changes only.
+
+    Entrance events are re-published by the API process once stored, and
+    per-frame track boxes are not sent across processes.
+    """
+
+    def __init__(self, messages: "multiprocessing.Queue") -> None:
+        self._messages = messages
+
+    def has_subscribers(self) -> bool:
+        return False
+
+    def wants_tracks(self, camera_id: str) -> bool:
+        return False
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        if message.get("type") == "counts":
+            self._messages.put(("counts", message))
+
+
+def run_camera_worker(
+    config: AppConfig,
+    cameras: List[CameraConfig],
+    frame_names: Dict[str, str],
+    initial_counts: Dict[str, Tuple[int, int]],
+    messages: "multiprocessing.Queue",
+) -> None:
+    """Entry point of a camera worker process: run ``process_camera`` for a camera group."""
+
+    # Imported here: src.main imports this module to start the pool.
+    from src.main import create_trackers, process_camera
+    from src.pipelines.counter import EntranceCounter
+    from src.pipelines.detector import BatchedDetector, PersonDetector
+    from src.pipelines.profiler import CustomerProfiler
+
+    logging.basicConfig(level=getattr(logging, config.log_level.upper(), logging.INFO))
+    detector = PersonDetector(
+        model_path=config.model_path,
+        backend=config.inference_backend,
+        imgsz=config.inference_imgsz,
+    )
+    if config.detector_batch_size > 1 and len(cameras) > 1:
+        detector = BatchedDetector(
+            detector,
+            max_batch_size=min(config.detector_batch_size, len(cameras)),
+            max_wait_ms=config.detector_max_wait_ms,
+        )
+    trackers = create_trackers(config, cameras)
+    event_sink = _QueueEventSink(messages)
+    live_sink = _QueueLiveSink(messages)
+    profiler = CustomerProfiler(workers=config.profiler_workers, max_queue=config.profiler_queue_size)
+
+    metrics = {camera_cfg.id: PipelineMetrics(camera_cfg.id) for camera_cfg in cameras}
+    threads = []
+    for camera_cfg in cameras:
+        counter = EntranceCounter(camera_id=camera_cfg.id, entrance_line=camera_cfg.entrance_line)
+        counter.restore_counts(*initial_counts.get(camera_cfg.id, (0, 0)))
+        thread = threading.Thread(
+            target=process_camera,
+            args=(
+                camera_cfg,
+                detector,
+                trackers[camera_cfg.id],
+                counter,
+                event_sink,
+                profiler,
+                SharedFrameWriter(frame_names[camera_cfg.id]),
+                live_sink,
+            ),
+            kwargs={
+                "metrics": metrics[camera_cfg.id],
+                "summary_interval": config.metrics_log_interval,
+                "preview_width": config.stream_preview_width,
+                "preview_fps": config.stream_preview_fps,
+            },
+            daemon=True,
+            name=f"camera-{camera_cfg.id}",
+        )
+        thread.start()
+        threads.append(thread)
+
+    worker = multiprocessing.current_process().name
+    while any(thread.is_alive() for thread in threads):
+        messages.put(
+            (
+                "metrics",
+                {
+                    "worker": worker,
+                    "cameras": {camera_id: m.snapshot() for camera_id, m in metrics.items()},
+                    "detector": {
+                        phase: stats.snapshot() for phase, stats in detector_stats(detector).items()
+                    },
+                },
+            )
+        )
+        time.sleep(_METRICS_INTERVAL)
+
+
+class RemoteIngest:
+    """Apply event, attribute and count messages produced by remote camera pipelines.
+
+    Messages are ``(kind, payload)`` pairs as sent by ``_QueueEventSink`` and
+    ``_QueueLiveSink``, whether they arrive over a worker queue or, on a
+    cluster coordinator, over HTTP. Events are stored in ``event_store`` and
+    re-published to ``live_updates``; counts update the matching
+    ``RemoteCounter``.
+    """
+
+    def __init__(
+        self,
+        event_store: EventStore,
+        counters: Dict[str, RemoteCounter],
+        live_updates: Optional[LiveUpdates] = None,
+    ) -> None:
+        self.event_store = event_store
+        self.counters = counters
+        self.live_updates = live_updates
+        # Recent events by message key, so late profiler attributes can find them.
+        self._recent: "OrderedDict[Tuple, EntranceEvent]" = OrderedDict()
+        self._sequences: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def handle_batch(self, node: str, session: str, seq: int, messages: List[Tuple[str, Any]]) -> bool:
+        """Apply a numbered batch from a node; returns False if it was already applied.
+
+        Nodes retry a batch unchanged until it is acknowledged, so a batch whose
+        acknowledgement was lost arrives again with the same sequence number.
+        """
+
+        key = (node, session)
+        with self._lock:
+            if self._sequences.get(key, 0) >= seq:
+                return False
+            self._sequences[key] = seq
+            self._sequences.move_to_end(key)
+            while len(self._sequences) > _RECENT_SESSIONS:
+                self._sequences.popitem(last=False)
+        for kind, payload in messages:
+            self.handle(kind, payload)
+        return True
+
+    def handle(self, kind: str, payload: Any) -> None:
+        with self._lock:
+            if kind == "event":
+                self._event(tuple(payload))
+            elif kind == "attributes":
+                event = self._recent.get(tuple(payload[:4]))
+                if event is not None:
+                    self.event_store.set_attributes(event, payload[4])
+            elif kind == "counts":
+                self._counts(payload)
+            else:
+                logger.warning("Ignoring unknown message kind %r", kind)
+
+    def _event(self, key: Tuple) -> None:
+        camera_id, timestamp, direction, track_id = key
+        event = EntranceEvent(
+            camera_id=camera_id,
+            timestamp=datetime.fromtimestamp(timestamp),
+            direction=direction,
+            track_id=track_id,
+        )
+        self.event_store.add_event(event)
+        self._recent[key] = event
+        while len(self._recent) > _RECENT_EVENTS:
+            self._recent.popitem(last=False)
+        if self.live_updates is not None:
+            self.live_updates.publish(
+                {
+                    "type": "event",
+                    "camera_id": camera_id,
+                    "timestamp": event.timestamp.isoformat(),
+                    "direction": direction,
+                    "track_id": track_id,
+                }
+            )
+
+    def _counts(self, payload: Dict[str, Any]) -> None:
+        counter = self.counters.get(payload["camera_id"])
+        if counter is not None:
+            before = counter.get_counts()
+            counter.restore_counts(payload["entered"], payload["exited"])
+            after = counter.get_counts()
+            if after == before:
+                return  # periodic snapshot with nothing new
+            # Several changes may have been merged into one message.
+            payload = {**payload, **after, "delta": {key: after[key] - before[key] for key in after}}
+        if self.live_updates is not None:
+            self.live_updates.publish(payload)
+
+
+class CameraProcessPool:
+    """Run camera groups in worker processes and mirror their state in the API process.
+
+    Each group of up to ``config.cameras_per_process`` cameras gets its own
+    process (and its own detector), so tracking, counting and annotation no
+    longer compete for one interpreter's GIL. Annotated frames come back
+    through ``multiprocessing.shared_memory`` and counts and events through a
+    queue. ``start`` returns counters and frame buffers with the same
+    interfaces the API uses in threaded mode; events land in the local
+    ``EventStore`` and are re-published to ``LiveUpdates``; periodic metric
+    snapshots are merged into the ``MetricsRegistry``.
+    """
+
+    def __init__(
+        self,
+        config: AppConfig,
+        event_store: EventStore,
+        live_updates: Optional[LiveUpdates] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self.config = config
+        self.event_store = event_store
+        self.live_updates = live_updates
+        self.metrics = metrics
+        self._ctx = multiprocessing.get_context("spawn")
+        self._messages = self._ctx.Queue()
+        self.counters: Dict[str, RemoteCounter] = {}
+        self.frame_buffers: Dict[str, SharedFrameBuffer] = {}
+        self._groups: List[List[CameraConfig]] = []
+        self._processes: List[Optional[multiprocessing.process.BaseProcess]] = []
+        self._stopped = threading.Event()
+        self._pump_thread: Optional[threading.Thread] = None
+        self.ingest = RemoteIngest(event_store, self.counters, live_updates)
+
+    def start(self) -> Tuple[Dict[str, RemoteCounter], Dict[str, SharedFrameBuffer]]:
+        today = self.event_store.summarize_daily_counts(date.today())
+        for camera_cfg in self.config.cameras:
+            restored = today.get(camera_cfg.id, {})
+            self.counters[camera_cfg.id] = RemoteCounter(
+                camera_cfg.id,
+                int(restored.get("total_in_today", 0)),
+                int(restored.get("total_out_today", 0)),
+            )
+            self.frame_buffers[camera_cfg.id] = SharedFrameBuffer(self.config.shared_frame_max_bytes)
+
+        size = self.config.cameras_per_process
+        cameras = list(self.config.cameras)
+        self._groups = [cameras[i : i + size] for i in range(0, len(cameras), size)]
+        self._processes = [self._spawn(index) for index in range(len(self._groups))]
+
+        self._pump_thread = threading.Thread(target=self._pump, daemon=True, name="camera-pool-pump")
+        self._pump_thread.start()
+        return self.counters, self.frame_buffers
+
+    def _spawn(self, index: int) -> multiprocessing.process.BaseProcess:
+        group = self._groups[index]
+        process = self._ctx.Process(
+            target=run_camera_worker,
+            args=(
+                self.config,
+                group,
+                {cam.id: self.frame_buffers[cam.id].name for cam in group},
+                {cam.id: (self.counters[cam.id].entered, self.counters[cam.id].exited) for cam in group},
+                self._messages,
+            ),
+            daemon=True,
+            name=f"camera-worker-{index}",
+        )
+        process.start()
+        logger.info(
+            "Started worker process %s (pid %s) for cameras %s",
+            process.name,
+            process.pid,
+            [cam.id for cam in group],
+        )
+        return process
+
+    def _handle(self, kind: str, payload: Any) -> None:
+        if kind == "metrics":
+            if self.metrics is not None:
+                self.metrics.update_remote(payload)
+        else:
+            self.ingest.handle(kind, payload)
+
+    def _pump(self) -> None:
+        """Drain worker messages, mirror shared frames and restart dead workers."""
+
+        next_health_check = time.monotonic() + 1.0
+        while not self._stopped.is_set():
+            try:
+                kind, payload = self._messages.get(timeout=0.01)
+                self._handle(kind, payload)
+                while True:
+                    kind, payload = self._messages.get_nowait()
+                    self._handle(kind, payload)
+            except queue.Empty:
+                pass
+            except Exception:
+                logger.exception("Failed to handle worker message")
+
+            for frame_buffer in self.frame_buffers.values():
+                frame_buffer.poll()
+
+            if time.monotonic() >= next_health_check:
+                next_health_check = time.monotonic() + 1.0
+                for index, process in enumerate(self._processes):
+                    if process is not None and not process.is_alive() and not self._stopped.is_set():
+                        logger.error(
+                            "Worker %s exited with code %s; restarting", process.name, process.exitcode
+                        )
+                        self._processes[index] = self._spawn(index)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout=5.0)
+        if self._pump_thread is not None:
+            self._pump_thread.join(timeout=5.0)
+        for frame_buffer in self.frame_buffers.values():
+            frame_buffer.close()
+
+
+__all__ = ["CameraProcessPool", "RemoteCounter", "RemoteIngest", "run_camera_worker"]
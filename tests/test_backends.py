@@ -0,0 +1,59 @@
+import numpy as np
+
+from src.pipelines.backends import _ExportedYoloBackend, letterbox, non_max_suppression
+
+
+class _FakeExportedBackend(_ExportedYoloBackend):
+    """Returns a fixed raw YOLOv8 output: person scores in row 4, one other class in row 5."""
+
+    def __init__(self, raw: np.ndarray) -> None:
+        super().__init__(conf_threshold=0.5, imgsz=64)
+        self.raw = raw
+        self.batch_shapes = []
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        self.batch_shapes.append(batch.shape)
+        return np.repeat(self.raw[None], len(batch), axis=0)
+
+
+def test_letterbox_pads_to_square_and_reports_offsets():
+    frame = np.zeros((32, 64, 3), dtype=np.uint8)
+    image, ratio, (left, top) = letterbox(frame, 64)
+    assert image.shape == (64, 64, 3)
+    assert ratio == 1.0 and (left, top) == (0, 16)
+    assert image[0, 0, 0] == 114 and image[16, 0, 0] == 0
+
+
+def test_nms_keeps_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.7], dtype=np.float32)
+    assert non_max_suppression(boxes, scores, 0.45).tolist() == [1, 2]
+
+
+def test_exported_backend_decodes_person_boxes_in_frame_coordinates():
+    # Anchors (cx, cy, w, h, person, other): a person, a duplicate, a low score, a non-person.
+    raw = np.array(
+        [
+            [20, 21, 40, 40],
+            [32, 32, 32, 32],
+            [10, 10, 10, 10],
+            [20, 20, 20, 20],
+            [0.9, 0.8, 0.1, 0.0],
+            [0.0, 0.0, 0.0, 0.95],
+        ],
+        dtype=np.float32,
+    )
+    backend = _FakeExportedBackend(raw)
+    frame = np.zeros((32, 64, 3), dtype=np.uint8)
+    detections = backend.predict([frame, frame])
+
+    assert backend.batch_shapes == [(1, 3, 64, 64), (1, 3, 64, 64)]
+    assert len(detections) == 2
+    assert detections[0].shape == (1, 5) and detections[0].dtype == np.float32
+    # Letterbox padding of 16px on top is removed.
+    np.testing.assert_allclose(detections[0][0], [15, 6, 25, 26, 0.9], atol=1e-5)
+
+    backend.dynamic_batch = True
+    backend.batch_shapes.clear()
+    backend.predict([frame, frame])
+    assert backend.batch_shapes == [(2, 3, 64, 64)]
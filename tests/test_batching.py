@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from src.utils.batching import MicroBatcher
+
+
+def test_micro_batcher_groups_concurrent_submissions():
+    batch_sizes = []
+
+    def process(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=200.0)
+    results = {}
+
+    def worker(value):
+        results[value] = batcher.submit(value)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {i: i * 2 for i in range(4)}
+    assert sum(batch_sizes) == 4
+    assert max(batch_sizes) > 1
+
+
+def test_micro_batcher_propagates_errors():
+    def process(items):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=0.0)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+    batcher.close()
@@ -0,0 +1,184 @@
+import contextlib
+import http.server
+import multiprocessing
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Iterator
+
+import uvicorn
+from fastapi.testclient import TestClient
+
+from src.api.server import app, init_app_state
+from src.cluster import CoordinatorClient, HashRing, create_coordinator, shard_config
+from src.config import AppConfig
+from src.utils.events import EntranceEvent, EventStore
+
+
+def _config(**overrides) -> AppConfig:
+    line = {"p1": [0.0, 0.5], "p2": [1.0, 0.5]}
+    cameras = [
+        {"id": f"cam{i}", "name": f"Camera {i}", "rtsp_url": "rtsp://example", "entrance_line": line}
+        for i in range(6)
+    ]
+    nodes = {"node-a": "http://127.0.0.1:1", "node-b": "http://127.0.0.1:2"}
+    return AppConfig(cameras=cameras, cluster_nodes=nodes, cluster_token="secret", **overrides)
+
+
+def test_hash_ring_only_moves_cameras_of_a_removed_node():
+    cameras = [f"cam{i}" for i in range(200)]
+    full = HashRing(["a", "b", "c"])
+    owners = {camera: full.node_for(camera) for camera in cameras}
+    assert set(owners.values()) == {"a", "b", "c"}
+    assert owners == {camera: HashRing(["c", "b", "a"]).node_for(camera) for camera in cameras}
+
+    without_c = HashRing(["a", "b"])
+    for camera, node in owners.items():
+        if node != "c":
+            assert without_c.node_for(camera) == node
+
+
+def _run_node(url: str, node_id: str) -> None:
+    config = shard_config(_config(cluster_role="node", node_id=node_id, coordinator_url=url))
+    client = CoordinatorClient(url, node_id, config.cluster_token, interval=0.05)
+    start = datetime(2024, 5, 1, 9, 0)
+    for index, camera_cfg in enumerate(config.cameras):
+        event = EntranceEvent(camera_id=camera_cfg.id, timestamp=start, direction="in", track_id=index)
+        client.add_event(event)
+        client.set_attributes(event, {"top_color": "red"})
+        client.publish({"type": "counts", "camera_id": camera_cfg.id, "entered": 1, "exited": 0})
+    client.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def _serve(port: int) -> Iterator[str]:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not server.started:
+            assert thread.is_alive() and time.monotonic() < deadline, "API server did not start"
+            time.sleep(0.01)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def test_nodes_in_separate_processes_report_their_shards_to_the_coordinator():
+    config = _config(cluster_role="coordinator")
+    store = EventStore()
+    counters, ingest = create_coordinator(config, store)
+    init_app_state(config=config, counters=counters, event_store=store, frame_buffers={}, ingest=ingest)
+
+    with _serve(_free_port()) as url:
+        ctx = multiprocessing.get_context("spawn")
+        nodes = [ctx.Process(target=_run_node, args=(url, node)) for node in ("node-a", "node-b")]
+        for node in nodes:
+            node.start()
+        for node in nodes:
+            node.join(timeout=30)
+            assert node.exitcode == 0
+
+    assert all(counter.get_counts()["entered"] == 1 for counter in counters.values())
+    events = [event for camera in counters for event in store.get_recent_events(camera)]
+    assert len(events) == len(config.cameras)
+    assert all(event.attributes == {"top_color": "red"} for event in events)
+
+
+def test_node_keeps_reports_until_the_coordinator_comes_up():
+    config = _config(cluster_role="coordinator")
+    store = EventStore()
+    counters, ingest = create_coordinator(config, store)
+    init_app_state(config=config, counters=counters, event_store=store, frame_buffers={}, ingest=ingest)
+    port = _free_port()
+    client = CoordinatorClient(f"http://127.0.0.1:{port}", "node-a", "secret", interval=3600, timeout=1)
+    try:
+        client.add_event(
+            EntranceEvent(camera_id="cam1", timestamp=datetime(2024, 5, 1, 9, 0), direction="in", track_id=1)
+        )
+        client.publish({"type": "counts", "camera_id": "cam1", "entered": 1, "exited": 0})
+        assert not client.flush()
+
+        with _serve(port):
+            assert client.flush()
+            assert client.flush()  # nothing left to resend
+    finally:
+        client.close()
+
+    assert len(store.get_recent_events("cam1")) == 1
+    assert counters["cam1"].get_counts()["entered"] == 1
+
+
+def test_coordinator_rejects_reports_without_the_cluster_token():
+    config = _config(cluster_role="coordinator")
+    store = EventStore()
+    counters, ingest = create_coordinator(config, store)
+    init_app_state(config=config, counters=counters, event_store=store, frame_buffers={}, ingest=ingest)
+    report = {"node": "node-a", "session": "s1", "seq": 1, "messages": []}
+
+    client = TestClient(app)
+    assert client.post("/cluster/report", json=report).status_code == 401
+    wrong = {"Authorization": "Bearer guess"}
+    assert client.post("/cluster/report", json=report, headers=wrong).status_code == 401
+    right = {"Authorization": "Bearer secret"}
+    assert client.post("/cluster/report", json=report, headers=right).status_code == 200
+
+
+def test_coordinator_skips_a_batch_retried_after_a_lost_acknowledgement():
+    store = EventStore()
+    counters, ingest = create_coordinator(_config(cluster_role="coordinator"), store)
+    batch = [["event", ["cam1", datetime(2024, 5, 1, 9, 0).timestamp(), "in", 1]]]
+
+    assert ingest.handle_batch("node-a", "s1", 1, batch)
+    assert not ingest.handle_batch("node-a", "s1", 1, batch)
+    assert ingest.handle_batch("node-a", "s2", 1, batch[:0])  # a restarted node starts a new session
+
+    assert len(store.get_recent_events("cam1")) == 1
+
+
+class _FakeNodeStream(http.server.BaseHTTPRequestHandler):
+    body = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + b"\xff\xd8jpeg" * 5000 + b"\r\n"
+
+    def do_GET(self):
+        if self.path != "/cameras/cam1/stream":
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_coordinator_proxies_streams_of_cameras_on_other_nodes():
+    node = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FakeNodeStream)
+    threading.Thread(target=node.serve_forever, daemon=True).start()
+    config = _config(cluster_role="coordinator")
+    store = EventStore()
+    counters, ingest = create_coordinator(config, store)
+    base = f"http://127.0.0.1:{node.server_address[1]}"
+    init_app_state(
+        config=config,
+        counters=counters,
+        event_store=store,
+        frame_buffers={},
+        ingest=ingest,
+        stream_urls={"cam1": f"{base}/cameras/cam1/stream", "cam2": f"{base}/cameras/cam2/stream"},
+    )
+    try:
+        client = TestClient(app)
+        assert client.get("/cameras/cam1/stream").content == _FakeNodeStream.body
+        assert client.get("/cameras/cam2/stream").content == b""  # upstream 404 ends the stream
+    finally:
+        node.shutdown()
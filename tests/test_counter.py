@@ -0,0 +1,33 @@
+import numpy as np
+
+from src.config import LineDefinition
+from src.pipelines.counter import EntranceCounter
+
+
+def _counter() -> EntranceCounter:
+    return EntranceCounter(camera_id="cam1", entrance_line=LineDefinition(p1=(0.0, 0.5), p2=(1.0, 0.5)))
+
+
+def test_counter_accepts_track_array():
+    counter = _counter()
+    counter.update(np.array([[7, 40, 60, 60, 80]], dtype=np.float32), 100, 100)
+    events = counter.update(np.array([[7, 40, 10, 60, 30]], dtype=np.float32), 100, 100)
+    assert events == [(7, "in")]
+    assert counter.get_counts() == {"entered": 1, "exited": 0, "current_occupancy": 1}
+
+
+def test_counter_evicts_stale_tracks():
+    counter = EntranceCounter(
+        camera_id="cam1", entrance_line=LineDefinition(p1=(0.0, 0.5), p2=(1.0, 0.5)), max_track_age=10
+    )
+    counter.update([(1, 0, 0, 10, 10)], 100, 100)
+    for _ in range(100):
+        counter.update([(2, 0, 0, 10, 10)], 100, 100)
+    assert set(counter.track_last_center) == {2}
+
+
+def test_counter_counts_in_and_out_for_multiple_tracks():
+    counter = _counter()
+    counter.update([(1, 0, 60, 10, 80), (2, 20, 10, 30, 30)], 100, 100)
+    events = counter.update([(1, 0, 10, 10, 30), (2, 20, 60, 30, 80)], 100, 100)
+    assert events == [(1, "in"), (2, "out")]
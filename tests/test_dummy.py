@@ -1,3 +1,5 @@
+import asyncio
+import json
 from datetime import datetime
 
 from fastapi.testclient import TestClient
@@ -47,3 +49,85 @@ def test_stats_summary_structure():
     assert "total_out_today" in payload
     assert "cameras" in payload
     assert "cam1" in payload["cameras"]
+
+
+def test_event_export_streams_ndjson_and_resumes_from_cursor():
+    client = _setup_app_state()
+    first_page = client.get("/cameras/cam1/events/export", params={"limit": 1})
+    assert first_page.status_code == 200
+    rows = [json.loads(line) for line in first_page.text.splitlines()]
+    assert [row["direction"] for row in rows] == ["in"]
+
+    rest = client.get("/cameras/cam1/events/export", params={"cursor": rows[-1]["cursor"]})
+    assert [json.loads(line)["direction"] for line in rest.text.splitlines()] == ["out"]
+
+    csv_export = client.get("/cameras/cam1/events/export", params={"format": "csv"})
+    assert csv_export.text.splitlines()[0] == "camera_id,timestamp,direction,track_id,cursor,attributes"
+    assert len(csv_export.text.splitlines()) == 3
+    assert client.get("/cameras/cam1/events/export", params={"cursor": "???"}).status_code == 400
+    assert client.get("/cameras/cam1/events/export", params={"limit": 0}).status_code == 422
+
+
+def test_csv_export_quotes_fields_with_delimiters():
+    import csv
+
+    from src.api.server import export_rows
+
+    timestamp = datetime(2024, 5, 1, 9, 0)
+    event = EntranceEvent(
+        camera_id='lobby, "east"',
+        timestamp=timestamp,
+        direction="in",
+        track_id=1,
+        attributes={"top_color": "red"},
+    )
+    text = b"".join(export_rows(iter([event]), "csv")).decode("utf-8")
+    rows = list(csv.reader(text.splitlines()))
+    assert rows[1][:4] == ['lobby, "east"', "2024-05-01T09:00:00", "in", "1"]
+    assert json.loads(rows[1][5]) == {"top_color": "red"}
+
+
+def test_live_updates_pushes_counts_and_filters_tracks():
+    from src.api.server import get_state, live_update_generator
+
+    _setup_app_state()
+    live = get_state().live_updates
+
+    async def scenario():
+        stream = live_update_generator(camera_ids={"cam1"}, include_tracks=False)
+        initial = await stream.__anext__()
+        live.publish({"type": "tracks", "camera_id": "cam1", "tracks": []})
+        live.publish({"type": "event", "camera_id": "cam2", "direction": "in"})
+        live.publish({"type": "event", "camera_id": "cam1", "direction": "in"})
+        pushed = await asyncio.wait_for(stream.__anext__(), timeout=1.0)
+        await stream.aclose()
+        return initial, pushed
+
+    initial, pushed = asyncio.run(scenario())
+    assert initial.startswith(b"event: counts\n")
+    assert pushed.startswith(b"event: event\n")
+    assert json.loads(pushed.split(b"data: ")[1])["camera_id"] == "cam1"
+    assert not live.has_subscribers()
+
+
+def test_metrics_endpoint_exports_prometheus_histograms():
+    from src.api import server
+    from src.utils.metrics import MetricsRegistry, PipelineMetrics
+
+    client = _setup_app_state()
+    registry = MetricsRegistry()
+    registry.camera("cam1").observe("detect", 0.02)
+    registry.camera("cam1").count_frame(0.0)
+    remote = PipelineMetrics("cam2")
+    remote.observe("track", 0.003)
+    registry.update_remote({"worker": "camera-worker-0", "cameras": {"cam2": remote.snapshot()}})
+    server.get_state().metrics = registry
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE cctv_stage_latency_seconds histogram" in body
+    assert 'cctv_stage_latency_seconds_bucket{camera="cam1",stage="detect",le="0.025"} 1' in body
+    assert 'cctv_stage_latency_seconds_bucket{camera="cam1",stage="detect",le="0.01"} 0' in body
+    assert 'cctv_stage_latency_seconds_count{camera="cam2",stage="track"} 1' in body
+    assert 'cctv_frames_total{camera="cam1"} 1' in body
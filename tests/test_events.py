@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from src.utils.events import EntranceEvent, EventStore
+
+
+def _event(camera_id: str, timestamp: datetime, direction: str = "in", track_id: int = 1) -> EntranceEvent:
+    return EntranceEvent(camera_id=camera_id, timestamp=timestamp, direction=direction, track_id=track_id)
+
+
+def test_recent_and_range_queries_are_per_camera_and_time_ordered():
+    store = EventStore()
+    base = datetime(2024, 5, 1, 9, 0)
+    for minute in (0, 10, 5):
+        store.add_event(_event("cam1", base + timedelta(minutes=minute), track_id=minute))
+    store.add_event(_event("cam2", base, direction="out"))
+
+    assert [e.track_id for e in store.get_recent_events("cam1", limit=2)] == [5, 10]
+    window = store.get_events_between("cam1", base + timedelta(minutes=1), base + timedelta(minutes=10))
+    assert [e.track_id for e in window] == [5]
+    assert store.get_counts("cam2") == {"entered": 0, "exited": 1, "current_occupancy": -1}
+    assert len(store.get_events_for_day(base.date())) == 4
+
+
+def test_retention_and_size_cap_bound_memory():
+    store = EventStore(retention=timedelta(hours=1), max_events_per_camera=50)
+    base = datetime(2024, 5, 1, 9, 0)
+    for i in range(500):
+        store.add_event(_event("cam1", base + timedelta(seconds=30 * i), track_id=i))
+
+    recent = store.get_recent_events("cam1", limit=1000)
+    assert [e.track_id for e in recent] == list(range(450, 500))
+    assert [e.track_id for e in store.get_events_between("cam1")] == list(range(450, 500))
+    assert store.get_counts("cam1")["entered"] == 500
+
+    store = EventStore(retention=timedelta(hours=1), max_events_per_camera=1000)
+    for i in range(500):
+        store.add_event(_event("cam1", base + timedelta(seconds=30 * i), track_id=i))
+    # The newest event is at 30 * 499 s; the hour before it starts at track 379.
+    assert store.get_recent_events("cam1", limit=1000)[0].track_id == 379
+
+
+def test_daily_summary_uses_running_aggregates_and_rolls_over():
+    store = EventStore(aggregate_days=2)
+    first_day = datetime(2024, 5, 1, 9, 30)
+    store.add_event(_event("cam1", first_day))
+    store.add_event(_event("cam1", first_day + timedelta(hours=1)))
+    store.add_event(_event("cam1", first_day + timedelta(hours=1), direction="out"))
+
+    summary = store.summarize_daily_counts(first_day.date())
+    assert summary["cam1"] == {
+        "total_in_today": 2,
+        "total_out_today": 1,
+        "visits_per_hour": {9: 1, 10: 1},
+        "current_occupancy": 1,
+    }
+
+    for offset in (1, 2):
+        store.add_event(_event("cam1", first_day + timedelta(days=offset)))
+    assert store.summarize_daily_counts(first_day.date()) == {}
+    assert store.summarize_daily_counts((first_day + timedelta(days=2)).date())["cam1"]["total_in_today"] == 1
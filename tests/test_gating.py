@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from src.config import LineDefinition
+from src.pipelines.counter import EntranceCounter
+from src.pipelines.gating import DetectionGate
+from src.pipelines.tracker import IOUTracker, PersonTracker
+
+
+def test_gate_skips_static_frames_and_detects_on_motion():
+    gate = DetectionGate(motion_threshold=0.01)
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    assert gate.check(frame) == "detect"
+    assert gate.check(frame.copy()) == "skip"
+
+    moved = frame.copy()
+    moved[40:80, 40:80] = 255
+    assert gate.check(moved) == "detect"
+
+
+def test_gate_accumulates_slow_motion_since_the_last_detection():
+    gate = DetectionGate(motion_threshold=0.01)
+    actions = []
+    for x in range(100):
+        # A 40x40 square moving 1px per frame changes ~0.4% of the pixels each frame.
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        frame[40:80, x : x + 40] = 255
+        actions.append(gate.check(frame))
+
+    assert actions.count("detect") >= 25
+    assert "detect" in actions[1:4]
+
+
+def test_gate_stride_alternates_detect_and_predict():
+    gate = DetectionGate(detect_stride=3)
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    actions = [gate.check(frame) for _ in range(6)]
+    assert actions == ["detect", "predict", "predict", "detect", "predict", "predict"]
+
+
+def test_iou_tracker_predicts_with_velocity():
+    tracker = IOUTracker()
+    tracker.update([(0, 0, 100, 100, 0.9)])
+    tracks = tracker.update([(10, 0, 110, 100, 0.9)])
+    track_id = tracks[0][0]
+    predicted = tracker.predict()
+    assert predicted == [(track_id, 20, 0, 120, 100)]
+
+
+class _ConstantEmbedder:
+    def predict(self, crops):
+        return [np.ones(8, dtype=np.float32) for _ in crops]
+
+
+def test_deepsort_with_detect_stride_keeps_identity_and_counts_a_crossing():
+    pytest.importorskip("deep_sort_realtime")
+    gate = DetectionGate(detect_stride=3)
+    tracker = PersonTracker(tracker_type="deepsort", embedder=_ConstantEmbedder())
+    counter = EntranceCounter(camera_id="cam1", entrance_line=LineDefinition(p1=(0.0, 0.5), p2=(1.0, 0.5)))
+    frame = np.zeros((200, 200, 3), dtype=np.uint8)
+    seen_ids = set()
+    for step in range(200):
+        top = 10 + 2 * step
+        # The person walks down through the line and leaves the frame at step 80.
+        visible = top < 170
+        detections = np.array([[80, top, 110, top + 31, 0.9]] if visible else [], dtype=np.float32)
+        if gate.check(frame) == "detect":
+            tracks = tracker.update(detections, frame)
+        else:
+            tracks = tracker.predict()
+        seen_ids.update(track[0] for track in tracks)
+        counter.update(tracks, 200, 200)
+
+    assert len(seen_ids) == 1
+    assert counter.get_counts()["exited"] == 1 and counter.get_counts()["entered"] == 0
+    # With no detections the DeepSort track ages out instead of drifting on forever.
+    assert tracker.predict() == []
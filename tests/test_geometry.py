@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.config import CameraConfig, LineDefinition, RegionDefinition
+from src.main import _detect_in_region
+from src.utils.geometry import normalized_region_to_absolute
+
+
+def _camera(**kwargs) -> CameraConfig:
+    return CameraConfig(
+        id="cam1",
+        name="Front Door",
+        rtsp_url="rtsp://example",
+        entrance_line=LineDefinition(p1=(0.1, 0.8), p2=(0.9, 0.8)),
+        **kwargs,
+    )
+
+
+def test_detection_region_is_derived_from_line_or_given_explicitly():
+    assert _camera().detection_region() is None
+    assert _camera(roi_margin=0.1).detection_region() == pytest.approx((0.0, 0.7, 1.0, 0.9))
+    explicit = _camera(roi=RegionDefinition(p1=(0.2, 0.5), p2=(0.8, 1.0)), roi_margin=0.1)
+    assert explicit.detection_region() == (0.2, 0.5, 0.8, 1.0)
+    assert normalized_region_to_absolute((0.2, 0.5, 0.8, 1.0), 640, 480) == (128, 240, 512, 480)
+
+
+def test_region_definition_rejects_inverted_corners():
+    with pytest.raises(ValueError):
+        RegionDefinition(p1=(0.8, 0.5), p2=(0.2, 1.0))
+
+
+class _CropDetector:
+    """Stub detector that records the crop it saw and returns a box at each crop corner."""
+
+    def __init__(self, empty: bool = False) -> None:
+        self.empty = empty
+        self.shape = None
+
+    def detect(self, frame):
+        self.shape = frame.shape
+        if self.empty:
+            return np.zeros((0, 5), dtype=np.float32)
+        height, width = frame.shape[:2]
+        return np.array([[0, 0, 2, 2, 0.9], [width - 2, height - 2, width, height, 0.8]], dtype=np.float32)
+
+
+def test_detect_in_region_maps_crop_boxes_back_to_the_frame():
+    frame = np.zeros((80, 100, 3), dtype=np.uint8)
+    detector = _CropDetector()
+
+    full = _detect_in_region(detector, frame, None)
+    assert detector.shape == (80, 100, 3)
+    assert full[1].tolist() == pytest.approx([98, 78, 100, 80, 0.8])
+
+    inner = _detect_in_region(detector, frame, (10, 20, 50, 60))
+    assert detector.shape == (40, 40, 3)
+    assert inner[:, :4].tolist() == [[10, 20, 12, 22], [48, 58, 50, 60]]
+
+    # A region reaching the frame edge ends exactly at the frame border.
+    edge = normalized_region_to_absolute((0.9, 0.9, 1.0, 1.0), 100, 80)
+    corner = _detect_in_region(detector, frame, edge)
+    assert detector.shape == (8, 10, 3)
+    assert corner[1, :4].tolist() == [98, 78, 100, 80]
+
+
+def test_detect_in_region_handles_a_degenerate_region_without_detections():
+    frame = np.zeros((80, 100, 3), dtype=np.uint8)
+    detector = _CropDetector(empty=True)
+
+    region = normalized_region_to_absolute((1.0, 1.0, 1.0, 1.0), 100, 80)
+    assert region == (99, 79, 100, 80)
+    detections = _detect_in_region(detector, frame, region)
+    assert detector.shape == (1, 1, 3)
+    assert detections.shape == (0, 5)
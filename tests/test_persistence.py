@@ -0,0 +1,92 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from src.utils.events import EntranceEvent, EventStore
+from src.utils.persistence import SQLiteEventBackend
+
+
+def test_events_survive_restart_and_old_ranges_come_from_database(tmp_path):
+    db_path = tmp_path / "events.db"
+    base = datetime(2024, 5, 1, 9, 0)
+
+    backend = SQLiteEventBackend(db_path, batch_size=2)
+    store = EventStore(backend=backend)
+    for i in range(5):
+        store.add_event(
+            EntranceEvent(camera_id="cam1", timestamp=base + timedelta(minutes=i), direction="in", track_id=i)
+        )
+    backend.close()
+
+    backend = SQLiteEventBackend(db_path)
+    restored = EventStore(backend=backend)
+    assert restored.restore(since=base + timedelta(minutes=2)) == 3
+    assert restored.summarize_daily_counts(base.date())["cam1"]["total_in_today"] == 3
+    assert [e.track_id for e in restored.get_recent_events("cam1")] == [2, 3, 4]
+
+    older = restored.get_events_between("cam1", base, base + timedelta(minutes=2))
+    assert [e.track_id for e in older] == [0, 1]
+    backend.close()
+
+
+def test_late_attributes_are_persisted(tmp_path):
+    backend = SQLiteEventBackend(tmp_path / "events.db")
+    store = EventStore(backend=backend)
+    event = EntranceEvent(camera_id="cam1", timestamp=datetime(2024, 5, 1, 9, 0), direction="in", track_id=1)
+    store.add_event(event)
+    backend.flush()
+    store.set_attributes(event, {"top_color": "red", "bottom_color": "blue"})
+    backend.close()
+
+    backend = SQLiteEventBackend(tmp_path / "events.db")
+    stored = list(backend.iter_events("cam1"))
+    assert stored[0].attributes == {"top_color": "red", "bottom_color": "blue"}
+    backend.close()
+
+
+def test_failed_writes_are_retried_then_counted_as_dropped(tmp_path, monkeypatch):
+    backend = SQLiteEventBackend(tmp_path / "events.db", max_retries=2, retry_interval=0.01)
+    write = backend._write
+    failures = iter([True, False, True, True, True])
+
+    def flaky_write(conn, events, updates):
+        if next(failures, False):
+            raise sqlite3.OperationalError("database is locked")
+        write(conn, events, updates)
+
+    monkeypatch.setattr(backend, "_write", flaky_write)
+    base = datetime(2024, 5, 1, 9, 0)
+    backend.enqueue(EntranceEvent(camera_id="cam1", timestamp=base, direction="in", track_id=1))
+    backend.flush()
+    assert (backend.write_failures, backend.dropped_events) == (1, 0)
+
+    backend.enqueue(EntranceEvent(camera_id="cam1", timestamp=base, direction="in", track_id=2))
+    backend.flush()
+    assert (backend.write_failures, backend.dropped_events) == (4, 1)
+    assert [event.track_id for event in backend.iter_events("cam1")] == [1]
+    backend.close()
+
+
+def test_range_queries_do_not_wait_for_a_stuck_writer(tmp_path, monkeypatch):
+    backend = SQLiteEventBackend(tmp_path / "events.db")
+    store = EventStore(backend=backend)
+    unblock = threading.Event()
+    write = backend._write
+
+    def stuck_write(conn, events, updates):
+        unblock.wait()
+        write(conn, events, updates)
+
+    monkeypatch.setattr(backend, "_write", stuck_write)
+    base = datetime(2024, 5, 1, 9, 0)
+    store.add_event(EntranceEvent(camera_id="cam1", timestamp=base, direction="in", track_id=1))
+
+    assert not backend.flush(timeout=0.05)
+    started = time.monotonic()
+    store.get_events_between("cam1", base - timedelta(days=1), base + timedelta(days=1))
+    assert time.monotonic() - started < 2.0
+
+    unblock.set()
+    assert backend.flush(timeout=5.0)
+    backend.close()
@@ -0,0 +1,38 @@
+import threading
+
+import numpy as np
+
+from src.pipelines.profiler import PALETTE, CustomerProfiler
+
+
+def _person(top: str, bottom: str) -> np.ndarray:
+    frame = np.zeros((200, 100, 3), dtype=np.uint8)
+    frame[:100] = PALETTE[top]
+    frame[100:] = PALETTE[bottom]
+    return frame
+
+
+def test_profile_extracts_top_and_bottom_colors():
+    profiler = CustomerProfiler(workers=0)
+    frame = _person("red", "navy")
+
+    assert profiler.profile(1, frame, (0, 0, 100, 200)) == {"top_color": "red", "bottom_color": "navy"}
+
+
+def test_submit_profiles_each_track_once():
+    profiler = CustomerProfiler(workers=1)
+    frame = _person("green", "black")
+    results = []
+    done = threading.Event()
+
+    def callback(attributes):
+        results.append(attributes)
+        if len(results) == 2:
+            done.set()
+
+    assert profiler.submit("cam1", 7, frame, (0, 0, 100, 200), callback)
+    profiler.submit("cam1", 7, _person("white", "white"), (0, 0, 100, 200), callback)
+    assert done.wait(5.0)
+    profiler.close()
+
+    assert results == [{"top_color": "green", "bottom_color": "black"}] * 2
@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+
+import src.utils.video as video
+from src.config import AppConfig, LineDefinition
+from src.main import CameraThreadPool
+from src.pipelines.profiler import CustomerProfiler
+from src.utils.events import EventStore
+
+
+def _camera(camera_id: str, line_y: float = 0.5, **fields) -> dict:
+    # A replay source without files: the camera thread starts and ends at once.
+    return {
+        "id": camera_id,
+        "name": camera_id,
+        "rtsp_url": "file:///nonexistent/recordings",
+        "entrance_line": {"p1": [0.0, line_y], "p2": [1.0, line_y]},
+        **fields,
+    }
+
+
+def test_reload_updates_lines_in_place_and_restarts_only_changed_cameras():
+    config = AppConfig(tracker_type="iou", cameras=[_camera("cam1"), _camera("cam2"), _camera("cam3")])
+    pool = CameraThreadPool(
+        config, detector=None, event_store=EventStore(), profiler=CustomerProfiler(workers=0)
+    )
+    api_counters = pool.start()
+    counters = api_counters
+    counters["cam1"].restore_counts(5, 2)
+    cam1, cam2, tracker2 = counters["cam1"], counters["cam2"], pool.trackers["cam2"]
+
+    changed = AppConfig(
+        tracker_type="iou",
+        cameras=[_camera("cam1", line_y=0.7), _camera("cam2", detect_stride=3), _camera("cam4")],
+    )
+    changes = pool.apply(changed)
+    pool.stop()
+    counters = pool.counters
+
+    assert changes == {
+        "added": ["cam4"],
+        "removed": ["cam3"],
+        "restarted": ["cam2"],
+        "updated": ["cam1"],
+        "pending": [],
+    }
+    assert counters["cam1"] is cam1 and cam1.get_counts()["entered"] == 5
+    assert cam1.entrance_line_def == LineDefinition(p1=(0.0, 0.7), p2=(1.0, 0.7))
+    assert counters["cam2"] is cam2 and pool.trackers["cam2"] is tracker2
+    assert set(counters) == set(pool.frame_buffers) == {"cam1", "cam2", "cam4"}
+    assert set(api_counters) == {"cam1", "cam2", "cam3"}  # dicts handed out earlier are not resized
+    assert not any(pool.apply(changed).values())
+
+
+class _BlockingCapture:
+    """RTSP capture whose ``read`` hangs until released, like an unreachable camera."""
+
+    opened = []
+
+    def __init__(self, url):
+        self.unblock = threading.Event()
+        self.reading = threading.Event()
+        self.opened.append(self)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.reading.set()
+        self.unblock.wait()
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.unblock.set()
+
+
+class _NoDetections:
+    def detect(self, frame):
+        return np.zeros((0, 5), dtype=np.float32)
+
+
+def test_stuck_rtsp_thread_is_not_restarted_until_it_exits(monkeypatch):
+    monkeypatch.setattr(video.cv2, "VideoCapture", _BlockingCapture)
+    _BlockingCapture.opened = []
+    camera = {**_camera("cam1"), "rtsp_url": "rtsp://unreachable/stream"}
+    pool = CameraThreadPool(
+        AppConfig(tracker_type="iou", cameras=[camera]),
+        detector=_NoDetections(),
+        event_store=EventStore(),
+        profiler=CustomerProfiler(workers=0),
+        stop_timeout=0.2,
+    )
+    pool.start()
+    first = _BlockingCapture.opened[0]
+    assert first.reading.wait(5.0)
+
+    changed = AppConfig(tracker_type="iou", cameras=[{**camera, "detect_stride": 2}])
+    assert pool.apply(changed)["pending"] == ["cam1"]
+    assert len(_BlockingCapture.opened) == 1  # no second thread on the same tracker and counter
+
+    first.unblock.set()
+    pool._threads["cam1"][0].join(5.0)
+    assert pool.apply(changed)["restarted"] == ["cam1"]
+    assert _BlockingCapture.opened[1].reading.wait(5.0)
+    _BlockingCapture.opened[1].unblock.set()
+    pool.stop()
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from src.utils import video
+from src.utils.metrics import PipelineMetrics
+from src.utils.video import CameraStream, ReplayStream, open_stream
+
+
+def _write_video(path, frames, fps=10.0):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (32, 24))
+    for value in range(frames):
+        writer.write(np.full((24, 32, 3), value * 10, dtype=np.uint8))
+    writer.release()
+
+
+def test_replay_stream_uses_media_timestamps_across_segments(tmp_path):
+    _write_video(tmp_path / "part-001.avi", 5)
+    _write_video(tmp_path / "part-002.avi", 5)
+
+    stream = open_stream("cam", f"file://{tmp_path}", realtime=False, start_time=1000.0)
+    assert isinstance(stream, ReplayStream)
+    timestamps = [timestamp for _, timestamp in stream.frames()]
+
+    assert len(timestamps) == 10
+    np.testing.assert_allclose(np.diff(timestamps), 0.1, atol=1e-3)
+    assert abs(timestamps[0] - 1000.0) < 0.11
+
+
+def test_open_stream_keeps_rtsp_urls_live():
+    assert isinstance(open_stream("cam", "rtsp://camera/stream"), CameraStream)
+
+
+def test_pipeline_metrics_summary_reports_stage_throughput():
+    metrics = PipelineMetrics("cam")
+    for _ in range(4):
+        metrics.frames += 1
+        metrics.observe("detect", 0.02)
+    summary = metrics.summary()
+    assert summary["frames"] == 4
+    assert summary["stages"]["detect"]["fps"] == 50.0
+    assert summary["stages"]["detect"]["mean_ms"] == 20.0
+
+
+class _FakeCapture:
+    """Capture returning numbered frames; read number ``fail_at`` raises like a crashing decoder."""
+
+    fail_at = 0
+    block = None
+    opened = []
+
+    def __init__(self, url):
+        self.reads = 0
+        self.released = threading.Event()
+        self.opened.append(self)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.reads += 1
+        self.reading.set()
+        if self.block is not None:
+            self.block.wait()
+        if self.reads == self.fail_at:
+            raise RuntimeError("decoder crashed")
+        time.sleep(0.001)
+        return True, np.full((2, 2, 3), self.reads % 256, dtype=np.uint8)
+
+    def release(self):
+        self.released.set()
+
+
+def _fake_capture(monkeypatch, **attributes):
+    capture = type("Capture", (_FakeCapture,), {"opened": [], "reading": threading.Event(), **attributes})
+    monkeypatch.setattr(video.cv2, "VideoCapture", capture)
+    return capture
+
+
+def test_latest_only_stream_skips_frames_a_slow_consumer_missed(monkeypatch):
+    capture = _fake_capture(monkeypatch)
+    stream = CameraStream("cam", "rtsp://camera/stream", latest_only=True)
+    frames = stream.frames()
+
+    first = next(frames)[0][0, 0, 0]
+    time.sleep(0.05)
+    second = next(frames)[0][0, 0, 0]
+    stream.release()
+
+    assert second > first + 1
+    assert stream.dropped_frames >= second - first - 1
+    assert capture.opened[0].released.is_set()
+
+
+def test_latest_only_stream_restarts_a_reader_that_died(monkeypatch):
+    capture = _fake_capture(monkeypatch, fail_at=3)
+    stream = CameraStream("cam", "rtsp://camera/stream", reconnect_interval=0.01, latest_only=True)
+    frames = stream.frames()
+
+    received = [next(frames) for _ in range(5)]
+    stream.release()
+
+    assert len(received) == 5
+    assert len(capture.opened) >= 2 and stream.reconnects == len(capture.opened) - 1
+
+
+def test_release_leaves_a_capture_busy_in_read_to_its_reader(monkeypatch):
+    unblock = threading.Event()
+    capture = _fake_capture(monkeypatch, block=unblock)
+    stream = CameraStream("cam", "rtsp://camera/stream", reconnect_interval=0.05, latest_only=True)
+    consumer = threading.Thread(target=lambda: list(stream.frames()), daemon=True)
+    consumer.start()
+    assert capture.reading.wait(5.0)
+
+    stream.release()
+    assert not capture.opened[0].released.is_set()
+
+    unblock.set()
+    assert capture.opened[0].released.wait(5.0)
+    consumer.join(5.0)
+    assert not consumer.is_alive()
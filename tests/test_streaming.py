@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from src.utils.streaming import FrameBuffer, FramePool, MjpegBroadcaster
+
+
+def test_broadcaster_encodes_each_frame_once_for_all_viewers(monkeypatch):
+    buffer = FrameBuffer()
+    broadcaster = MjpegBroadcaster(buffer, jpeg_quality=70)
+    encoded = []
+    original = broadcaster._encode
+
+    def counting_encode(frame):
+        encoded.append(frame)
+        return original(frame)
+
+    monkeypatch.setattr(broadcaster, "_encode", counting_encode)
+
+    assert broadcaster.next_jpeg(0, timeout=0.01) == (None, 0)
+    buffer.update(np.zeros((8, 8, 3), dtype=np.uint8))
+    first, version = broadcaster.next_jpeg(0, timeout=1.0)
+    second, same_version = broadcaster.next_jpeg(0, timeout=1.0)
+
+    assert first is second
+    assert version == same_version == 1
+    assert first.startswith(b"\xff\xd8")
+    assert len(encoded) == 1
+
+
+def test_frame_buffer_publishes_by_reference_and_pool_reuses_replaced_frames():
+    buffer = FrameBuffer()
+    pool = FramePool(size=2)
+
+    first = pool.acquire((4, 4, 3))
+    buffer.update(first, pool.recycle)
+    frame, version = buffer.wait_for_frame(0, timeout=0)
+    assert frame is first and version == 1
+    assert not frame.flags.writeable
+    assert buffer.wait_for_frame(version, timeout=0) == (None, 1)
+
+    # ``first`` is still published, so the pool must hand out another array.
+    second = pool.acquire((4, 4, 3))
+    assert second is not first
+    buffer.update(second, pool.recycle)
+
+    reused = pool.acquire((4, 4, 3))
+    assert reused is first
+    assert reused.flags.writeable
+
+
+def test_pool_does_not_reuse_a_frame_a_reader_still_holds():
+    buffer = FrameBuffer()
+    pool = FramePool()
+    first = pool.acquire((4, 4, 3))
+    buffer.update(first, pool.recycle)
+
+    leased, _ = buffer.wait_for_frame(0, timeout=0, lease=True)
+    buffer.update(pool.acquire((4, 4, 3)), pool.recycle)
+    assert pool.acquire((4, 4, 3)) is not first
+
+    buffer.release(leased)
+    assert pool.acquire((4, 4, 3)) is first
+
+
+def test_last_viewer_leaving_drops_the_frame_so_the_next_one_waits_for_a_fresh_frame():
+    buffer = FrameBuffer()
+    pool = FramePool()
+    buffer.subscribe()
+    first = pool.acquire((4, 4, 3))
+    buffer.update(first, pool.recycle)
+    buffer.unsubscribe()
+
+    assert buffer.read() is None
+    buffer.subscribe()
+    assert buffer.wait_for_frame(0, timeout=0) == (None, 1)
+    assert pool.acquire((4, 4, 3)) is first
+
+    buffer.update(first, pool.recycle)
+    frame, version = buffer.wait_for_frame(0, timeout=0)
+    assert frame is first and version == 2
+
+
+def test_async_viewers_share_one_wakeup_and_one_encode():
+    buffer = FrameBuffer()
+    broadcaster = MjpegBroadcaster(buffer)
+
+    async def scenario():
+        viewers = [asyncio.ensure_future(broadcaster.next_jpeg_async(0, timeout=2.0)) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        assert len(buffer._async_waiters) == 1
+        threading.Thread(target=buffer.update, args=(np.zeros((8, 8, 3), dtype=np.uint8),)).start()
+        return await asyncio.gather(*viewers)
+
+    results = asyncio.run(scenario())
+    assert {version for _, version in results} == {1}
+    assert len({id(jpeg) for jpeg, _ in results}) == 1
+    assert asyncio.run(broadcaster.next_jpeg_async(1, timeout=0.01)) == (None, 1)
+
+
+def test_preview_frames_are_rendered_only_for_subscribers_and_scaled_down():
+    from src.main import _annotate_frame
+
+    buffer = FrameBuffer()
+    assert not buffer.has_subscribers()
+    buffer.subscribe()
+    buffer.subscribe()
+    buffer.unsubscribe()
+    assert buffer.has_subscribers() and buffer.subscribers == 1
+
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    counts = {"entered": 1, "exited": 0, "current_occupancy": 1}
+    preview = _annotate_frame(frame, [(1, 640, 360, 800, 700)], counts, FramePool(), max_width=640)
+    assert preview.shape == (360, 640, 3)
+    assert preview[180, 320].tolist() == [0, 255, 0]  # box corner scaled by half
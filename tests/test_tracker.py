@@ -0,0 +1,105 @@
+import numpy as np
+
+from src.pipelines import tracker as tracker_module
+from src.pipelines.tracker import IOUTracker
+
+
+def test_iou_tracker_accepts_detection_array():
+    tracker = IOUTracker()
+    detections = np.array([[0, 0, 10, 20, 0.9], [50, 50, 70, 90, 0.8]], dtype=np.float32)
+    first = tracker.update(detections)
+    second = tracker.update(detections + np.array([1, 1, 1, 1, 0], dtype=np.float32))
+    assert [t[0] for t in first] == [t[0] for t in second]
+    assert second[0][1:] == (1, 1, 11, 21)
+
+
+def test_iou_tracker_prefers_globally_best_assignment():
+    tracker = IOUTracker(iou_threshold=0.1)
+    tracker.update(np.array([[0, 0, 10, 10, 0.9], [6, 0, 16, 10, 0.9]], dtype=np.float32))
+    # Track 1 overlaps the second detection most, but only track 2 can use it.
+    tracks = tracker.update(np.array([[-4, 0, 6, 10, 0.9], [3, 0, 13, 10, 0.9]], dtype=np.float32))
+    assert sorted(tracks) == [(1, -4, 0, 6, 10), (2, 3, 0, 13, 10)]
+
+
+def test_greedy_assignment_without_scipy_matches_best_pairs_first(monkeypatch):
+    monkeypatch.setattr(tracker_module, "linear_sum_assignment", None)
+    iou = np.array([[0.6, 0.5], [0.4, 0.05]])
+    # Greedy takes (0, 0) first, leaving track 1 only a pair below the threshold.
+    assert tracker_module._assign(iou, 0.1) == [(0, 0)]
+    assert tracker_module._assign(iou, 0.0) == [(0, 0), (1, 1)]
+    assert tracker_module._assign(np.zeros((0, 2)), 0.1) == []
+
+
+def test_iou_tracker_drops_tracks_after_max_lost():
+    tracker = IOUTracker(max_lost=1)
+    tracker.update(np.array([[0, 0, 10, 10, 0.9]], dtype=np.float32))
+    assert len(tracker.update(np.empty((0, 5), dtype=np.float32))) == 1
+    assert tracker.update(np.empty((0, 5), dtype=np.float32)) == []
+
+
+def test_shared_embedder_batches_crops_across_trackers():
+    import threading
+
+    from src.pipelines.embedder import SharedEmbedder
+
+    class FakeEmbedder:
+        def __init__(self):
+            self.calls = []
+
+        def predict(self, crops):
+            self.calls.append(len(crops))
+            return [np.full(4, crop[0, 0, 0], dtype=np.float32) for crop in crops]
+
+    fake = FakeEmbedder()
+    shared = SharedEmbedder(fake, max_batch_size=2, max_wait_ms=200.0)
+    results = {}
+
+    def camera(value, count):
+        crops = [np.full((8, 4, 3), value, dtype=np.uint8)] * count
+        results[value] = shared.predict(crops)
+
+    threads = [threading.Thread(target=camera, args=(v, n)) for v, n in ((1, 2), (2, 3))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    shared.close()
+
+    assert fake.calls == [5]
+    assert [e[0] for e in results[1]] == [1, 1]
+    assert [e[0] for e in results[2]] == [2, 2, 2]
+
+
+def test_person_tracker_reuses_embeddings_for_unambiguous_tracks():
+    from src.pipelines.tracker import DeepSort, EmbeddingCache, PersonTracker
+
+    cache = EmbeddingCache(refresh_interval=3)
+    boxes = np.array([[0, 0, 10, 20], [12, 0, 22, 20]], dtype=np.float32)
+    assert cache.lookup(boxes) == [None, None]
+    cache.store([(1, 0), (2, 1)], boxes, [np.zeros(2), np.ones(2)], [None, None])
+    # Box 0 moved slightly: unambiguous. Box 1 jumped away: treated as new.
+    found = cache.lookup(np.array([[1, 0, 11, 20], [80, 0, 90, 20]], dtype=np.float32))
+    assert found[0] is not None and found[0].track_id == 1 and found[1] is None
+    # A detection overlapping two tracks makes both matches ambiguous.
+    assert cache.lookup(np.array([[1, 0, 11, 20], [6, 0, 16, 20]], dtype=np.float32)) == [None, None]
+
+    if DeepSort is None:
+        return
+
+    class CountingEmbedder:
+        def __init__(self):
+            self.crops = 0
+
+        def predict(self, crops):
+            self.crops += len(crops)
+            return [np.ones(128, dtype=np.float32) for _ in crops]
+
+    embedder = CountingEmbedder()
+    tracker = PersonTracker(embedder=embedder, embedding_refresh_interval=5)
+    frame = np.zeros((200, 200, 3), dtype=np.uint8)
+    detections = np.array([[10, 10, 40, 90, 0.9], [120, 10, 150, 90, 0.9]], dtype=np.float32)
+    for step in range(10):
+        tracks = tracker.update(detections + np.array([step, 0, step, 0, 0], dtype=np.float32), frame)
+    assert len(tracks) == 2
+    # Embedded on updates 1 and 6 only (refresh every 5): 4 crops instead of 20.
+    assert embedder.crops == 4
@@ -0,0 +1,58 @@
+import multiprocessing
+import time
+from datetime import datetime
+
+import numpy as np
+
+from src.config import AppConfig
+from src.utils.events import EventStore
+from src.utils.shared_frames import SharedFrameBuffer, SharedFrameWriter
+from src.workers import CameraProcessPool, RemoteCounter
+
+
+def _write_frame(name: str) -> None:
+    writer = SharedFrameWriter(name)
+    writer.update(np.full((6, 8, 3), 7, dtype=np.uint8))
+    writer.close()
+
+
+def test_shared_frame_buffer_receives_frames_from_another_process():
+    buffer = SharedFrameBuffer(max_frame_bytes=6 * 8 * 3)
+    try:
+        assert not buffer.poll()
+        process = multiprocessing.get_context("spawn").Process(target=_write_frame, args=(buffer.name,))
+        process.start()
+        process.join(timeout=30)
+        assert buffer.poll()
+        frame, version = buffer.wait_for_frame(0, timeout=0)
+        assert version == 1
+        assert frame.shape == (6, 8, 3) and int(frame[0, 0, 0]) == 7
+        assert not buffer.poll()
+    finally:
+        buffer.close()
+
+
+def test_pool_messages_update_remote_counters_and_event_store():
+    store = EventStore()
+    pool = CameraProcessPool(AppConfig(cameras=[]), store)
+    pool.counters["cam1"] = RemoteCounter("cam1")
+
+    pool._handle("event", ("cam1", datetime(2024, 5, 1, 9, 0).timestamp(), "in", 3))
+    pool._handle("counts", {"type": "counts", "camera_id": "cam1", "entered": 4, "exited": 1})
+
+    assert [e.track_id for e in store.get_recent_events("cam1")] == [3]
+    assert pool.counters["cam1"].get_counts() == {"entered": 4, "exited": 1, "current_occupancy": 3}
+
+
+def test_stream_subscribers_are_visible_to_the_worker_writer():
+    buffer = SharedFrameBuffer(max_frame_bytes=16)
+    writer = SharedFrameWriter(buffer.name)
+    try:
+        assert not writer.has_subscribers()
+        buffer.subscribe()
+        assert writer.has_subscribers()
+        buffer.unsubscribe()
+        assert not writer.has_subscribers()
+    finally:
+        writer.close()
+        buffer.close()